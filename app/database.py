@@ -1,23 +1,343 @@
 import os
-from sqlalchemy import create_engine
+import math
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
 
 # Use SQLite for development, PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecommerce.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Read replicas for GET routes, comma separated; none means everything reads the primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+# Longer than a replica can fall behind unnoticed: REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+READ_YOUR_WRITES_BACKEND = os.getenv("READ_YOUR_WRITES_BACKEND", "memory")  # memory or redis
+
+# Replay lag in seconds; zero when the replica has replayed everything it received
+POSTGRES_LAG_QUERY = """
+SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+class PoolMetrics:
+    """Checkout wait and in-use counts for one engine's pool.
+
+    Compare peak_in_use and the wait times with the FastAPI threadpool size
+    (40 by default): sync routes can hold up to that many connections at once,
+    and every request over pool_size + max_overflow queues for pool_timeout.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float):
+        self.wait_total += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds
+
+    def on_checkout(self, *args):
+        self.checkouts += 1
+        self.in_use += 1
+        if self.in_use > self.peak_in_use:
+            self.peak_in_use = self.in_use
+
+    def on_checkin(self, *args):
+        self.in_use -= 1
+
+    def snapshot(self) -> dict:
+        stats = {
+            "checkouts": self.checkouts,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+            "timeouts": self.timeouts,
+        }
+        if isinstance(self.pool, QueuePool):
+            stats.update(pool_size=self.pool.size(), overflow=self.pool.overflow(), idle=self.pool.checkedin())
+        return stats
+
+class _TimedCheckout:
+    """Pool mixin that reports how long each checkout waited for a connection."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        self.metrics.pool = pool
+        return pool
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL is durable in WAL
+    # except for the last transactions on power loss
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}")
+    cursor.close()
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """The same database through an asyncio driver: aiosqlite or asyncpg."""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+def _engine_options(url: str, poolclass) -> dict:
+    sqlite = url.startswith("sqlite")
+    options = {}
+    if sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+    if not _in_memory(url):
+        # In-memory SQLite keeps its single-connection pool; everything else gets a timed queue pool
+        options.update(
+            poolclass=poolclass,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_pre_ping=_env_flag("DB_POOL_PRE_PING", not sqlite),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "-1" if sqlite else "1800")),
+        )
+    return options
+
+def _in_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":"))
+
+def _instrument(sync_engine: Engine):
+    metrics = PoolMetrics(sync_engine.pool)
+    if isinstance(sync_engine.pool, _TimedCheckout):
+        sync_engine.pool.metrics = metrics
+    event.listen(sync_engine, "checkout", metrics.on_checkout)
+    event.listen(sync_engine, "checkin", metrics.on_checkin)
+    sync_engine.pool_metrics = metrics  # type: ignore
+
+    if sync_engine.dialect.name == "sqlite" and not _in_memory(str(sync_engine.url)):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+def make_engine(url: str = DATABASE_URL) -> Engine:
+    """Engine with pool settings from DB_POOL_* and, on SQLite files, WAL PRAGMAs."""
+    new_engine = create_engine(url, **_engine_options(url, TimedQueuePool))
+    _instrument(new_engine)
+    return new_engine
+
+def make_async_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    """AsyncEngine for the request path, configured like make_engine()."""
+    url = async_database_url(url)
+    new_engine = create_async_engine(url, **_engine_options(url, TimedAsyncQueuePool))
+    _instrument(new_engine.sync_engine)
+    return new_engine
+
+# Sync engine for the outbox worker, CLIs and scripts; requests use the async one
+engine = make_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_async_engine()
+
+# Objects stay loaded after commit, since an expired attribute can't lazy-load
+# outside the session's await points
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def mark_down(self, reason: str):
+        if self.healthy:
+            logger.warning("Read replica %s taken out of rotation: %s", self.name, reason)
+        self.healthy = False
+        self.failures += 1
+        self.last_error = reason
+
+class ReplicaSet:
+    """Read replicas for GET routes, used round-robin, with failover to the primary.
+
+    run() checks every replica each check_interval seconds. It takes out
+    replicas that fail or lag more than max_lag seconds, and puts them back
+    once they recover. A replica that can't be connected to during a request
+    is taken out at once, and the request moves to the next replica or the
+    primary.
+    """
+
+    def __init__(self, engines: Dict[str, AsyncEngine], max_lag: float, check_interval: float):
+        self.replicas = [Replica(name, replica_engine) for name, replica_engine in engines.items()]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.turn = 0
+        self.primary_fallbacks = 0
+
+    @property
+    def staleness(self) -> float:
+        """Upper bound on how far behind the primary a replica read can be."""
+        return self.max_lag + self.check_interval
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        self.turn = (self.turn + 1) % len(healthy)
+        return healthy[self.turn]
+
+    async def session(self) -> Optional[AsyncSession]:
+        """A session already connected to a healthy replica, or None."""
+        while (replica := self.pick()) is not None:
+            db = AsyncSessionLocal(bind=replica.engine, info={"replica": replica.name, "staleness": self.staleness})
+            try:
+                await db.connection()
+                return db
+            except (exc.SQLAlchemyError, OSError) as e:
+                await db.close()
+                replica.mark_down(_describe(e))
+        if self.replicas:
+            self.primary_fallbacks += 1
+        return None
+
+    async def check(self):
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    query = POSTGRES_LAG_QUERY if conn.dialect.name == "postgresql" else "SELECT 0"
+                    lag = float(await conn.scalar(text(query)) or 0)
+            except (exc.SQLAlchemyError, OSError) as e:
+                replica.mark_down(_describe(e))
+                continue
+            replica.lag = lag
+            if lag > self.max_lag:
+                replica.mark_down(f"lagging {lag:.1f}s behind")
+            elif not replica.healthy:
+                logger.info("Read replica %s back in rotation", replica.name)
+                replica.healthy = True
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def snapshot(self) -> dict:
+        return {
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag,
+                 "failures": replica.failures, "last_error": replica.last_error}
+                for replica in self.replicas
+            ],
+        }
+
+replicas = ReplicaSet(
+    {f"replica-{i}": make_async_engine(url) for i, url in enumerate(DATABASE_REPLICA_URLS, 1)},
+    REPLICA_MAX_LAG, REPLICA_CHECK_INTERVAL,
+)
+
+class RecentWriters:
+    """Users who just wrote, whose reads stay on the primary for `window` seconds.
+
+    Replicas lag behind the primary, so an order fetched right after checkout
+    could otherwise come back 404. The in-memory set only sees writes made
+    through this process; with several workers use the redis backend.
+    """
+
+    def __init__(self, window: float, client=None, prefix: str = "recent-write:"):
+        self.window = window
+        self.client = client
+        self.prefix = prefix
+        self.until: Dict[int, float] = {}
+
+    async def mark(self, user_id: int):
+        if not replicas.replicas:
+            return
+        if self.client is not None:
+            # Blocking redis-py client; keep the round trip off the event loop
+            await asyncio.to_thread(self.client.set, f"{self.prefix}{user_id}", 1, ex=max(1, math.ceil(self.window)))
+            return
+        now = time.monotonic()
+        if len(self.until) > 10_000:
+            self.until = {uid: until for uid, until in self.until.items() if until > now}
+        self.until[user_id] = now + self.window
+
+    async def active(self, user_id: int) -> bool:
+        if not replicas.replicas:
+            return False
+        if self.client is not None:
+            return bool(await asyncio.to_thread(self.client.exists, f"{self.prefix}{user_id}"))
+        return self.until.get(user_id, 0) > time.monotonic()
+
+def _recent_writers_client():
+    if READ_YOUR_WRITES_BACKEND == "redis":
+        from app.services.redis_client import get_redis
+        return get_redis()
+    return None
+
+recent_writers = RecentWriters(READ_YOUR_WRITES_SECONDS, _recent_writers_client())
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def read_session(primary: bool = False) -> AsyncSession:
+    """Session for reads: a replica unless `primary` is set or none is healthy."""
+    db = None if primary else await replicas.session()
+    return db or AsyncSessionLocal()
+
+async def get_read_db():
+    """Like get_db, but on a read replica when one is configured and healthy.
+
+    For GET routes that can serve data a few seconds old; see ReplicaSet.staleness.
+    """
+    async with await read_session() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
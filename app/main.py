@@ -1,16 +1,70 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine
-from app.models import user, product, category, cart, order
+from app.database import engine, async_engine, replicas, SessionLocal
+from app.models import user, product, category, cart, order, recommendation, invoice, catalog, rollup
 from app.routes import (
     auth, products, categories, productdetails,
-    cart, checkout, orders
+    cart, checkout, orders, recommendations, reports
 )
+from app.services.cart_store import CartFlushWorker
+from app.services.daftra_client import DaftraClient, start_http_client, close_http_client
+from app.services.invoice_outbox import InvoiceOutboxWorker
+from app.services.migrations import check_schema
+from app.services.search import get_search_index
+from app.utils.metrics import MetricsMiddleware, instrument_engine, pool_collector, registry
 
-# Create database tables
-user.Base.metadata.create_all(bind=engine)
+instrument_engine(async_engine.sync_engine, "requests")
+instrument_engine(engine, "workers")
+for replica in replicas.replicas:
+    instrument_engine(replica.engine.sync_engine, replica.name)
+registry.add_collector(pool_collector({
+    "requests": async_engine.sync_engine, "workers": engine,
+    **{replica.name: replica.engine.sync_engine for replica in replicas.replicas},
+}))
 
-app = FastAPI(title="E-commerce API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is managed by `python -m app.services.migrations upgrade`, run before deploys
+    check_schema()
+
+    # Load the search index before serving so the first search doesn't pay for it
+    with SessionLocal() as db:
+        get_search_index(db)
+
+    replica_checks = asyncio.create_task(replicas.run()) if replicas.replicas else None
+
+    cart_flusher = CartFlushWorker()
+    cart_flush_task = asyncio.create_task(cart_flusher.run())
+
+    await start_http_client()
+    invoice_worker = None
+    if DaftraClient().token:
+        invoice_worker = asyncio.create_task(InvoiceOutboxWorker().run())
+
+    yield
+
+    if invoice_worker:
+        invoice_worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await invoice_worker
+    await close_http_client()
+
+    # Write back carts changed since the last periodic flush
+    cart_flush_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await cart_flush_task
+    await cart_flusher.drain()
+
+    if replica_checks:
+        replica_checks.cancel()
+        with suppress(asyncio.CancelledError):
+            await replica_checks
+    await replicas.dispose()
+    await async_engine.dispose()
+
+app = FastAPI(title="E-commerce API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -21,6 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so it also times CORS preflights and errors
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
@@ -29,6 +86,8 @@ app.include_router(productdetails.router, prefix="/api/productdetails", tags=["P
 app.include_router(cart.router, prefix="/api/cart", tags=["Cart"])
 app.include_router(checkout.router, prefix="/api/checkout", tags=["Checkout"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
+app.include_router(recommendations.router, prefix="/api/recommendations", tags=["Recommendations"])
+app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 
 @app.get("/")
 async def root():
@@ -36,4 +95,15 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/db")
+async def database_pool_stats():
+    return {
+        "requests": async_engine.sync_engine.pool_metrics.snapshot(),  # type: ignore
+        "workers": engine.pool_metrics.snapshot(),  # type: ignore
+        "read_replicas": replicas.snapshot(),
+    }
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
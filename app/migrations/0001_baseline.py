@@ -0,0 +1,68 @@
+"""Tables of the original schema, as create_all() used to make them."""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Integer, JSON, MetaData, String, Table, Text, func,
+)
+from app.services.migrations import Operations
+
+transactional = True
+
+def upgrade(op: Operations):
+    # Frozen copies of the models at the time; later changes belong in later migrations
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True, nullable=False),
+        Column("name", String, nullable=False),
+        Column("hashed_password", String, nullable=False),
+        Column("role", String, nullable=False),
+        Column("is_active", Boolean, nullable=False),
+    )
+    Table(
+        "categories", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, unique=True, index=True, nullable=False),
+        Column("description", Text),
+    )
+    Table(
+        "products", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("title", String, nullable=False),
+        Column("description", Text),
+        Column("price", Float, nullable=False),
+        Column("stock", Integer),
+        Column("sku", String, unique=True, index=True),
+        Column("images", JSON),
+        Column("category_id", Integer, ForeignKey("categories.id")),
+        Column("daftra_item_id", String),
+    )
+    Table(
+        "carts", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id"), unique=True, nullable=False),
+    )
+    Table(
+        "cart_items", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("cart_id", Integer, ForeignKey("carts.id"), nullable=False),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column("quantity", Integer),
+    )
+    Table(
+        "orders", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("total_amount", Float, nullable=False),
+        Column("status", String),
+        Column("daftra_invoice_id", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    )
+    Table(
+        "order_items", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("order_id", Integer, ForeignKey("orders.id"), nullable=False),
+        Column("product_id", Integer, ForeignKey("products.id"), nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column("price", Float, nullable=False),
+    )
+    op.create_tables(metadata)
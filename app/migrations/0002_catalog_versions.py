@@ -0,0 +1,20 @@
+"""Product row versions and the catalog generation, for HTTP validators."""
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, func
+from app.services.migrations import Operations
+
+transactional = True
+
+def upgrade(op: Operations):
+    op.add_column("products", Column("version", Integer, nullable=False, server_default="1"))
+    # SQLite can't add a column with a non-constant default, so the model sets updated_at on insert
+    op.add_column("products", Column("updated_at", DateTime(timezone=True)))
+    op.execute("UPDATE products SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+    metadata = MetaData()
+    Table(
+        "catalog_state", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("generation", Integer, nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    )
+    op.create_tables(metadata)
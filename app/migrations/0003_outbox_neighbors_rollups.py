@@ -0,0 +1,49 @@
+"""Invoice outbox, product co-purchase neighbours and daily sales rollups."""
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, JSON, MetaData, String, Table, Text, func
+from app.services.migrations import Operations
+
+transactional = True
+
+def upgrade(op: Operations):
+    metadata = MetaData()
+    Table(
+        "invoice_outbox", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("order_id", Integer, ForeignKey("orders.id"), unique=True, nullable=False),
+        Column("payload", JSON, nullable=False),
+        Column("status", String, nullable=False),
+        Column("attempts", Integer, nullable=False),
+        Column("next_attempt_at", DateTime, nullable=False),
+        Column("last_error", Text),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Index("ix_invoice_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    Table(
+        "product_neighbors", metadata,
+        Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
+        Column("neighbor_id", Integer, ForeignKey("products.id"), primary_key=True),
+        Column("cooccurrence", Float, nullable=False),
+        Column("score", Float, nullable=False),
+        Index("ix_product_neighbors_product_id_score", "product_id", "score"),
+    )
+    Table(
+        "product_daily_sales", metadata,
+        Column("day", Date, primary_key=True),
+        Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
+        Column("orders", Integer, nullable=False),
+        Column("units", Integer, nullable=False),
+        Column("revenue", Float, nullable=False),
+        Index("ix_product_daily_sales_product_id_day", "product_id", "day"),
+    )
+    Table(
+        "category_daily_sales", metadata,
+        Column("day", Date, primary_key=True),
+        Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True),
+        Column("units", Integer, nullable=False),
+        Column("revenue", Float, nullable=False),
+    )
+    # ForeignKey targets must be in the same MetaData to resolve; they exist already
+    Table("products", metadata, Column("id", Integer, primary_key=True))
+    Table("categories", metadata, Column("id", Integer, primary_key=True))
+    Table("orders", metadata, Column("id", Integer, primary_key=True))
+    op.create_tables(metadata)
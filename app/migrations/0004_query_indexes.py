@@ -0,0 +1,22 @@
+"""Indexes for catalog listing, order history and cart lookups, built online."""
+from app.services.migrations import Operations
+
+# CREATE INDEX CONCURRENTLY can't run inside a transaction
+transactional = False
+
+INDEXES = [
+    ("ix_products_category_id", "products", ["category_id"]),
+    ("ix_products_price", "products", ["price"]),
+    ("ix_products_title", "products", ["title"]),
+    ("ix_products_category_id_price", "products", ["category_id", "price"]),
+    ("ix_products_category_id_title", "products", ["category_id", "title"]),
+    ("ix_orders_user_id_created_at", "orders", ["user_id", "created_at"]),
+    ("ix_orders_status_created_at", "orders", ["status", "created_at"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+    ("ix_cart_items_cart_id_product_id", "cart_items", ["cart_id", "product_id"]),
+]
+
+def upgrade(op: Operations):
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
@@ -0,0 +1,37 @@
+"""Product snapshot on order items, so order reads don't join products."""
+from sqlalchemy import Column, Float, String
+from app.services.migrations import Operations
+
+# The backfill commits batch by batch instead of locking all of order_items at once
+transactional = False
+
+BATCH_SIZE = 10_000
+
+def upgrade(op: Operations):
+    op.add_column("order_items", Column("title", String))
+    op.add_column("order_items", Column("sku", String))
+    op.add_column("order_items", Column("image", String))
+    op.add_column("order_items", Column("line_total", Float, nullable=False, server_default="0"))
+
+    # Order history outlives the products it mentions
+    op.drop_foreign_key("order_items", "product_id")
+    op.drop_foreign_key("product_daily_sales", "product_id")
+
+    if op.dialect == "sqlite":
+        image = "json_extract(p.images, '$[0]')"
+    elif op.dialect == "postgresql":
+        image = "p.images ->> 0"
+    else:
+        image = "NULL"
+
+    # Items written by checkout already carry a title and are left alone
+    low, high = op.execute("SELECT MIN(id), MAX(id) FROM order_items").one()
+    for start in range(low or 0, (high or -1) + 1, BATCH_SIZE):
+        op.execute(f"""
+            UPDATE order_items SET
+                title = (SELECT p.title FROM products p WHERE p.id = order_items.product_id),
+                sku = (SELECT p.sku FROM products p WHERE p.id = order_items.product_id),
+                image = (SELECT {image} FROM products p WHERE p.id = order_items.product_id),
+                line_total = quantity * price
+            WHERE id >= :start AND id < :end AND title IS NULL
+        """, {"start": start, "end": start + BATCH_SIZE})
@@ -0,0 +1,14 @@
+"""SQLite FTS5 table for product search, filled from the products table."""
+from app.services.migrations import Operations
+
+def upgrade(op: Operations):
+    # Other databases, and SQLite builds without FTS5, search with the in-process index
+    if op.dialect != "sqlite" or op.has_table("products_fts"):
+        return
+    if "ENABLE_FTS5" not in op.execute("PRAGMA compile_options").scalars().all():
+        return
+    op.execute("CREATE VIRTUAL TABLE products_fts USING fts5(title, description, sku)")
+    op.execute(
+        "INSERT INTO products_fts(rowid, title, description, sku) "
+        "SELECT id, title, coalesce(description, ''), coalesce(sku, '') FROM products"
+    )
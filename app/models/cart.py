@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -20,4 +20,9 @@ class CartItem(Base):
     quantity = Column(Integer, default=1)  # Make sure this is Integer type
 
     cart = relationship("Cart", back_populates="items")
-    product = relationship("Product")
\ No newline at end of file
+    product = relationship("Product")
+
+    # Carts are read and merged by (cart_id, product_id)
+    __table_args__ = (
+        Index("ix_cart_items_cart_id_product_id", "cart_id", "product_id"),
+    )
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)  # Single row, id = 1
+    generation = Column(Integer, nullable=False, default=0)  # Bumped on every catalog write
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
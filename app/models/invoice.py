@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class InvoiceOutbox(Base):
+    __tablename__ = "invoice_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), unique=True, nullable=False)
+    payload = Column(JSON, nullable=False)  # Daftra invoice request body
+    status = Column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)  # UTC
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    order = relationship("Order")
+
+    # The worker polls for due pending rows
+    __table_args__ = (
+        Index("ix_invoice_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
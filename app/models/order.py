@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -16,14 +16,24 @@ class Order(Base):
     user = relationship("User")
     items = relationship("OrderItem", back_populates="order")
 
+    # Keyset pagination of order history walks these newest-first
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, nullable=False, index=True)  # No foreign key: orders outlive products
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)  # Price snapshot at time of order
+    # The rest of the product as bought, so order reads never join products
+    title = Column(String)
+    sku = Column(String)
+    image = Column(String)
+    line_total = Column(Float, nullable=False, default=0, server_default="0")
 
-    order = relationship("Order", back_populates="items")
-    product = relationship("Product")
\ No newline at end of file
+    order = relationship("Order", back_populates="items")
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, JSON, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,7 +13,19 @@ class Product(Base):
     stock = Column(Integer, default=0)
     sku = Column(String, unique=True, index=True)
     images = Column(JSON)  # Store as JSON array of image URLs
-    category_id = Column(Integer, ForeignKey("categories.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
     daftra_item_id = Column(String)  # Daftra item reference
+    # Row version for HTTP validators; bumped by every UPDATE, ORM or Core
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+    # Set by the app rather than a server default, which SQLite can't add to an existing table
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
-    category = relationship("Category", back_populates="products")
\ No newline at end of file
+    category = relationship("Category", back_populates="products")
+
+    # Catalog listing sorts by (price|title, id), optionally within a category
+    __table_args__ = (
+        Index("ix_products_price", "price"),
+        Index("ix_products_title", "title"),
+        Index("ix_products_category_id_price", "category_id", "price"),
+        Index("ix_products_category_id_title", "category_id", "title"),
+    )
\ No newline at end of file
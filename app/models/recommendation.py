@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, Index
+from app.database import Base
+
+class ProductNeighbor(Base):
+    __tablename__ = "product_neighbors"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    cooccurrence = Column(Float, nullable=False, default=0)  # Weighted count of shared baskets
+    score = Column(Float, nullable=False)  # Cosine similarity
+
+    # /related reads a product's neighbours best-first
+    __table_args__ = (
+        Index("ix_product_neighbors_product_id_score", "product_id", "score"),
+    )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, Index
+from app.database import Base
+
+class ProductDailySales(Base):
+    __tablename__ = "product_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)  # Kept for deleted products too, like order_items
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+    # Best sellers sum a product's recent days
+    __table_args__ = (
+        Index("ix_product_daily_sales_product_id_day", "product_id", "day"),
+    )
+
+class CategoryDailySales(Base):
+    __tablename__ = "category_daily_sales"
+
+    # Products without a category are only in product_daily_sales
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
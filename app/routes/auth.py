@@ -1,24 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
-from app.utils.auth import get_password_hash, verify_password, create_access_token, get_current_user
+from app.utils.auth import password_hasher, create_access_token, get_current_user, user_cache
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    password_hasher.check_capacity()
+
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user_data.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user_data.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user, handing the connection back to the pool while hashing
+    await db.rollback()
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         email=user_data.email,
         name=user_data.name,
@@ -27,20 +31,38 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return user
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.hashed_password):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    password_hasher.check_capacity()
+
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+
+    # Hand the connection back to the pool while the hash runs
+    db.expunge(user)
+    await db.rollback()
+
+    valid, new_hash = await password_hasher.verify_and_update(credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
+    # Upgrade hashes made with deprecated schemes or parameters
+    if new_hash:
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+
     # More explicit check
     if user.is_active is False:
         raise HTTPException(
@@ -48,9 +70,18 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role})
     return Token(access_token=access_token, token_type="bearer", user=user)
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
+    return current_user
+
+@router.get("/cache-stats")
+async def get_user_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user_cache.stats()
\ No newline at end of file
@@ -1,38 +1,148 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Tuple
 from app.database import get_db
 from app.models.user import User
-from app.models.cart import Cart, CartItem
 from app.models.product import Product
-from app.schemas.cart import CartItemCreate, CartItemUpdate, CartResponse, CartItemResponse
+from app.models.order import Order, OrderItem
+from app.schemas.cart import CartItemCreate, CartItemUpdate, CartResponse, CartItemResponse, CartBulkUpdate
+from app.services.cart_store import cart_store
 from app.utils.auth import get_current_user
 
 router = APIRouter()
 
-def get_or_create_cart(user_id: int, db: Session):
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart:
-        cart = Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    return cart
+# Carts live in the cart store (see app.services.cart_store). A line's id is its
+# product id, and PUT/DELETE /items/{product_id} address lines by it; CartItem row
+# ids are rewritten on every write-back and are no longer exposed
+
+async def load_products(db: AsyncSession, product_ids) -> Dict[int, Product]:
+    if not product_ids:
+        return {}
+    products = await db.scalars(select(Product).where(Product.id.in_(product_ids)))
+    return {product.id: product for product in products}  # type: ignore
+
+def cart_line(product: Product, quantity: int) -> dict:
+    return {"id": product.id, "product_id": product.id, "quantity": quantity, "product": product}
+
+def cart_body(cart_id: int, user_id: int, lines: Dict[int, int], products: Dict[int, Product]) -> dict:
+    return {
+        "id": cart_id,
+        "user_id": user_id,
+        # Lines for products deleted since they were added are left out
+        "items": [
+            cart_line(products[product_id], quantity)
+            for product_id, quantity in lines.items()
+            if product_id in products
+        ],
+    }
+
+async def apply_operations(db: AsyncSession, user_id: int, operations: List[Tuple[str, int, int]]) -> dict:
+    """Apply (op, product_id, quantity) changes to a cart all-or-nothing.
+
+    Products for the cart and the operations come from one IN query, and
+    the resulting quantities are checked against stock in one pass before
+    anything is written. Returns the whole cart.
+    """
+    cart_id, lines = await cart_store.cart(db, user_id)
+    products = await load_products(db, {product_id for _, product_id, _ in operations} | set(lines))
+
+    missing = sorted({product_id for op, product_id, _ in operations if op != "remove" and product_id not in products})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Product not found", "product_ids": missing}
+        )
+
+    # Re-read after the query so changes made meanwhile are built on, not overwritten
+    lines = await cart_store.lines(user_id)
+    unloaded = set(lines) - set(products)
+    if unloaded:
+        # Lines added meanwhile need their products too, or the response would leave them out
+        products.update(await load_products(db, unloaded))
+    changes: Dict[int, int] = {}
+    for op, product_id, quantity in operations:
+        current = changes.get(product_id, lines.get(product_id, 0))
+        if op == "add":
+            changes[product_id] = current + quantity
+        elif op == "set":
+            changes[product_id] = quantity
+        else:
+            changes[product_id] = 0
+
+    shortages = [
+        {
+            "product_id": product_id,
+            "title": products[product_id].title,
+            "requested": quantity,
+            "available": products[product_id].stock,
+        }
+        for product_id, quantity in changes.items()
+        if quantity > 0 and products[product_id].stock < quantity  # type: ignore
+    ]
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Insufficient stock", "items": shortages}
+        )
+
+    await cart_store.apply(user_id, changes)
+    lines.update(changes)
+    return cart_body(cart_id, user_id, {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}, products)
 
 @router.get("/", response_model=CartResponse)
-def get_cart(
-    db: Session = Depends(get_db),
+async def get_cart(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cart = get_or_create_cart(current_user.id, db)  # type: ignore
-    return cart
+    cart_id, lines = await cart_store.cart(db, current_user.id)  # type: ignore
+    products = await load_products(db, list(lines))
+    return cart_body(cart_id, current_user.id, lines, products)  # type: ignore
+
+@router.patch("/items", response_model=CartResponse)
+async def update_cart_items(
+    update: CartBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    operations = [(operation.op, operation.product_id, operation.quantity) for operation in update.operations]
+    return await apply_operations(db, current_user.id, operations)  # type: ignore
+
+@router.post("/reorder/{order_id}", response_model=CartResponse)
+async def reorder(
+    order_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    owner_id = await db.scalar(select(Order.user_id).where(Order.id == order_id))
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+
+    if owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    rows = await db.execute(
+        select(OrderItem.product_id, OrderItem.quantity)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id == order_id)
+    )
+    # Products deleted since the order are skipped rather than failing the reorder
+    operations = [("add", product_id, quantity) for product_id, quantity in rows]
+    return await apply_operations(db, current_user.id, operations)  # type: ignore
 
 @router.post("/items", response_model=CartItemResponse)
-def add_to_cart(
+async def add_to_cart(
     item_data: CartItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == item_data.product_id).first()
+    product = await db.get(Product, item_data.product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,93 +155,57 @@ def add_to_cart(
             detail="Insufficient stock"
         )
 
-    cart = get_or_create_cart(current_user.id, db)  # type: ignore
-
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == item_data.product_id
-    ).first()
-
-    if existing_item:
-        existing_item.quantity = existing_item.quantity + item_data.quantity  # type: ignore
-        db.commit()
-        db.refresh(existing_item)
-        return existing_item
-    else:
-        cart_item = CartItem(
-            cart_id=cart.id,
-            product_id=item_data.product_id,
-            quantity=item_data.quantity
-        )
-        db.add(cart_item)
-        db.commit()
-        db.refresh(cart_item)
-        return cart_item
-
-@router.put("/items/{item_id}", response_model=CartItemResponse)
-def update_cart_item(
-    item_id: int,
+    await cart_store.ensure_loaded(db, current_user.id)  # type: ignore
+    quantity = await cart_store.add(current_user.id, product.id, item_data.quantity)  # type: ignore
+    return cart_line(product, quantity)
+
+@router.put("/items/{product_id}", response_model=CartItemResponse)
+async def update_cart_item(
+    product_id: int,
     item_data: CartItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cart = get_or_create_cart(current_user.id, db)  # type: ignore
+    _, lines = await cart_store.cart(db, current_user.id)  # type: ignore
+    product = await db.get(Product, product_id) if product_id in lines else None
 
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.cart_id == cart.id
-    ).first()
-
-    if not cart_item:
+    if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cart item not found"
         )
 
-    if cart_item.product.stock < item_data.quantity:  # type: ignore
+    if product.stock < item_data.quantity:  # type: ignore
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Insufficient stock"
         )
 
-    cart_item.quantity = item_data.quantity  # type: ignore
-    db.commit()
-    db.refresh(cart_item)
-
-    return cart_item
+    await cart_store.set(current_user.id, product_id, item_data.quantity)  # type: ignore
+    return cart_line(product, item_data.quantity)
 
-@router.delete("/items/{item_id}")
-def remove_from_cart(
-    item_id: int,
-    db: Session = Depends(get_db),
+@router.delete("/items/{product_id}")
+async def remove_from_cart(
+    product_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cart = get_or_create_cart(current_user.id, db)  # type: ignore
+    await cart_store.ensure_loaded(db, current_user.id)  # type: ignore
 
-    cart_item = db.query(CartItem).filter(
-        CartItem.id == item_id,
-        CartItem.cart_id == cart.id
-    ).first()
-
-    if not cart_item:
+    if not await cart_store.remove(current_user.id, product_id):  # type: ignore
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cart item not found"
         )
 
-    db.delete(cart_item)
-    db.commit()
-
     return {"message": "Item removed from cart"}
 
 @router.delete("/")
-def clear_cart(
-    db: Session = Depends(get_db),
+async def clear_cart(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cart = get_or_create_cart(current_user.id, db)  # type: ignore
-
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-    db.commit()
+    await cart_store.ensure_loaded(db, current_user.id)  # type: ignore
+    await cart_store.clear(current_user.id)  # type: ignore
 
-    return {"message": "Cart cleared"}
\ No newline at end of file
+    return {"message": "Cart cleared"}
@@ -1,33 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.category import Category
+from app.models.product import Product
 from app.schemas.category import CategoryCreate, CategoryResponse
+from app.services.catalog_version import catalog_generation, bump_catalog_generation
 from app.utils.auth import get_current_user
+from app.utils.http_cache import make_etag, validator_headers, is_not_modified, not_modified
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
+async def get_categories(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    generation, modified = await db.run_sync(catalog_generation)
+    headers = validator_headers(make_etag("categories", generation), modified)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    response.headers.update(headers)
+    categories = (await db.scalars(select(Category))).all()
     return categories
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = db.query(Category).filter(Category.id == category_id).first()
+async def get_category(category_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    generation, modified = await db.run_sync(catalog_generation)
+    headers = validator_headers(make_etag("category", generation, category_id), modified)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+    response.headers.update(headers)
     return category
 
 @router.post("/", response_model=CategoryResponse)
-def create_category(
+async def create_category(
     category_data: CategoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -37,7 +53,7 @@ def create_category(
         )
 
     # Check if category already exists
-    existing_category = db.query(Category).filter(Category.name == category_data.name).first()
+    existing_category = await db.scalar(select(Category).where(Category.name == category_data.name))
     if existing_category:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,15 +62,16 @@ def create_category(
 
     category = Category(**category_data.dict())
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.run_sync(bump_catalog_generation)
+    await db.commit()
+    await db.refresh(category)
 
     return category
 
 @router.delete("/{category_id}")
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -63,7 +80,7 @@ def delete_category(
             detail="Not enough permissions"
         )
 
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,13 +88,14 @@ def delete_category(
         )
 
     # Check if category has products
-    if category.products:
+    if await db.scalar(select(Product.id).where(Product.category_id == category_id).limit(1)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete category with associated products"
         )
 
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    await db.run_sync(bump_catalog_generation)
+    await db.commit()
 
     return {"message": "Category deleted successfully"}
\ No newline at end of file
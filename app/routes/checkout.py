@@ -1,97 +1,133 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, recent_writers
 from app.models.user import User
-from app.models.cart import Cart, CartItem
 from app.models.order import Order, OrderItem
 from app.models.product import Product
 from app.schemas.order import OrderResponse
+from app.services.cart_store import cart_store, write_carts
 from app.services.daftra_client import DaftraClient
+from app.services.inventory import StockContention, reserve_stock
+from app.services.invoice_outbox import enqueue_invoice
+from app.services.product_cache import product_cache
+from app.services.recommendations import record_order
+from app.services.sales_rollup import record_sales
 from app.utils.auth import get_current_user
+from app.utils.loaders import load_order
 
 router = APIRouter()
 
 @router.post("/", response_model=OrderResponse)
-async def checkout(  # Changed to async function
-    db: Session = Depends(get_db),
+async def checkout(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cart = db.query(Cart).filter(Cart.user_id == current_user.id).first()  # type: ignore
-
-    if not cart or not cart.items:
+    _, lines = await cart_store.cart(db, current_user.id)  # type: ignore
+    products = {
+        product.id: product
+        for product in await db.scalars(select(Product).where(Product.id.in_(lines)))
+    } if lines else {}
+    # Lines for products deleted since they were added are dropped
+    quantities = {product_id: quantity for product_id, quantity in lines.items() if product_id in products}
+
+    if not quantities:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cart is empty"
         )
 
-    # Validate stock and calculate total
+    # Snapshot prices; the store keeps one line per product. Everything needed
+    # later is copied out as plain values: a reservation retry rolls back,
+    # which expires the loaded products
     total_amount = 0
     order_items_data = []
 
-    for cart_item in cart.items:
-        product = cart_item.product
-
-        if product.stock < cart_item.quantity:  # type: ignore
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {product.title}"
-            )
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
 
-        item_total = product.price * cart_item.quantity  # type: ignore
+        item_total = product.price * quantity  # type: ignore
         total_amount += item_total
 
         order_items_data.append({
-            "product": product,
-            "quantity": cart_item.quantity,  # type: ignore
-            "price": product.price  # type: ignore
+            "product_id": product.id,
+            "category_id": product.category_id,
+            "daftra_item_id": product.daftra_item_id,
+            "quantity": quantity,
+            "price": product.price,  # type: ignore
+            "line_total": item_total,
+            "snapshot": {"title": product.title, "sku": product.sku, "image": (product.images or [None])[0]},
         })
 
-    # Create order
+    titles = {item_data["product_id"]: item_data["snapshot"]["title"] for item_data in order_items_data}
+    sales = [
+        (item_data["product_id"], item_data["category_id"], item_data["quantity"], item_data["price"])
+        for item_data in order_items_data
+    ]
+
+    # Take stock for all lines at once; concurrent checkouts can't oversell
+    try:
+        shortages = await db.run_sync(reserve_stock, quantities)
+    except StockContention:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock is changing, please try again",
+            headers={"Retry-After": "1"}
+        )
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Insufficient stock",
+                "items": [
+                    {
+                        "product_id": shortage.product_id,
+                        "title": titles[shortage.product_id],
+                        "requested": shortage.requested,
+                        "available": shortage.available,
+                    }
+                    for shortage in shortages
+                ],
+            }
+        )
+
+    # Create order and its items in the same transaction as the reservation
     order = Order(
         user_id=current_user.id,  # type: ignore
         total_amount=total_amount,
         status="pending"
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.flush()
 
-    # Create order items and update stock
     for item_data in order_items_data:
         order_item = OrderItem(
             order_id=order.id,
-            product_id=item_data["product"].id,  # type: ignore
+            product_id=item_data["product_id"],
             quantity=item_data["quantity"],
-            price=item_data["price"]
+            price=item_data["price"],
+            line_total=item_data["line_total"],
+            **item_data["snapshot"]
         )
         db.add(order_item)
 
-        # Update product stock
-        current_stock = item_data["product"].stock  # type: ignore
-        setattr(item_data["product"], 'stock', current_stock - item_data["quantity"])
-
-    # Clear cart
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-
-    # Create invoice in Daftra
-    try:
-        daftra_client = DaftraClient()
-        invoice_data = await daftra_client.prepare_invoice_data(order, current_user, order_items_data)
-        daftra_response = await daftra_client.create_invoice(invoice_data)
-
-        # Extract invoice ID from response (adjust based on Daftra API response structure)
-        invoice_id = daftra_response.get("id") or daftra_response.get("invoice_id")
+    # Learn co-purchases from this order
+    await db.flush()
+    await db.run_sync(record_order, [item_data["product_id"] for item_data in order_items_data])
+    await db.run_sync(record_sales, sales)
 
-        if invoice_id:
-            setattr(order, 'daftra_invoice_id', str(invoice_id))  # Fixed: Use setattr
-            setattr(order, 'status', "completed")  # Fixed: Use setattr
+    # Write the emptied cart back in the same transaction as the order
+    await db.run_sync(write_carts, {current_user.id: {}})
 
-    except Exception as e:
-        # Log the error but don't fail the order creation
-        print(f"Daftra invoice creation failed: {str(e)}")
-        setattr(order, 'status', "completed")  # Fixed: Use setattr
+    # Queue the Daftra invoice; the outbox worker sends it after commit
+    invoice_data = await DaftraClient().prepare_invoice_data(order, current_user, order_items_data)
+    enqueue_invoice(db, order, invoice_data)
+    setattr(order, 'status', "completed")  # Fixed: Use setattr
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await cart_store.checked_out(current_user.id, quantities)  # type: ignore
+    # Replicas may not have the order yet; the user's order reads use the primary for a while
+    await recent_writers.mark(current_user.id)  # type: ignore
+    await product_cache.invalidate_products(quantities.keys())
 
-    return order
\ No newline at end of file
+    return await db.run_sync(load_order, order.id)  # type: ignore
\ No newline at end of file
@@ -1,33 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.database import read_session, recent_writers
 from app.models.user import User
 from app.models.order import Order
 from app.schemas.order import OrderResponse
+from app.services.order_reports import filter_orders, export_orders
 from app.utils.auth import get_current_user
+from app.utils.fast_json import FAST_JSON, ORDER_COLUMNS, orders_json
+from app.utils.loaders import ORDER_PLAN, load_order
+from app.utils.pagination import encode_cursor, decode_cursor, datetime_bound, keyset_after
 
 router = APIRouter()
 
+async def get_orders_db(current_user: User = Depends(get_current_user)):
+    """Replica session, except on the primary for users who just checked out."""
+    async with await read_session(primary=await recent_writers.active(current_user.id)) as db:  # type: ignore
+        yield db
+
 @router.get("/", response_model=List[OrderResponse])
-def get_orders(
-    db: Session = Depends(get_db),
+async def get_orders(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    order_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_orders_db),
     current_user: User = Depends(get_current_user)
 ):
-    if current_user.role == "admin":  # type: ignore
-        orders = db.query(Order).order_by(Order.created_at.desc()).all()
-    else:
-        orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()  # type: ignore
+    dialect = db.get_bind().dialect.name
+    query = select(*ORDER_COLUMNS) if FAST_JSON else select(Order).options(*ORDER_PLAN)
+
+    if current_user.role != "admin":  # type: ignore
+        query = query.filter(Order.user_id == current_user.id)  # type: ignore
+
+    query = filter_orders(query, dialect, order_status, created_from, created_to)
+
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        column, value = datetime_bound(Order.created_at, created_at, dialect)
+        query = query.filter(keyset_after(column, value, Order.id, order_id, descending=True))
 
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1))
+    orders = result.all() if FAST_JSON else result.scalars().all()
+
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at.isoformat(), last.id)
+
+    if FAST_JSON:
+        body = await db.run_sync(orders_json, orders)
+        return Response(content=body, media_type="application/json", headers=dict(response.headers))
     return orders
 
+@router.get("/export")
+async def export(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    order_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":  # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return StreamingResponse(
+        export_orders(format, order_status, created_from, created_to),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
+
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_orders_db),
     current_user: User = Depends(get_current_user)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.run_sync(load_order, order_id)
 
     if not order:
         raise HTTPException(
@@ -42,4 +107,4 @@ def get_order(
             detail="Not enough permissions"
         )
 
-    return order
\ No newline at end of file
+    return order
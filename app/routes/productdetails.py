@@ -1,35 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_read_db
 from app.models.product import Product
 from app.schemas.product import ProductResponse
+from app.services.catalog_version import product_version, sales_version
+from app.services.product_cache import load_product_json
+from app.services.recommendations import related_products
+from app.utils.http_cache import make_etag, validator_headers, is_not_modified, not_modified
 
 router = APIRouter()
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product_details(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def get_product_details(product_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    version = await db.run_sync(product_version, product_id)
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+
+    headers = validator_headers(make_etag("product", product_id, *version), version[1])
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    body = await load_product_json(db, product_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/{product_id}/related", response_model=List[ProductResponse])
-def get_related_products(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def get_related_products(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    # Related lists depend on other products and on orders
+    generation, last_order, modified = await db.run_sync(sales_version)
+    headers = validator_headers(make_etag("related", generation, last_order, datetime.utcnow().date(), product_id), modified)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
 
-    # Get products from the same category, excluding the current product
-    related_products = db.query(Product).filter(
-        Product.category_id == product.category_id,
-        Product.id != product_id
-    ).limit(4).all()
-
-    return related_products
\ No newline at end of file
+    # Products most often bought together, topped up from the same category
+    response.headers.update(headers)
+    return await db.run_sync(related_products, product)
\ No newline at end of file
@@ -1,43 +1,224 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import asyncio
+import tempfile
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
+from app.models.cart import CartItem
 from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductImportReport
+from app.services.cart_store import cart_store
+from app.services.catalog_version import bump_catalog_generation, product_version, sales_version
+from app.services.product_cache import product_cache, load_product_json, serialize_products
+from app.services.product_io import import_products, export_products
+from app.services.recommendations import remove_product_neighbors
+from app.services.sales_rollup import best_sellers
+from app.services.search import index_product, remove_product, search_products
 from app.utils.auth import get_current_user
+from app.utils.fast_json import FAST_JSON, PRODUCT_COLUMNS, products_json
+from app.utils.http_cache import make_etag, validator_headers, is_not_modified, not_modified
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after
 
 router = APIRouter()
 
+# Uploads bigger than this are spooled to a temporary file before import
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+FORMAT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+SORT_COLUMNS = {
+    "id": Product.id,
+    "price": Product.price,
+    "title": Product.title,
+}
+
 @router.get("/", response_model=List[ProductResponse])
-def get_products(
+async def get_products(
+    request: Request,
     category_id: Optional[int] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = Query(None),
+    sort: str = Query("id", pattern="^-?(id|price|title)$"),
+    cursor: Optional[str] = Query(None),
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Product)
+    shape = {
+        "category_id": category_id, "min_price": min_price, "max_price": max_price,
+        "in_stock": in_stock, "sort": sort, "cursor": cursor, "skip": skip, "limit": limit,
+    }
+
+    # Answer revalidations from the catalog and sales versions alone; pages show stock
+    catalog, last_order, modified = await db.run_sync(sales_version)
+    headers = validator_headers(make_etag("products", catalog, last_order, sorted(shape.items())), modified)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    # Serve pre-serialized pages straight from the cache after warm-up
+    generation = await product_cache.generation()
+    cached = await product_cache.get_list(shape, generation)
+    if cached is not None:
+        return _list_response(*cached, headers)
+
+    query = select(*PRODUCT_COLUMNS) if FAST_JSON else select(Product)
 
     if category_id:
         query = query.filter(Product.category_id == category_id)
 
-    products = query.offset(skip).limit(limit).all()
-    return products
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+
+    if in_stock is not None:
+        query = query.filter(Product.stock > 0 if in_stock else Product.stock <= 0)
+
+    descending = sort.startswith("-")
+    sort_key = sort.lstrip("-")
+    column = SORT_COLUMNS[sort_key]
+
+    if cursor:
+        cursor_sort, value, product_id = decode_cursor(cursor, 3)
+        if cursor_sort != sort:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor does not match sort order"
+            )
+        query = query.filter(keyset_after(column, value, Product.id, product_id, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    if descending:
+        query = query.order_by(column.desc(), Product.id.desc())
+    else:
+        query = query.order_by(column.asc(), Product.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(query.limit(limit + 1))
+    products = result.all() if FAST_JSON else result.scalars().all()
+
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        last = products[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort_key), last.id)
+
+    body = products_json(products) if FAST_JSON else serialize_products(products)
+    await product_cache.set_list(shape, generation, body, next_cursor, db.info.get("staleness", 0))
+    return _list_response(body, next_cursor, headers)
+
+def _list_response(body: bytes, next_cursor: Optional[str], headers: dict) -> Response:
+    if next_cursor:
+        headers = {**headers, "X-Next-Cursor": next_cursor}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/search", response_model=List[ProductResponse])
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    catalog, last_order, modified = await db.run_sync(sales_version)
+    headers = validator_headers(make_etag("search", catalog, last_order, q, limit), modified)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    response.headers.update(headers)
+    return await db.run_sync(search_products, q, limit)
+
+@router.get("/best-sellers", response_model=List[ProductResponse])
+async def get_best_sellers(
+    request: Request,
+    response: Response,
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # The ranking also moves at midnight, when the window of days slides
+    catalog, last_order, modified = await db.run_sync(sales_version)
+    headers = validator_headers(
+        make_etag("best-sellers", catalog, last_order, datetime.utcnow().date(), days, limit, category_id), modified
+    )
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    response.headers.update(headers)
+    return await db.run_sync(best_sellers, days, limit, category_id)
+
+@router.post("/import", response_model=ProductImportReport)
+async def import_catalog(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+
+    # Read the body as it arrives, then parse and upsert off the event loop
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        return await asyncio.to_thread(import_products, upload, format)
+
+@router.get("/export")
+async def export_catalog(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return StreamingResponse(
+        export_products(format),
+        media_type=FORMAT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'}
+    )
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def get_product(product_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    version = await db.run_sync(product_version, product_id)
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+
+    headers = validator_headers(make_etag("product", product_id, *version), version[1])
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    body = await load_product_json(db, product_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/", response_model=ProductResponse)
-def create_product(
+async def create_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -47,7 +228,7 @@ def create_product(
         )
 
     # Check if SKU already exists
-    existing_product = db.query(Product).filter(Product.sku == product_data.sku).first()
+    existing_product = await db.scalar(select(Product).where(Product.sku == product_data.sku))
     if existing_product:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,16 +237,20 @@ def create_product(
 
     product = Product(**product_data.dict())
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.flush()
+    await db.run_sync(index_product, product)
+    await db.run_sync(bump_catalog_generation)
+    await db.commit()
+    await product_cache.invalidate_products([product.id])  # type: ignore
+    await db.refresh(product)
 
     return product
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product(
+async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -74,7 +259,7 @@ def update_product(
             detail="Not enough permissions"
         )
 
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,15 +270,19 @@ def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
 
-    db.commit()
-    db.refresh(product)
+    await db.flush()
+    await db.run_sync(index_product, product)
+    await db.run_sync(bump_catalog_generation)
+    await db.commit()
+    await product_cache.invalidate_products([product.id])  # type: ignore
+    await db.refresh(product)
 
     return product
 
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "admin":
@@ -102,14 +291,21 @@ def delete_product(
             detail="Not enough permissions"
         )
 
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
 
-    db.delete(product)
-    db.commit()
+    await db.run_sync(remove_product, product_id)
+    await db.run_sync(remove_product_neighbors, product_id)
+    await db.execute(delete(CartItem).where(CartItem.product_id == product_id))
+    await db.delete(product)
+    await db.run_sync(bump_catalog_generation)
+    await db.commit()
+    await product_cache.invalidate_products([product_id])
+    # Stored carts would otherwise write the line back on their next flush
+    await cart_store.remove_product(product_id)
 
     return {"message": "Product deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.database import get_db
+from app.models.user import User
+from app.schemas.product import ProductResponse
+from app.schemas.recommendation import BulkRecommendationRequest, UserRecommendations
+from app.services.cart_store import cart_store
+from app.services.recommendations import recommend_for_users
+from app.utils.auth import get_current_user
+
+router = APIRouter()
+
+@router.get("/me", response_model=List[ProductResponse])
+async def get_my_recommendations(
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    stored_carts = await cart_store.loaded_lines([current_user.id])  # type: ignore
+    recommendations = await db.run_sync(recommend_for_users, [current_user.id], limit, stored_carts)
+    return recommendations[current_user.id]  # type: ignore
+
+@router.post("/bulk", response_model=List[UserRecommendations])
+async def get_bulk_recommendations(
+    request: BulkRecommendationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    user_ids = list(dict.fromkeys(request.user_ids))
+    stored_carts = await cart_store.loaded_lines(user_ids)
+    recommendations = await db.run_sync(recommend_for_users, user_ids, request.limit, stored_carts)
+    return [
+        UserRecommendations(user_id=user_id, products=products)
+        for user_id, products in recommendations.items()
+    ]
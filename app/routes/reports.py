@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_read_db
+from app.models.user import User
+from app.schemas.report import DailyRevenue, CategoryRevenue, ProductSales
+from app.services.order_reports import revenue_by_day, revenue_by_category, top_products
+from app.utils.auth import get_current_user
+
+router = APIRouter()
+
+# Aggregated in the database with GROUP BY; cancelled orders are left out unless ?status= asks for them
+
+@router.get("/revenue/daily", response_model=List[DailyRevenue])
+async def daily_revenue(
+    order_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":  # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return await db.run_sync(revenue_by_day, order_status, created_from, created_to)
+
+@router.get("/revenue/categories", response_model=List[CategoryRevenue])
+async def category_revenue(
+    order_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":  # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return await db.run_sync(revenue_by_category, order_status, created_from, created_to)
+
+@router.get("/top-products", response_model=List[ProductSales])
+async def best_selling_products(
+    limit: int = Query(20, ge=1, le=200),
+    by: str = Query("revenue", pattern="^(revenue|units)$"),
+    order_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":  # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    return await db.run_sync(top_products, limit, by, order_status, created_from, created_to)
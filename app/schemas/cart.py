@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from app.schemas.product import ProductResponse
 
 class CartItemBase(BaseModel):
@@ -12,8 +12,17 @@ class CartItemCreate(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: int
 
+class CartItemOperation(BaseModel):
+    op: Literal["add", "set", "remove"]
+    product_id: int
+    quantity: int = Field(1, ge=0)
+
+class CartBulkUpdate(BaseModel):
+    operations: List[CartItemOperation] = Field(..., min_length=1, max_length=500)
+
 class CartItemResponse(CartItemBase):
-    id: int
+    # Lines are keyed by product, so this equals product_id; it is what /items/{product_id} takes
+    id: int = Field(..., description="The line's product id, used by PUT and DELETE /api/cart/items/{product_id}")
     product: ProductResponse
 
     class Config:
@@ -1,7 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from app.schemas.product import ProductResponse
 
 class OrderItemBase(BaseModel):
     product_id: int
@@ -10,7 +9,11 @@ class OrderItemBase(BaseModel):
 
 class OrderItemResponse(OrderItemBase):
     id: int
-    product: ProductResponse
+    # Product as it was at checkout; later edits and deletes don't change it
+    title: Optional[str] = None
+    sku: Optional[str] = None
+    image: Optional[str] = None
+    line_total: float
 
     class Config:
         from_attributes = True
@@ -28,4 +28,19 @@ class ProductResponse(ProductBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProductImportRow(ProductBase):
+    # Category by name; resolved to category_id by the importer
+    category: Optional[str] = None
+
+class ProductImportError(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportReport(BaseModel):
+    rows: int
+    upserted: int
+    failed: int
+    errors: List[ProductImportError]
@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+from typing import List
+from app.schemas.product import ProductResponse
+
+class BulkRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    limit: int = Field(10, ge=1, le=50)
+
+class UserRecommendations(BaseModel):
+    user_id: int
+    products: List[ProductResponse]
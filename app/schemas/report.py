@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class DailyRevenue(BaseModel):
+    day: str
+    orders: int
+    revenue: float
+
+class CategoryRevenue(BaseModel):
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    units: int
+    revenue: float
+
+class ProductSales(BaseModel):
+    product_id: int
+    sku: Optional[str] = None
+    title: str
+    units: int
+    revenue: float
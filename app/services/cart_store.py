@@ -0,0 +1,466 @@
+import os
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.cart import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+CART_STORE_BACKEND = os.getenv("CART_STORE_BACKEND", "memory")  # memory, redis or fake
+CART_FLUSH_INTERVAL = float(os.getenv("CART_FLUSH_INTERVAL", "2"))
+CART_FLUSH_BATCH_SIZE = int(os.getenv("CART_FLUSH_BATCH_SIZE", "500"))
+# Flushes in a row a cart may fail before it is dropped from write-back
+CART_FLUSH_MAX_FAILURES = int(os.getenv("CART_FLUSH_MAX_FAILURES", "5"))
+# Written-back carts idle this long leave the store and reload from the database on next access
+CART_STORE_TTL = float(os.getenv("CART_STORE_TTL", "3600"))
+CART_STORE_MAX_CARTS = int(os.getenv("CART_STORE_MAX_CARTS", "100000"))
+
+class MemoryCartBackend:
+    """Carts as {user_id: {product_id: quantity}} in this process.
+
+    Only correct with a single app process; use the redis backend when
+    running several workers so they all see the same carts. Like the Redis
+    backend's TTL, carts written back and not changed for CART_STORE_TTL
+    seconds are evicted, as are the least recently changed beyond
+    CART_STORE_MAX_CARTS; they reload on next access.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float = CART_STORE_TTL, max_carts: int = CART_STORE_MAX_CARTS):
+        self.ttl = ttl
+        self.max_carts = max_carts
+        self.carts: Dict[int, Dict[int, int]] = {}
+        self.cart_ids: Dict[int, int] = {}
+        # {user_id: last change or load}, oldest first
+        self.touched: "OrderedDict[int, float]" = OrderedDict()
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def _touch(self, user_id: int):
+        self.touched[user_id] = time.monotonic()
+        self.touched.move_to_end(user_id)
+
+    def is_loaded(self, user_id: int) -> bool:
+        with self.lock:
+            # A cart without its id was changed after eviction and still needs loading
+            if user_id not in self.cart_ids:
+                return False
+            # Callers mutate right after this check; keep the cart from being evicted in between
+            self._touch(user_id)
+            return True
+
+    def load(self, user_id: int, cart_id: int, lines: Dict[int, int]):
+        with self.lock:
+            if user_id not in self.cart_ids:
+                cart = self.carts.setdefault(user_id, {})
+                if cart:
+                    # A change raced ahead of this load; keep it and write the merged cart back
+                    self.dirty.add(user_id)
+                for product_id, quantity in lines.items():
+                    cart.setdefault(product_id, quantity)
+                self.cart_ids[user_id] = cart_id
+            self._touch(user_id)
+
+    def cart(self, user_id: int) -> Tuple[Optional[int], Dict[int, int]]:
+        with self.lock:
+            return self.cart_ids.get(user_id), dict(self.carts.get(user_id, {}))
+
+    def lines(self, user_id: int) -> Dict[int, int]:
+        return self.cart(user_id)[1]
+
+    def add(self, user_id: int, product_id: int, quantity: int) -> int:
+        with self.lock:
+            lines = self.carts.setdefault(user_id, {})
+            lines[product_id] = lines.get(product_id, 0) + quantity
+            if lines[product_id] <= 0:
+                del lines[product_id]
+            self.dirty.add(user_id)
+            self._touch(user_id)
+            return lines.get(product_id, 0)
+
+    def set(self, user_id: int, product_id: int, quantity: int):
+        with self.lock:
+            self.carts.setdefault(user_id, {})[product_id] = quantity
+            self.dirty.add(user_id)
+            self._touch(user_id)
+
+    def apply(self, user_id: int, lines: Dict[int, int]):
+        with self.lock:
+            cart = self.carts.setdefault(user_id, {})
+            for product_id, quantity in lines.items():
+                if quantity > 0:
+                    cart[product_id] = quantity
+                else:
+                    cart.pop(product_id, None)
+            self.dirty.add(user_id)
+            self._touch(user_id)
+
+    def remove(self, user_id: int, product_id: int) -> bool:
+        with self.lock:
+            removed = self.carts.get(user_id, {}).pop(product_id, None) is not None
+            if removed:
+                self.dirty.add(user_id)
+                self._touch(user_id)
+            return removed
+
+    def clear(self, user_id: int):
+        with self.lock:
+            self.carts[user_id] = {}
+            self.dirty.add(user_id)
+            self._touch(user_id)
+
+    def remove_product(self, product_id: int) -> int:
+        with self.lock:
+            user_ids = [user_id for user_id, lines in self.carts.items() if lines.pop(product_id, None) is not None]
+            self.dirty.update(user_ids)
+            return len(user_ids)
+
+    def mark_dirty(self, user_ids: List[int]):
+        with self.lock:
+            self.dirty.update(user_ids)
+
+    def take_dirty(self, limit: int) -> List[int]:
+        with self.lock:
+            return [self.dirty.pop() for _ in range(min(limit, len(self.dirty)))]
+
+    def evict(self) -> int:
+        """Drop idle and least recently used carts; carts waiting to be written back stay."""
+        now = time.monotonic()
+        evicted = 0
+        with self.lock:
+            excess = len(self.carts) - self.max_carts
+            for user_id, touched in list(self.touched.items()):
+                if excess - evicted <= 0 and now - touched < self.ttl:
+                    break
+                if user_id in self.dirty:
+                    continue
+                del self.touched[user_id]
+                self.carts.pop(user_id, None)
+                self.cart_ids.pop(user_id, None)
+                evicted += 1
+        return evicted
+
+class RedisCartBackend:
+    """One Redis hash per cart ({product_id: quantity} plus the cart id) and a
+    set of carts waiting to be written back. Works with FakeRedis too.
+
+    Every write renews the hash's TTL (CART_STORE_TTL), so idle carts expire
+    from Redis and reload from the database on next access.
+    """
+
+    CART_ID_FIELD = "_id"
+    # Calls are network round trips; CartStore runs them off the event loop
+    blocking = True
+
+    def __init__(self, client, prefix: str = "cart:", ttl: float = CART_STORE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = int(ttl)
+        self.dirty_key = prefix + "dirty"
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def is_loaded(self, user_id: int) -> bool:
+        # The cart id field keeps the hash alive even when the cart is empty. Renewing
+        # the TTL doubles as the existence check and keeps the cart from expiring
+        # before the mutation that usually follows.
+        return bool(self.client.expire(self._key(user_id), self.ttl))
+
+    def load(self, user_id: int, cart_id: int, lines: Dict[int, int]):
+        # HSETNX so a mutation that raced ahead of this load is not overwritten
+        key = self._key(user_id)
+        raced = self.client.exists(key)
+        if self.client.hsetnx(key, self.CART_ID_FIELD, cart_id):
+            for product_id, quantity in lines.items():
+                self.client.hsetnx(key, product_id, quantity)
+            if raced:
+                self.client.sadd(self.dirty_key, user_id)
+        self.client.expire(key, self.ttl)
+
+    def cart(self, user_id: int) -> Tuple[Optional[int], Dict[int, int]]:
+        fields = self.client.hgetall(self._key(user_id))
+        cart_id = fields.pop(self.CART_ID_FIELD.encode(), None)
+        return (
+            int(cart_id) if cart_id is not None else None,
+            {int(field): int(value) for field, value in fields.items()},
+        )
+
+    def lines(self, user_id: int) -> Dict[int, int]:
+        return self.cart(user_id)[1]
+
+    def add(self, user_id: int, product_id: int, quantity: int) -> int:
+        key = self._key(user_id)
+        total = self.client.hincrby(key, product_id, quantity)
+        if total <= 0:
+            self.client.hdel(key, product_id)
+        self.client.expire(key, self.ttl)
+        self.client.sadd(self.dirty_key, user_id)
+        return max(total, 0)
+
+    def set(self, user_id: int, product_id: int, quantity: int):
+        key = self._key(user_id)
+        self.client.hset(key, product_id, quantity)
+        self.client.expire(key, self.ttl)
+        self.client.sadd(self.dirty_key, user_id)
+
+    def apply(self, user_id: int, lines: Dict[int, int]):
+        key = self._key(user_id)
+        updates = {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+        removals = [product_id for product_id, quantity in lines.items() if quantity <= 0]
+        # MULTI/EXEC on a real server; FakeRedis has no pipeline and is single-process anyway
+        pipeline = self.client.pipeline(transaction=True) if hasattr(self.client, "pipeline") else self.client
+        if updates:
+            pipeline.hset(key, mapping=updates)
+        if removals:
+            pipeline.hdel(key, *removals)
+        pipeline.expire(key, self.ttl)
+        pipeline.sadd(self.dirty_key, user_id)
+        if pipeline is not self.client:
+            pipeline.execute()
+
+    def remove(self, user_id: int, product_id: int) -> bool:
+        key = self._key(user_id)
+        removed = bool(self.client.hdel(key, product_id))
+        if removed:
+            self.client.expire(key, self.ttl)
+            self.client.sadd(self.dirty_key, user_id)
+        return removed
+
+    def clear(self, user_id: int):
+        key = self._key(user_id)
+        fields = [field for field in self.client.hgetall(key) if field != self.CART_ID_FIELD.encode()]
+        if fields:
+            self.client.hdel(key, *fields)
+        self.client.expire(key, self.ttl)
+        self.client.sadd(self.dirty_key, user_id)
+
+    def remove_product(self, product_id: int) -> int:
+        # No index from products to carts, so this scans every cart; product deletes are rare
+        removed = 0
+        for key in self.client.scan_iter(match=f"{self.prefix}*", count=1000):
+            key = key.decode() if isinstance(key, bytes) else key
+            if key != self.dirty_key and self.client.hdel(key, product_id):
+                self.client.sadd(self.dirty_key, key[len(self.prefix):])
+                removed += 1
+        return removed
+
+    def mark_dirty(self, user_ids: List[int]):
+        if user_ids:
+            self.client.sadd(self.dirty_key, *user_ids)
+
+    def take_dirty(self, limit: int) -> List[int]:
+        return [int(user_id) for user_id in self.client.spop(self.dirty_key, limit) or []]
+
+    def evict(self) -> int:
+        # Redis expires idle carts itself
+        return 0
+
+class CartStore:
+    """Carts served from a fast store and written back to carts/cart_items.
+
+    Reads and mutations touch only the store. The first access for a user
+    loads their cart from the database; after that, changed carts are
+    written back in batches by CartFlushWorker and at checkout. A cart line
+    is identified by its product id.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # {user_id: flushes failed in a row}, for carts the database rejects
+        self.failures: Dict[int, int] = {}
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def cart(self, db: AsyncSession, user_id: int) -> Tuple[int, Dict[int, int]]:
+        """(cart id, {product_id: quantity}), loading the cart on first access."""
+        cart_id, lines = await self._call(self.backend.cart, user_id)
+        if cart_id is None:
+            await self._load(db, user_id)
+            cart_id, lines = await self._call(self.backend.cart, user_id)
+        return cart_id, lines  # type: ignore
+
+    async def ensure_loaded(self, db: AsyncSession, user_id: int):
+        """Call before mutating so the first change lands on the stored cart, not an empty one."""
+        if not await self._call(self.backend.is_loaded, user_id):
+            await self._load(db, user_id)
+
+    async def _load(self, db: AsyncSession, user_id: int):
+        cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == user_id))
+        if cart_id is None:
+            # Once per user: the cart row gives the cart its stable id
+            cart = Cart(user_id=user_id)
+            db.add(cart)
+            try:
+                await db.commit()
+                cart_id = cart.id
+            except IntegrityError:
+                await db.rollback()
+                cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == user_id))
+        rows = await db.execute(
+            select(CartItem.product_id, func.sum(CartItem.quantity))
+            .where(CartItem.cart_id == cart_id)
+            .group_by(CartItem.product_id)
+        )
+        await self._call(self.backend.load, user_id, cart_id, {product_id: int(quantity) for product_id, quantity in rows})
+
+    async def lines(self, user_id: int) -> Dict[int, int]:
+        return await self._call(self.backend.lines, user_id)
+
+    def _loaded_lines(self, user_ids: List[int]) -> Dict[int, Dict[int, int]]:
+        return {user_id: self.backend.lines(user_id) for user_id in user_ids if self.backend.is_loaded(user_id)}
+
+    async def loaded_lines(self, user_ids: List[int]) -> Dict[int, Dict[int, int]]:
+        """{user_id: lines} for those of `user_ids` whose cart is in the store."""
+        return await self._call(self._loaded_lines, user_ids)
+
+    async def add(self, user_id: int, product_id: int, quantity: int) -> int:
+        return await self._call(self.backend.add, user_id, product_id, quantity)
+
+    async def set(self, user_id: int, product_id: int, quantity: int):
+        await self._call(self.backend.set, user_id, product_id, quantity)
+
+    async def apply(self, user_id: int, lines: Dict[int, int]):
+        """Set several lines at once ({product_id: quantity}, 0 removes) as one change."""
+        await self._call(self.backend.apply, user_id, lines)
+
+    async def remove(self, user_id: int, product_id: int) -> bool:
+        return await self._call(self.backend.remove, user_id, product_id)
+
+    async def clear(self, user_id: int):
+        await self._call(self.backend.clear, user_id)
+
+    async def remove_product(self, product_id: int) -> int:
+        """Take a deleted product out of every stored cart; returns how many carts had it."""
+        return await self._call(self.backend.remove_product, product_id)
+
+    def _checked_out(self, user_id: int, lines: Dict[int, int]):
+        for product_id, quantity in lines.items():
+            self.backend.add(user_id, product_id, -quantity)
+
+    async def checked_out(self, user_id: int, lines: Dict[int, int]):
+        """Take ordered quantities out, keeping anything added during checkout."""
+        await self._call(self._checked_out, user_id, lines)
+
+    def flush(self, limit: int = CART_FLUSH_BATCH_SIZE) -> int:
+        """Write up to `limit` changed carts back to the database.
+
+        The batch is written in one transaction. If the database rejects it,
+        each cart is written in its own transaction so one bad cart can't hold
+        back the rest (see _write_each). Idle carts already written back are
+        then evicted from the store.
+        """
+        user_ids = self.backend.take_dirty(limit)
+        if user_ids:
+            self._flush(user_ids)
+        self.backend.evict()
+        return len(user_ids)
+
+    def _flush(self, user_ids: List[int]):
+        try:
+            carts = {}
+            for user_id in user_ids:
+                cart_id, lines = self.backend.cart(user_id)
+                # Without its cart id the cart left the store after it changed; writing
+                # what's left would wipe the stored items, and the next load merges it back
+                if cart_id is not None:
+                    carts[user_id] = lines
+            try:
+                if carts:
+                    self._write(carts)
+                if self.failures:
+                    for user_id in user_ids:
+                        self.failures.pop(user_id, None)
+            except (IntegrityError, DataError):
+                self._write_each(carts)
+        except Exception:
+            self.backend.mark_dirty(user_ids)
+            raise
+
+    def _write(self, carts: Dict[int, Dict[int, int]]):
+        with SessionLocal() as db:
+            write_carts(db, carts)
+            db.commit()
+
+    def _write_each(self, carts: Dict[int, Dict[int, int]]):
+        """Write carts one transaction each. Rejected carts are retried on the
+        next flushes; after CART_FLUSH_MAX_FAILURES in a row a cart is logged
+        and left out of write-back until it changes again.
+        """
+        retry = []
+        for user_id, lines in carts.items():
+            try:
+                self._write({user_id: lines})
+            except (IntegrityError, DataError) as e:
+                failures = self.failures.get(user_id, 0) + 1
+                if failures < CART_FLUSH_MAX_FAILURES:
+                    self.failures[user_id] = failures
+                    retry.append(user_id)
+                    continue
+                self.failures.pop(user_id, None)
+                logger.error("Cart of user %s failed to write back %d times in a row, dropped from write-back: %s",
+                             user_id, failures, getattr(e, "orig", e))
+            else:
+                self.failures.pop(user_id, None)
+        self.backend.mark_dirty(retry)
+
+def write_carts(db: Session, carts: Dict[int, Dict[int, int]]):
+    """Replace the stored items of each {user_id: {product_id: quantity}} cart."""
+    user_ids = list(carts)
+    cart_ids = dict(db.query(Cart.user_id, Cart.id).filter(Cart.user_id.in_(user_ids)).all())
+    missing = [user_id for user_id in user_ids if user_id not in cart_ids]
+    if missing:
+        db.execute(insert(Cart), [{"user_id": user_id} for user_id in missing])
+        cart_ids.update(db.query(Cart.user_id, Cart.id).filter(Cart.user_id.in_(missing)).all())
+
+    db.query(CartItem).filter(CartItem.cart_id.in_(cart_ids.values())).delete(synchronize_session=False)
+    items = [
+        {"cart_id": cart_ids[user_id], "product_id": product_id, "quantity": quantity}
+        for user_id, lines in carts.items()
+        for product_id, quantity in lines.items()
+    ]
+    if items:
+        db.execute(insert(CartItem), items)
+
+class CartFlushWorker:
+    """Periodically writes changed carts back to carts/cart_items."""
+
+    def __init__(self, store: Optional[CartStore] = None):
+        self.store = store or cart_store
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(CART_FLUSH_INTERVAL)
+            try:
+                while await asyncio.to_thread(self.store.flush) >= CART_FLUSH_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("Cart flush failed")
+
+    async def drain(self):
+        """Flush everything still pending, e.g. on shutdown."""
+        while await asyncio.to_thread(self.store.flush):
+            pass
+
+def _make_backend():
+    if CART_STORE_BACKEND == "redis":
+        from app.services.redis_client import get_redis
+        return RedisCartBackend(get_redis())
+    if CART_STORE_BACKEND == "fake":
+        from app.services.redis_client import FakeRedis
+        return RedisCartBackend(FakeRedis())
+    return MemoryCartBackend()
+
+cart_store = CartStore(_make_backend())
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.catalog import CatalogState
+from app.models.order import Order
+from app.models.product import Product
+
+def catalog_generation(db: Session) -> Tuple[int, Optional[datetime]]:
+    row = db.query(CatalogState.generation, CatalogState.updated_at).filter(CatalogState.id == 1).first()
+    return (row[0], row[1]) if row else (0, None)
+
+def bump_catalog_generation(db: Session):
+    """Mark the catalog as changed; runs in the caller's transaction."""
+    bumped = db.execute(
+        update(CatalogState).where(CatalogState.id == 1).values(generation=CatalogState.generation + 1)
+    ).rowcount
+    if not bumped:
+        db.add(CatalogState(id=1, generation=1))
+        db.flush()
+
+def sales_version(db: Session) -> Tuple[int, int, Optional[datetime]]:
+    """(catalog generation, latest order id, last change) for lists that show stock or rank by sales.
+
+    Checkouts move stock without bumping the catalog generation, so the
+    latest order id is what moves when units sell. One round trip.
+    """
+    latest_order = select(Order).order_by(Order.id.desc()).limit(1)
+    generation, catalog_modified, last_order, sold_at = db.execute(select(
+        select(CatalogState.generation).where(CatalogState.id == 1).scalar_subquery(),
+        select(CatalogState.updated_at).where(CatalogState.id == 1).scalar_subquery(),
+        latest_order.with_only_columns(Order.id).scalar_subquery(),
+        latest_order.with_only_columns(Order.created_at).scalar_subquery(),
+    )).one()
+    modified = max((timestamp for timestamp in (catalog_modified, sold_at) if timestamp is not None), default=None)
+    return generation or 0, last_order or 0, modified
+
+def product_version(db: Session, product_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+    row = db.query(Product.version, Product.updated_at).filter(Product.id == product_id).first()
+    return (row[0], row[1]) if row else None
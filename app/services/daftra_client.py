@@ -1,7 +1,43 @@
 import os
+import importlib.util
 import httpx
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from app.utils.metrics import daftra_latency, timed
+
+# One pooled client for the whole application lifetime, so invoice calls reuse
+# warm keep-alive (and, when h2 is installed, HTTP/2) connections.
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _new_http_client(transport=None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("DAFTRA_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("DAFTRA_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=30.0,
+        ),
+        timeout=httpx.Timeout(float(os.getenv("DAFTRA_TIMEOUT", "10")), connect=5.0),
+        transport=transport,
+    )
+
+async def start_http_client(transport=None):
+    global _http_client
+    if _http_client is None:
+        _http_client = _new_http_client(transport)
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        # Used outside the app lifespan (scripts, CLIs)
+        _http_client = _new_http_client()
+    return _http_client
 
 class DaftraClient:
     def __init__(self):
@@ -19,10 +55,10 @@ class DaftraClient:
         line_items = []
         for item in order_items:
             line_items.append({
-                "item_id": item["product"].daftra_item_id,  # type: ignore
+                "item_id": item["daftra_item_id"],
                 "quantity": item["quantity"],
                 "price": item["price"],
-                "description": item["product"].title,  # type: ignore
+                "description": item["snapshot"]["title"],
                 "unit": "pcs"
             })
 
@@ -43,25 +79,23 @@ class DaftraClient:
 
         return invoice_data
 
-    async def create_invoice(self, invoice_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create invoice in Daftra"""
+    async def create_invoice(self, invoice_data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create invoice in Daftra. Retries of one invoice should pass the same idempotency_key."""
 
         if not self.token:
             raise Exception("Daftra token not configured")
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
+        try:
+            with timed(daftra_latency, "create_invoice"):
+                response = await get_http_client().post(
                     f"{self.base_url}/invoices",
                     json=invoice_data,
-                    headers=self.headers,
-                    timeout=30.0
+                    headers={**self.headers, "Idempotency-Key": idempotency_key} if idempotency_key else self.headers
                 )
-
                 response.raise_for_status()
-                return response.json()
+            return response.json()
 
-            except httpx.HTTPError as e:
-                raise Exception(f"Daftra API error: {str(e)}")
-            except Exception as e:
-                raise Exception(f"Failed to create Daftra invoice: {str(e)}")
\ No newline at end of file
+        except httpx.HTTPError as e:
+            raise Exception(f"Daftra API error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Failed to create Daftra invoice: {str(e)}")
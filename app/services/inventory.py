@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from typing import Dict, List
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from app.models.product import Product
+
+products = Product.__table__
+
+# Decrement only if enough stock is left; the check and the write are one statement
+_reserve = (
+    update(products)
+    .where(products.c.id == bindparam("product_id"), products.c.stock >= bindparam("quantity"))
+    .values(stock=products.c.stock - bindparam("quantity"))
+)
+
+class StockContention(Exception):
+    """Stock kept changing under every attempt; nothing was short, so retrying can succeed."""
+
+@dataclass
+class StockShortage:
+    product_id: int
+    requested: int
+    available: int
+
+def reserve_stock(db: Session, lines: Dict[int, int], attempts: int = 3) -> List[StockShortage]:
+    """Take stock for every {product_id: quantity} line, or for none of them.
+
+    All lines go out as one executemany of conditional UPDATEs. If any line
+    matches no row, the session is rolled back and the lines that could not be
+    filled are returned, so call this before anything else in the transaction.
+    An empty result means every line was reserved and awaits the caller's commit.
+    Raises StockContention if every attempt failed without any line being short.
+    """
+    params = [
+        {"product_id": product_id, "quantity": quantity}
+        for product_id, quantity in sorted(lines.items())  # Fixed lock order across concurrent checkouts
+    ]
+    if not params:
+        return []
+
+    for _ in range(attempts):
+        if db.get_bind().dialect.supports_sane_multi_rowcount:
+            reserved = db.execute(_reserve, params).rowcount
+        else:
+            reserved = sum(db.execute(_reserve, line).rowcount for line in params)
+
+        if reserved == len(params):
+            return []
+
+        db.rollback()
+        available = dict(
+            db.query(Product.id, Product.stock).filter(Product.id.in_(lines.keys())).all()
+        )
+        shortages = [
+            StockShortage(product_id=product_id, requested=quantity, available=available.get(product_id) or 0)
+            for product_id, quantity in sorted(lines.items())
+            if (available.get(product_id) or 0) < quantity
+        ]
+        # Empty means stock came back between the UPDATE and the read; try again
+        if shortages:
+            return shortages
+
+    raise StockContention(f"Stock for products {sorted(lines)} changed during {attempts} attempts")
@@ -0,0 +1,182 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.invoice import InvoiceOutbox
+from app.models.order import Order
+from app.services.daftra_client import DaftraClient
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("INVOICE_OUTBOX_POLL_INTERVAL", "2"))
+BATCH_SIZE = int(os.getenv("INVOICE_OUTBOX_BATCH_SIZE", "20"))
+MAX_ATTEMPTS = int(os.getenv("INVOICE_OUTBOX_MAX_ATTEMPTS", "10"))
+BACKOFF_BASE = float(os.getenv("INVOICE_OUTBOX_BACKOFF_BASE", "5"))
+BACKOFF_MAX = float(os.getenv("INVOICE_OUTBOX_BACKOFF_MAX", "3600"))
+# How long a claimed row is left alone; covers one Daftra call (DAFTRA_TIMEOUT) with room to spare
+CLAIM_LEASE = float(os.getenv("INVOICE_OUTBOX_CLAIM_LEASE", "120"))
+
+def idempotency_key(order_id: int) -> str:
+    """Sent with every attempt for an order, so Daftra can drop a resend."""
+    return f"order-{order_id}-invoice"
+
+def enqueue_invoice(db: Session, order: Order, payload: Dict[str, Any]):
+    """Queue an invoice for `order` in the caller's transaction."""
+    db.add(InvoiceOutbox(
+        order_id=order.id,
+        payload=payload,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    ))
+
+class CircuitBreaker:
+    """Stops calling Daftra after repeated failures, then probes again after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed probe while half-open re-opens for another full cool-down
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+class InvoiceOutboxWorker:
+    """Drains invoice_outbox into Daftra with retries, backoff and a circuit breaker.
+
+    Rows are claimed one at a time, just before sending, by pushing their
+    next_attempt_at forward with a conditional UPDATE, so several app processes
+    can run workers side by side. The new next_attempt_at is the claim's lease:
+    the result is recorded only if the row still carries it, and if the lease
+    ran out and another worker resent meanwhile, the idempotency key lets
+    Daftra recognise the duplicate.
+    """
+
+    def __init__(self, client: Optional[DaftraClient] = None, breaker: Optional[CircuitBreaker] = None):
+        self.client = client or DaftraClient()
+        self.breaker = breaker or CircuitBreaker()
+
+    async def run(self):
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception:
+                logger.exception("Invoice outbox drain failed")
+                drained = 0
+            if drained < BATCH_SIZE:
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def drain_once(self) -> int:
+        sent = 0
+        while sent < BATCH_SIZE and self.breaker.allow():
+            job = await asyncio.to_thread(self._claim_next)
+            if job is None:
+                break
+            job_id, order_id, payload, lease_until = job
+            try:
+                response = await self.client.create_invoice(payload, idempotency_key(order_id))
+            except Exception as e:
+                self.breaker.record_failure()
+                await asyncio.to_thread(self._mark_failed, job_id, lease_until, str(e))
+            else:
+                self.breaker.record_success()
+                await asyncio.to_thread(self._mark_sent, job_id, lease_until, response)
+            sent += 1
+        return sent
+
+    def _claim_next(self) -> Optional[tuple]:
+        """(id, order id, payload, lease) of the next due row, now claimed; None if nothing is due."""
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=CLAIM_LEASE)
+        with SessionLocal() as db:
+            # A few candidates, in case another worker claims the first ones first
+            due = (
+                db.query(InvoiceOutbox.id, InvoiceOutbox.order_id, InvoiceOutbox.payload, InvoiceOutbox.next_attempt_at)
+                .filter(InvoiceOutbox.status == "pending", InvoiceOutbox.next_attempt_at <= now)
+                .order_by(InvoiceOutbox.next_attempt_at)
+                .limit(5)
+                .all()
+            )
+            for job_id, order_id, payload, seen in due:
+                updated = db.query(InvoiceOutbox).filter(
+                    InvoiceOutbox.id == job_id,
+                    InvoiceOutbox.status == "pending",
+                    InvoiceOutbox.next_attempt_at == seen
+                ).update({InvoiceOutbox.next_attempt_at: lease_until}, synchronize_session=False)
+                db.commit()
+                if updated:
+                    return job_id, order_id, payload, lease_until
+        return None
+
+    @staticmethod
+    def _leased(db: Session, job_id: int, lease_until: datetime):
+        """The row, if this worker's claim on it still stands."""
+        return db.query(InvoiceOutbox).filter(
+            InvoiceOutbox.id == job_id,
+            InvoiceOutbox.status == "pending",
+            InvoiceOutbox.next_attempt_at == lease_until
+        )
+
+    def _mark_sent(self, job_id: int, lease_until: datetime, response: Dict[str, Any]):
+        # Extract invoice ID from response (adjust based on Daftra API response structure)
+        invoice_id = response.get("id") or response.get("invoice_id")
+        with SessionLocal() as db:
+            updated = self._leased(db, job_id, lease_until).update({
+                InvoiceOutbox.status: "sent",
+                InvoiceOutbox.attempts: InvoiceOutbox.attempts + 1,
+                InvoiceOutbox.last_error: None,
+            }, synchronize_session=False)
+            if not updated:
+                logger.warning("Invoice outbox row %s was sent after its claim ran out; leaving it to the new claim", job_id)
+                return
+            if invoice_id:
+                order_id = db.query(InvoiceOutbox.order_id).filter(InvoiceOutbox.id == job_id).scalar()
+                db.query(Order).filter(Order.id == order_id).update(
+                    {Order.daftra_invoice_id: str(invoice_id)}, synchronize_session=False
+                )
+            db.commit()
+
+    def _mark_failed(self, job_id: int, lease_until: datetime, error: str):
+        with SessionLocal() as db:
+            job = self._leased(db, job_id, lease_until).with_entities(InvoiceOutbox.order_id, InvoiceOutbox.attempts).first()
+            if job is None:
+                logger.warning("Invoice outbox row %s failed after its claim ran out; leaving it to the new claim", job_id)
+                return
+            attempts = job.attempts + 1
+            values: Dict[Any, Any] = {InvoiceOutbox.attempts: attempts, InvoiceOutbox.last_error: error}
+            if attempts >= MAX_ATTEMPTS:
+                values[InvoiceOutbox.status] = "failed"
+                logger.error("Giving up on Daftra invoice for order %s after %s attempts: %s",
+                             job.order_id, attempts, error)
+            else:
+                # Exponential backoff with jitter
+                delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+                values[InvoiceOutbox.next_attempt_at] = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+                logger.warning("Daftra invoice for order %s failed (attempt %s): %s",
+                               job.order_id, attempts, error)
+            self._leased(db, job_id, lease_until).update(values, synchronize_session=False)
+            db.commit()
@@ -0,0 +1,233 @@
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import importlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
+from app.database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "app.migrations"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+FILENAME = re.compile(r"^(\d{4})_(\w+)\.py$")
+# Key of the PostgreSQL advisory lock held while migrating; any constant shared by all runners
+LOCK_KEY = 4_181_023
+
+TEMPLATE = '''"""{description}"""
+from app.services.migrations import Operations
+
+# False runs outside a transaction, which CREATE INDEX CONCURRENTLY needs
+transactional = True
+
+def upgrade(op: Operations):
+    pass
+'''
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", String, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class Migration:
+    def __init__(self, version: str, name: str):
+        self.version = version
+        self.name = name
+
+    @property
+    def module(self):
+        return importlib.import_module(f"{MIGRATIONS_PACKAGE}.{self.version}_{self.name}")
+
+    @property
+    def description(self) -> str:
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+class Operations:
+    """What a migration's upgrade(op) gets: its connection and idempotent DDL helpers.
+
+    Every helper checks the live schema first, so the same scripts bring a
+    database made by the old create_all() up to date, and a migration that
+    stopped part way can simply be run again.
+    """
+
+    def __init__(self, conn: Connection, transactional: bool):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.transactional = transactional
+
+    def execute(self, statement: str, params: Optional[dict] = None):
+        return self.conn.execute(text(statement), params or {})
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def create_tables(self, metadata: MetaData):
+        """Create the tables of `metadata`, with their indexes, that don't exist yet."""
+        metadata.create_all(self.conn, checkfirst=True)
+
+    def add_column(self, table: str, column: Column):
+        if column.name in {existing["name"] for existing in inspect(self.conn).get_columns(table)}:
+            return
+        definition = CreateColumn(column).compile(dialect=self.conn.dialect)
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+    def drop_foreign_key(self, table: str, column: str):
+        """Drop the foreign key on `table`.`column`, if there is one.
+
+        SQLite can only drop a constraint by rebuilding the table, so there the
+        constraint stays; this app doesn't turn on SQLite's foreign key checks.
+        """
+        if self.dialect == "sqlite":
+            return
+        for foreign_key in inspect(self.conn).get_foreign_keys(table):
+            if foreign_key["constrained_columns"] == [column] and foreign_key.get("name"):
+                self.execute(f"ALTER TABLE {table} DROP CONSTRAINT {foreign_key['name']}")
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False):
+        """CREATE INDEX, without blocking writes where the database can.
+
+        On PostgreSQL, migrations with transactional = False build with
+        CONCURRENTLY. A concurrent build that failed leaves an INVALID index
+        behind, which is dropped and built again. SQLite has no online build;
+        it holds the write lock while the index is built.
+        """
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        columns_sql = ", ".join(columns)
+        if self.dialect == "postgresql" and not self.transactional:
+            valid = self.execute(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name",
+                {"name": name},
+            ).scalar()
+            if valid:
+                return
+            if valid is not None:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            self.execute(f"CREATE {kind} CONCURRENTLY {name} ON {table} ({columns_sql})")
+        else:
+            self.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns_sql})")
+
+def discover() -> List[Migration]:
+    """Migration scripts in app/migrations, oldest first. Lists files without importing them."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = FILENAME.match(filename)
+        if match:
+            if migrations and migrations[-1].version == match[1]:
+                raise RuntimeError(f"Two migrations share version {match[1]}")
+            migrations.append(Migration(match[1], match[2]))
+    return migrations
+
+def applied_versions(conn: Connection) -> Dict[str, datetime]:
+    if not inspect(conn).has_table("schema_migrations"):
+        return {}
+    return dict(conn.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all())
+
+@contextmanager
+def _migration_lock(bind: Engine):
+    """Keep concurrent deploys from migrating at the same time (PostgreSQL only)."""
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+def _record(conn: Connection, migration: Migration):
+    conn.execute(insert(schema_migrations).values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+    ))
+
+def apply(bind: Engine, migration: Migration):
+    module = migration.module
+    transactional = getattr(module, "transactional", True)
+    if transactional:
+        # The version row commits with the changes, or neither does
+        with bind.begin() as conn:
+            module.upgrade(Operations(conn, True))
+            _record(conn, migration)
+        return
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        module.upgrade(Operations(conn, False))
+        _record(conn, migration)
+
+def upgrade(bind: Engine = default_engine, target: Optional[str] = None, verbose: bool = False) -> List[Migration]:
+    """Apply pending migrations in version order, up to and including `target`."""
+    with _migration_lock(bind):
+        with bind.begin() as conn:
+            _metadata.create_all(conn, checkfirst=True)
+            applied = applied_versions(conn)
+        pending = [
+            migration for migration in discover()
+            if migration.version not in applied and (target is None or migration.version <= target)
+        ]
+        for migration in pending:
+            started = time.perf_counter()
+            apply(bind, migration)
+            if verbose:
+                print(f"{migration.version} {migration.name}: {migration.description} ({time.perf_counter() - started:.2f}s)")
+    return pending
+
+def check_schema(bind: Engine = default_engine) -> bool:
+    """Log a warning when the database is behind the code; one query, no schema work."""
+    migrations = discover()
+    latest = migrations[-1].version if migrations else None
+    try:
+        with bind.connect() as conn:
+            current = conn.execute(select(func.max(schema_migrations.c.version))).scalar()
+    except SQLAlchemyError:
+        current = None
+    if current != latest:
+        logger.warning("Database schema is at %s but the code expects %s; run python -m app.services.migrations upgrade",
+                       current or "no version", latest)
+        return False
+    return True
+
+def new_migration(name: str, description: str) -> str:
+    migrations = discover()
+    version = f"{int(migrations[-1].version) + 1 if migrations else 1:04d}"
+    path = os.path.join(MIGRATIONS_DIR, f"{version}_{name}.py")
+    with open(path, "x") as f:
+        f.write(TEMPLATE.format(description=description))
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    up = commands.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", dest="target", help="stop after this version")
+    commands.add_parser("status", help="list migrations and when each was applied")
+    new = commands.add_parser("new", help="write an empty migration with the next version")
+    new.add_argument("name", help="snake_case name, e.g. add_orders_index")
+    new.add_argument("--description", default="Describe the change.")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        if not upgrade(target=args.target, verbose=True):
+            print("Already up to date")
+    elif args.command == "status":
+        with default_engine.connect() as conn:
+            applied = applied_versions(conn)
+        for migration in discover():
+            when = applied.get(migration.version)
+            print(f"{migration.version} {migration.name:<32} {when.isoformat(' ', 'seconds') if when else 'pending'}")
+    else:
+        if not re.fullmatch(r"\w+", args.name):
+            sys.exit("The name may only contain letters, digits and underscores")
+        print(new_migration(args.name, args.description))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.category import Category
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.utils.pagination import datetime_bound
+
+EXPORT_BATCH_SIZE = int(os.getenv("ORDER_EXPORT_BATCH_SIZE", "1000"))
+
+# One CSV row per order item, order columns repeated
+CSV_FIELDS = [
+    "order_id", "user_id", "created_at", "status", "total_amount", "daftra_invoice_id",
+    "product_id", "sku", "title", "quantity", "price",
+]
+
+def filter_orders(query, dialect_name: str, order_status: Optional[str] = None,
+                  created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+    """Restrict an Order query to a status and a [created_from, created_to) range."""
+    if order_status:
+        query = query.filter(Order.status == order_status)
+
+    if created_from:
+        column, value = datetime_bound(Order.created_at, created_from, dialect_name)
+        query = query.filter(column >= value)
+
+    if created_to:
+        column, value = datetime_bound(Order.created_at, created_to, dialect_name)
+        query = query.filter(column < value)
+
+    return query
+
+def _revenue_filter(query, dialect_name: str, order_status, created_from, created_to):
+    # Cancelled orders are not revenue unless asked for explicitly
+    if not order_status:
+        query = query.filter(Order.status != "cancelled")
+    return filter_orders(query, dialect_name, order_status, created_from, created_to)
+
+def order_day(column, dialect_name: str):
+    # SQLite keeps timestamps as text, where CAST(... AS DATE) yields just the year
+    return func.date(column) if dialect_name == "sqlite" else cast(column, Date)
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def export_orders(fmt: str, order_status: Optional[str] = None, created_from: Optional[datetime] = None,
+                  created_to: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield matching orders as CSV (one row per item) or NDJSON (one order per line).
+
+    Rows come from a single joined query read `batch_size` at a time, through
+    a server-side cursor where the driver has one, so memory stays flat
+    however many orders match.
+    """
+    with SessionLocal() as db:
+        query = (
+            select(
+                Order.id, Order.user_id, Order.created_at, Order.status, Order.total_amount,
+                Order.daftra_invoice_id, OrderItem.product_id, OrderItem.sku, OrderItem.title,
+                OrderItem.quantity, OrderItem.price,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        )
+        query = filter_orders(query, db.get_bind().dialect.name, order_status, created_from, created_to)
+        query = query.order_by(Order.created_at, Order.id, OrderItem.id).execution_options(yield_per=batch_size)
+        partitions = db.execute(query).partitions()
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_FIELDS)
+            for rows in partitions:
+                writer.writerows((*row[:2], _isoformat(row[2]), *row[3:]) for row in rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+            return
+
+        # Items of one order are adjacent; an order may span two partitions
+        order = None
+        for rows in partitions:
+            lines = []
+            for row in rows:
+                if order is None or order["id"] != row[0]:
+                    if order is not None:
+                        lines.append(json.dumps(order))
+                    order = {
+                        "id": row[0], "user_id": row[1], "created_at": _isoformat(row[2]), "status": row[3],
+                        "total_amount": row[4], "daftra_invoice_id": row[5], "items": [],
+                    }
+                if row[6] is not None:
+                    order["items"].append({
+                        "product_id": row[6], "sku": row[7], "title": row[8], "quantity": row[9], "price": row[10],
+                    })
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+        if order is not None:
+            yield (json.dumps(order) + "\n").encode()
+
+def revenue_by_day(db: Session, order_status: Optional[str] = None, created_from: Optional[datetime] = None,
+                   created_to: Optional[datetime] = None) -> List[dict]:
+    dialect = db.get_bind().dialect.name
+    day = order_day(Order.created_at, dialect).label("day")
+    query = select(day, func.count(Order.id), func.sum(Order.total_amount))
+    query = _revenue_filter(query, dialect, order_status, created_from, created_to)
+    rows = db.execute(query.group_by(day).order_by(day)).all()
+    return [{"day": str(row[0]), "orders": row[1], "revenue": row[2] or 0.0} for row in rows]
+
+def revenue_by_category(db: Session, order_status: Optional[str] = None, created_from: Optional[datetime] = None,
+                        created_to: Optional[datetime] = None) -> List[dict]:
+    dialect = db.get_bind().dialect.name
+    revenue = func.sum(OrderItem.quantity * OrderItem.price).label("revenue")
+    query = (
+        select(Category.id, Category.name, func.sum(OrderItem.quantity), revenue)
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        # Items of deleted products still count, under no category
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .outerjoin(Category, Category.id == Product.category_id)
+    )
+    query = _revenue_filter(query, dialect, order_status, created_from, created_to)
+    rows = db.execute(query.group_by(Category.id, Category.name).order_by(revenue.desc())).all()
+    return [{"category_id": row[0], "category": row[1], "units": row[2], "revenue": row[3] or 0.0} for row in rows]
+
+def top_products(db: Session, limit: int = 20, by: str = "revenue", order_status: Optional[str] = None,
+                 created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> List[dict]:
+    """Best sellers, named from the order item snapshots so deleted products are still listed."""
+    dialect = db.get_bind().dialect.name
+    units = func.sum(OrderItem.quantity).label("units")
+    revenue = func.sum(OrderItem.quantity * OrderItem.price).label("revenue")
+    query = (
+        select(OrderItem.product_id, units, revenue, func.max(OrderItem.id))
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+    )
+    query = _revenue_filter(query, dialect, order_status, created_from, created_to)
+    ranking = units if by == "units" else revenue
+    rows = db.execute(
+        query.group_by(OrderItem.product_id).order_by(ranking.desc(), OrderItem.product_id).limit(limit)
+    ).all()
+    # Each product's latest snapshot, in case it was renamed between orders
+    snapshots = {}
+    if rows:
+        latest = select(OrderItem.id, OrderItem.sku, OrderItem.title).where(OrderItem.id.in_([row[3] for row in rows]))
+        snapshots = {item_id: (sku, title) for item_id, sku, title in db.execute(latest)}
+    return [
+        {"product_id": row[0], "sku": snapshots[row[3]][0], "title": snapshots[row[3]][1],
+         "units": row[1], "revenue": row[2] or 0.0}
+        for row in rows
+    ]
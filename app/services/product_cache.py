@@ -0,0 +1,236 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.schemas.product import ProductResponse
+
+PRODUCT_CACHE_BACKEND = os.getenv("PRODUCT_CACHE_BACKEND", "memory")  # memory, redis or none
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "300"))
+
+_product_json = TypeAdapter(ProductResponse)
+_product_list_json = TypeAdapter(List[ProductResponse])
+
+def serialize_product(product) -> bytes:
+    return _product_json.dump_json(_product_json.validate_python(product, from_attributes=True))
+
+def serialize_products(products) -> bytes:
+    return _product_list_json.dump_json(_product_list_json.validate_python(products, from_attributes=True))
+
+class MemoryBackend:
+    """Size-bounded LRU of bytes values with a TTL, local to this process.
+
+    With several workers each one has its own copy, so invalidations reach
+    only the worker that made the write and the TTL bounds staleness elsewhere.
+    Use the redis backend when that matters.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def get_counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+class RedisBackend:
+    """Shared cache in any Redis-compatible store (see app.services.redis_client).
+
+    Size is bounded by the server's maxmemory/eviction policy; entries also
+    carry the TTL so a missed invalidation cannot live forever.
+    """
+
+    # Calls are network round trips; ProductCache runs them off the event loop
+    blocking = True
+
+    def __init__(self, client, ttl: float, prefix: str = "product-cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.prefix + key, value, ex=int(self.ttl) or None)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def get_counter(self, key: str) -> int:
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+class NullBackend:
+    blocking = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def get_counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+class ProductCache:
+    """Pre-serialized product JSON keyed by product id and by list query shape.
+
+    Product entries are deleted by id when that product changes. List entries
+    are namespaced by a catalog generation counter that every product write
+    bumps, so all cached pages fall out at once without scanning keys.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def generation(self) -> int:
+        """Read before querying the database and pass to the set_* call.
+
+        A fill is dropped if any product was written in between, so a slow
+        reader can never put data older than the last invalidation back.
+        """
+        return await self._call(self.backend.get_counter, "generation")
+
+    async def get_product(self, product_id: int) -> Optional[bytes]:
+        return self._count(await self._call(self.backend.get, f"product:{product_id}"))
+
+    def _can_fill(self, generation: int, staleness: float) -> bool:
+        if self.backend.get_counter("generation") != generation:
+            return False
+        # A replica read may predate the last write by up to `staleness` seconds
+        if staleness:
+            invalidated_at = self.backend.get("invalidated_at")
+            if invalidated_at is not None and time.time() - float(invalidated_at) < staleness:
+                return False
+        return True
+
+    def _fill(self, key: str, value: bytes, generation: int, staleness: float):
+        if self._can_fill(generation, staleness):
+            self.backend.set(key, value)
+
+    async def set_product(self, product_id: int, body: bytes, generation: int, staleness: float = 0):
+        await self._call(self._fill, f"product:{product_id}", body, generation, staleness)
+
+    def _list_key(self, shape: dict, generation: int) -> str:
+        digest = hashlib.sha1(json.dumps(shape, sort_keys=True, default=str).encode()).hexdigest()
+        return f"products:{generation}:{digest}"
+
+    async def get_list(self, shape: dict, generation: int) -> Optional[Tuple[bytes, Optional[str]]]:
+        value = self._count(await self._call(self.backend.get, self._list_key(shape, generation)))
+        if value is None:
+            return None
+        # Stored as b"<next cursor>\n<body>"
+        cursor, body = value.split(b"\n", 1)
+        return body, cursor.decode() or None
+
+    async def set_list(self, shape: dict, generation: int, body: bytes, next_cursor: Optional[str], staleness: float = 0):
+        value = (next_cursor or "").encode() + b"\n" + body
+        await self._call(self._fill, self._list_key(shape, generation), value, generation, staleness)
+
+    def invalidate_products_sync(self, product_ids: Iterable[int]):
+        """invalidate_products for code already running in a worker thread."""
+        self.backend.delete(*(f"product:{product_id}" for product_id in product_ids))
+        self.backend.set("invalidated_at", repr(time.time()).encode())
+        self.backend.incr("generation")
+
+    async def invalidate_products(self, product_ids: Iterable[int]):
+        await self._call(self.invalidate_products_sync, list(product_ids))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def _make_backend():
+    if PRODUCT_CACHE_BACKEND == "redis":
+        from app.services.redis_client import get_redis
+        return RedisBackend(get_redis(), PRODUCT_CACHE_TTL)
+    if PRODUCT_CACHE_BACKEND == "none":
+        return NullBackend()
+    return MemoryBackend(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+
+product_cache = ProductCache(_make_backend())
+
+def _load_product_body(db: Session, product_id: int) -> Optional[bytes]:
+    product = db.query(Product).filter(Product.id == product_id).first()
+    return serialize_product(product) if product else None
+
+async def load_product_json(db: AsyncSession, product_id: int) -> Optional[bytes]:
+    """ProductResponse JSON for one product, from the cache or the database."""
+    body = await product_cache.get_product(product_id)
+    if body is not None:
+        return body
+
+    generation = await product_cache.generation()
+    body = await db.run_sync(_load_product_body, product_id)
+    if body is not None:
+        await product_cache.set_product(product_id, body, generation, db.info.get("staleness", 0))
+    return body
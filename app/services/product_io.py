@@ -0,0 +1,235 @@
+import io
+import os
+import csv
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.category import Category
+from app.models.product import Product
+from app.schemas.product import ProductImportRow
+from app.services.catalog_version import bump_catalog_generation
+from app.services.product_cache import product_cache
+from app.services.search import get_search_index, index_products
+
+IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "2000"))
+EXPORT_BATCH_SIZE = int(os.getenv("PRODUCT_EXPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000
+
+# Column order of exported files; an export can be imported back as is
+FIELDS = ["sku", "title", "description", "price", "stock", "category", "images", "daftra_item_id"]
+NULLABLE = {"description", "category", "category_id", "images", "daftra_item_id"}
+
+def read_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line, record, parse error) from a CSV or NDJSON byte stream, one row at a time."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            # Empty cells clear nullable fields and are skipped otherwise; images are a JSON array or "a|b|c"
+            record = {
+                key: value if value != "" else None
+                for key, value in record.items()
+                if key and (value != "" or key in NULLABLE)
+            }
+            images = record.get("images")
+            if images is not None and not images.startswith("["):
+                record["images"] = images.split("|")
+            elif images is not None:
+                try:
+                    record["images"] = json.loads(images)
+                except ValueError:
+                    yield reader.line_num, None, "images: not a JSON array"
+                    continue
+            yield reader.line_num, record, None
+        return
+
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield line, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        yield line, record, None
+
+def _upsert(db: Session, rows: List[dict]) -> List[tuple]:
+    """INSERT ... ON CONFLICT (sku) DO UPDATE for rows sharing one set of keys.
+
+    Only the columns present in the input are overwritten on existing products.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(Product)
+    updates = {key: statement.excluded[key] for key in rows[0] if key != "sku"}
+    updates.update(version=Product.version + 1, updated_at=func.now())
+    statement = statement.on_conflict_do_update(index_elements=[Product.sku], set_=updates)
+    statement = statement.returning(Product.id, Product.title, Product.description, Product.sku)
+    return db.execute(statement, rows).all()
+
+class ProductImporter:
+    """Validates rows and upserts them by sku in batches, one transaction per batch."""
+
+    def __init__(self, db: Session, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        # Build the search index now; its first-time setup can't run inside a batch's write transaction
+        get_search_index(db)
+        # Preloaded once; imports reference categories by name
+        rows = db.query(Category.id, Category.name).all()
+        self.category_ids = {name.strip().lower(): category_id for category_id, name in rows}
+        self.known_ids = {category_id for category_id, _ in rows}
+        self.batch: Dict[str, Tuple[int, dict]] = {}
+        self.rows = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, sku: Optional[str], message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "sku": sku, "error": message})
+
+    def add(self, line: int, record: dict):
+        self.rows += 1
+        try:
+            row = ProductImportRow.model_validate(record)
+        except ValidationError as e:
+            message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            self.error(line, record.get("sku"), message)
+            return
+
+        values = row.model_dump(exclude_unset=True)
+        category = values.pop("category", None)
+        if category is not None:
+            category_id = self.category_ids.get(category.strip().lower())
+            if category_id is None:
+                self.error(line, row.sku, f"unknown category: {category}")
+                return
+            values["category_id"] = category_id
+        elif values.get("category_id") is not None and values["category_id"] not in self.known_ids:
+            self.error(line, row.sku, f"unknown category_id: {values['category_id']}")
+            return
+
+        # A sku repeated within a batch keeps its last row
+        self.batch[row.sku] = (line, values)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, {}
+
+        # Rows with the same columns share a statement (CSV files have one group)
+        groups = defaultdict(list)
+        for line, values in batch.values():
+            groups[tuple(sorted(values))].append(values)
+
+        try:
+            written = [row for rows in groups.values() for row in _upsert(self.db, rows)]
+            index_products(self.db, written)
+            bump_catalog_generation(self.db)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            message = f"batch failed: {type(e).__name__}: {getattr(e, 'orig', e)}"
+            for sku, (line, _) in batch.items():
+                self.error(line, sku, message)
+            return
+
+        self.upserted += len(written)
+        product_cache.invalidate_products_sync([row[0] for row in written])
+
+    def report(self) -> dict:
+        return {"rows": self.rows, "upserted": self.upserted, "failed": self.failed, "errors": self.errors}
+
+def import_products(stream: IO[bytes], fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Import a CSV or NDJSON byte stream; returns the ProductImportReport fields."""
+    with SessionLocal() as db:
+        importer = ProductImporter(db, batch_size)
+        for line, record, parse_error in read_rows(stream, fmt):
+            if parse_error:
+                importer.rows += 1
+                importer.error(line, None, parse_error)
+            else:
+                importer.add(line, record)  # type: ignore
+        importer.flush()
+        return importer.report()
+
+def export_products(fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield the catalog as CSV or NDJSON, one chunk per `batch_size` products."""
+    query = (
+        select(
+            Product.sku, Product.title, Product.description, Product.price, Product.stock,
+            Category.name.label("category"), Product.images, Product.daftra_item_id,
+        )
+        .outerjoin(Category, Category.id == Product.category_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    with SessionLocal() as db:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(FIELDS)
+            for rows in db.execute(query).partitions():
+                for row in rows:
+                    row = list(row)
+                    row[6] = json.dumps(row[6]) if row[6] is not None else None
+                    writer.writerow(row)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+            return
+
+        for rows in db.execute(query).partitions():
+            yield "".join(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in rows).encode()
+
+def main():
+    from app.models import user, cart, order, catalog  # noqa: F401 - mappers referenced by name
+
+    parser = argparse.ArgumentParser(description="Bulk import or export products as CSV or NDJSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("import", help="upsert products by sku from a file")
+    load.add_argument("path", help="input file, or - for stdin")
+    load.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    load.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    dump = commands.add_parser("export", help="write every product to a file")
+    dump.add_argument("path", help="output file, or - for stdout")
+    dump.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    dump.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    if args.command == "import":
+        stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+        with stream:
+            report = import_products(stream, fmt, args.batch_size)
+        for error in report["errors"]:
+            print(f"line {error['line']} ({error['sku']}): {error['error']}", file=sys.stderr)
+        print(f"{report['rows']} rows, {report['upserted']} upserted, {report['failed']} failed")
+    else:
+        output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        with output:
+            for chunk in export_products(fmt, args.batch_size):
+                output.write(chunk)
+
+if __name__ == "__main__":
+    main()
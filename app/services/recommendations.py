@@ -0,0 +1,334 @@
+import os
+import math
+import time
+import argparse
+import threading
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, List, Optional
+from sqlalchemy import insert, text, or_, func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.cart import Cart, CartItem
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.recommendation import ProductNeighbor
+from app.services.sales_rollup import best_sellers, product_units
+
+TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+CART_WEIGHT = float(os.getenv("RECOMMENDATIONS_CART_WEIGHT", "0.5"))
+MODEL_TTL = float(os.getenv("RECOMMENDATIONS_MODEL_TTL", "300"))
+POPULARITY_WEIGHT = float(os.getenv("RECOMMENDATIONS_POPULARITY_WEIGHT", "0.1"))
+POPULARITY_DAYS = int(os.getenv("RECOMMENDATIONS_POPULARITY_DAYS", "30"))
+INSERT_BATCH = 5000
+
+def _baskets(db: Session, include_carts: bool):
+    """Return (basket id, product id, basket weight) arrays, one entry per basket line."""
+    orders = db.query(OrderItem.order_id, OrderItem.product_id).distinct().all()
+    basket_ids = np.array([row[0] for row in orders], dtype=np.int64)
+    product_ids = np.array([row[1] for row in orders], dtype=np.int64)
+    weights = np.ones(len(orders))
+
+    if include_carts:
+        carts = db.query(CartItem.cart_id, CartItem.product_id).distinct().all()
+        # Offset cart ids past every order id so the two never share a basket
+        offset = basket_ids.max() + 1 if len(basket_ids) else 0
+        basket_ids = np.concatenate([basket_ids, np.array([row[0] for row in carts], dtype=np.int64) + offset])
+        product_ids = np.concatenate([product_ids, np.array([row[1] for row in carts], dtype=np.int64)])
+        weights = np.concatenate([weights, np.full(len(carts), CART_WEIGHT)])
+
+    return basket_ids, product_ids, weights
+
+def compute_neighbors(basket_ids, product_ids, weights, top_k: int = TOP_K):
+    """Compute the top-K cosine neighbours of every product.
+
+    Builds a sparse basket x product matrix X, takes C = X^T W X as the weighted
+    co-occurrence matrix, normalises it to cosine similarity and keeps the best
+    `top_k` entries per row. Yields row dicts ready for bulk insert.
+    """
+    if not len(product_ids):
+        return
+
+    baskets, basket_index = np.unique(basket_ids, return_inverse=True)
+    products, product_index = np.unique(product_ids, return_inverse=True)
+
+    x = sp.csr_matrix(
+        (np.ones(len(product_index)), (basket_index, product_index)),
+        shape=(len(baskets), len(products))
+    )
+    basket_weights = np.zeros(len(baskets))
+    basket_weights[basket_index] = weights
+    cooccurrence = (x.T @ sp.diags(basket_weights) @ x).tocsr()
+
+    norms = np.sqrt(cooccurrence.diagonal())
+    cooccurrence.setdiag(0)
+    cooccurrence.eliminate_zeros()
+    rows = np.repeat(np.arange(len(products)), np.diff(cooccurrence.indptr))
+    similarity = cooccurrence.data / (norms[rows] * norms[cooccurrence.indices])
+
+    for row in range(len(products)):
+        start, end = cooccurrence.indptr[row], cooccurrence.indptr[row + 1]
+        if start == end:
+            continue
+        scores = similarity[start:end]
+        columns = cooccurrence.indices[start:end]
+        counts = cooccurrence.data[start:end]
+        if len(scores) > top_k:
+            keep = np.argpartition(-scores, top_k)[:top_k]
+            scores, columns, counts = scores[keep], columns[keep], counts[keep]
+        for column, score, count in zip(columns, scores, counts):
+            yield {
+                "product_id": int(products[row]),
+                "neighbor_id": int(products[column]),
+                "cooccurrence": float(count),
+                "score": float(score),
+            }
+
+def build_neighbors(db: Session, top_k: int = TOP_K, include_carts: bool = False) -> int:
+    """Rebuild the whole product_neighbors table from purchase history."""
+    rows = compute_neighbors(*_baskets(db, include_carts), top_k=top_k)
+
+    db.query(ProductNeighbor).delete()
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            db.execute(insert(ProductNeighbor), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(ProductNeighbor), batch)
+        written += len(batch)
+
+    db.commit()
+    invalidate_model()
+    return written
+
+def record_order(db: Session, product_ids: List[int], top_k: int = TOP_K):
+    """Fold one new order into the neighbour table inside the caller's transaction.
+
+    Bumps the co-occurrence of every pair of products in the order and rescores
+    those pairs against current purchase counts, then trims each touched
+    product back to its `top_k` best neighbours. Pairs that were trimmed earlier
+    restart from this order's count; a periodic rebuild restores exact values.
+    """
+    product_ids = sorted(set(product_ids))
+    if len(product_ids) < 2:
+        return
+
+    purchases = dict(
+        db.query(OrderItem.product_id, func.count(func.distinct(OrderItem.order_id)))
+        .filter(OrderItem.product_id.in_(product_ids))
+        .group_by(OrderItem.product_id)
+        .all()
+    )
+    existing = {
+        (row.product_id, row.neighbor_id): row
+        for row in db.query(ProductNeighbor).filter(
+            ProductNeighbor.product_id.in_(product_ids),
+            ProductNeighbor.neighbor_id.in_(product_ids)
+        )
+    }
+
+    for product_id in product_ids:
+        for neighbor_id in product_ids:
+            if product_id == neighbor_id:
+                continue
+            norm = math.sqrt(max(purchases.get(product_id, 1), 1) * max(purchases.get(neighbor_id, 1), 1))
+            row = existing.get((product_id, neighbor_id))
+            if row is None:
+                row = ProductNeighbor(product_id=product_id, neighbor_id=neighbor_id, cooccurrence=0)
+                db.add(row)
+            row.cooccurrence = row.cooccurrence + 1  # type: ignore
+            row.score = float(min(row.cooccurrence / norm, 1.0))  # type: ignore
+
+    db.flush()
+    for product_id in product_ids:
+        db.execute(
+            text(
+                "DELETE FROM product_neighbors WHERE product_id = :product_id AND neighbor_id NOT IN ("
+                "SELECT neighbor_id FROM product_neighbors WHERE product_id = :product_id "
+                "ORDER BY score DESC LIMIT :top_k)"
+            ),
+            {"product_id": product_id, "top_k": top_k}
+        )
+
+def remove_product_neighbors(db: Session, product_id: int):
+    db.query(ProductNeighbor).filter(
+        or_(ProductNeighbor.product_id == product_id, ProductNeighbor.neighbor_id == product_id)
+    ).delete(synchronize_session=False)
+
+def related_products(db: Session, product: Product, limit: int = 4) -> List[Product]:
+    candidates = (
+        db.query(Product, ProductNeighbor.score)
+        .join(ProductNeighbor, ProductNeighbor.neighbor_id == Product.id)
+        .filter(ProductNeighbor.product_id == product.id)
+        .order_by(ProductNeighbor.score.desc())
+        .limit(limit * 3)
+        .all()
+    )
+
+    # Popularity prior: recent best sellers win among similarly scored neighbours
+    units = product_units(db, [candidate.id for candidate, _ in candidates], POPULARITY_DAYS)
+    top = max(units.values(), default=0) or 1
+    candidates.sort(key=lambda row: row[1] + POPULARITY_WEIGHT * units.get(row[0].id, 0) / top, reverse=True)
+    related = [candidate for candidate, _ in candidates[:limit]]
+
+    # Cold start: top up with the category's best sellers, then any products from it
+    if len(related) < limit:
+        exclude = [product.id] + [item.id for item in related]
+        related += best_sellers(db, POPULARITY_DAYS, limit - len(related), product.category_id, exclude)  # type: ignore
+    if len(related) < limit:
+        exclude = [product.id] + [item.id for item in related]
+        related += (
+            db.query(Product)
+            .filter(Product.category_id == product.category_id, Product.id.notin_(exclude))
+            .limit(limit - len(related))
+            .all()
+        )
+
+    return related
+
+class SimilarityModel:
+    """The product_neighbors table held in memory as a sparse matrix.
+
+    Row i holds the neighbour scores of product i, so a user's scores are the
+    history-weighted sum of the rows for products they bought or carted.
+    """
+
+    def __init__(self, product_ids: np.ndarray, matrix: sp.csr_matrix):
+        self.product_ids = product_ids
+        self.index = {int(product_id): i for i, product_id in enumerate(product_ids)}
+        self.matrix = matrix
+        # Fallback for users with no history: products with the most similarity mass
+        self.popular = np.argsort(-np.asarray(matrix.sum(axis=0)).ravel())
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, db: Session):
+        rows = db.query(ProductNeighbor.product_id, ProductNeighbor.neighbor_id, ProductNeighbor.score).all()
+        sources = np.array([row[0] for row in rows], dtype=np.int64)
+        targets = np.array([row[1] for row in rows], dtype=np.int64)
+        scores = np.array([row[2] for row in rows], dtype=np.float64)
+
+        product_ids, inverse = np.unique(np.concatenate([sources, targets]), return_inverse=True)
+        matrix = sp.csr_matrix(
+            (scores, (inverse[:len(rows)], inverse[len(rows):])),
+            shape=(len(product_ids), len(product_ids))
+        )
+        return cls(product_ids, matrix)
+
+    def _history_matrix(self, histories: List[Dict[int, float]]) -> sp.csr_matrix:
+        rows, columns, weights = [], [], []
+        for row, history in enumerate(histories):
+            for product_id, weight in history.items():
+                column = self.index.get(product_id)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    weights.append(weight)
+        return sp.csr_matrix((weights, (rows, columns)), shape=(len(histories), len(self.product_ids)))
+
+    def recommend_many(self, histories: List[Dict[int, float]], limit: int) -> List[List[int]]:
+        """Score every history against the model in one sparse matrix product."""
+        scores = (self._history_matrix(histories) @ self.matrix).tocsr()
+
+        results = []
+        for row, history in enumerate(histories):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            columns = scores.indices[start:end]
+            values = scores.data[start:end]
+            if len(values) > limit + len(history):
+                keep = np.argpartition(-values, limit + len(history))[:limit + len(history)]
+                columns, values = columns[keep], values[keep]
+            ranked = [int(self.product_ids[column]) for column in columns[np.argsort(-values)]]
+            ranked = [product_id for product_id in ranked if product_id not in history][:limit]
+
+            # Users with little or no history are topped up with popular products
+            if len(ranked) < limit:
+                for column in self.popular:
+                    product_id = int(self.product_ids[column])
+                    if product_id not in history and product_id not in ranked:
+                        ranked.append(product_id)
+                        if len(ranked) == limit:
+                            break
+            results.append(ranked)
+        return results
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model(db: Session) -> SimilarityModel:
+    global _model
+    model = _model
+    if model is None or time.monotonic() - model.loaded_at > MODEL_TTL:
+        with _model_lock:
+            if _model is None or _model is model:
+                _model = SimilarityModel.load(db)
+            model = _model
+    return model
+
+def invalidate_model():
+    global _model
+    _model = None
+
+def user_histories(db: Session, user_ids: List[int], stored_carts: Optional[Dict[int, Dict[int, int]]] = None) -> Dict[int, Dict[int, float]]:
+    """Purchased (weight 1) and carted (weight CART_WEIGHT) products per user.
+
+    `stored_carts` are the users' carts from the cart store (see
+    CartStore.loaded_lines), which are newer than their written-back rows.
+    """
+    histories: Dict[int, Dict[int, float]] = {user_id: {} for user_id in user_ids}
+
+    stored_carts = stored_carts or {}
+    in_store = list(stored_carts)
+    for user_id, lines in stored_carts.items():
+        for product_id in lines:
+            histories[user_id][product_id] = CART_WEIGHT
+
+    carted = (
+        db.query(Cart.user_id, CartItem.product_id)
+        .join(CartItem, CartItem.cart_id == Cart.id)
+        .filter(Cart.user_id.in_(set(user_ids) - set(in_store)))
+    )
+    for user_id, product_id in carted:
+        histories[user_id][product_id] = CART_WEIGHT
+
+    purchased = (
+        db.query(Order.user_id, OrderItem.product_id)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .filter(Order.user_id.in_(user_ids))
+        .distinct()
+    )
+    for user_id, product_id in purchased:
+        histories[user_id][product_id] = 1.0
+
+    return histories
+
+def recommend_for_users(db: Session, user_ids: List[int], limit: int = 10,
+                        stored_carts: Optional[Dict[int, Dict[int, int]]] = None) -> Dict[int, List[Product]]:
+    histories = user_histories(db, user_ids, stored_carts)
+    ranked = get_model(db).recommend_many([histories[user_id] for user_id in user_ids], limit)
+
+    wanted = {product_id for product_ids in ranked for product_id in product_ids}
+    products = {product.id: product for product in db.query(Product).filter(Product.id.in_(wanted))}
+    return {
+        user_id: [products[product_id] for product_id in product_ids if product_id in products]
+        for user_id, product_ids in zip(user_ids, ranked)
+    }
+
+def main():
+    from app.models import user, category  # noqa: F401 - mappers referenced by name
+
+    parser = argparse.ArgumentParser(description="Rebuild the product_neighbors recommendation table")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="neighbours kept per product")
+    parser.add_argument("--include-carts", action="store_true", help="also learn from open carts")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        written = build_neighbors(db, top_k=args.top_k, include_carts=args.include_carts)
+    print(f"Wrote {written} product neighbours")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import os
+import fnmatch
+import threading
+import time
+from typing import Dict, List, Optional
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class FakeRedis:
+    """In-process stand-in for the subset of the redis-py client this app uses.
+
+    Selected with REDIS_URL=memory:// for local runs and tests; state lives in
+    this process only.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, object] = {}
+        self.expires: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key: str):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            return self._live(key)  # type: ignore
+
+    def mget(self, *keys: str) -> List[Optional[bytes]]:
+        with self.lock:
+            return [self._live(key) for key in keys]  # type: ignore
+
+    def set(self, key: str, value, ex: Optional[float] = None):
+        with self.lock:
+            self.data[key] = self._encode(value)
+            if ex:
+                self.expires[key] = time.monotonic() + ex
+            else:
+                self.expires.pop(key, None)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self.lock:
+            removed = 0
+            for key in keys:
+                if self._live(key) is not None:
+                    removed += 1
+                self.data.pop(key, None)
+                self.expires.pop(key, None)
+            return removed
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self.lock:
+            value = int(self._live(key) or 0) + amount  # type: ignore
+            self.data[key] = self._encode(value)
+            return value
+
+    def exists(self, *keys: str) -> int:
+        with self.lock:
+            return sum(1 for key in keys if self._live(key) is not None)
+
+    def expire(self, key: str, seconds: float) -> int:
+        with self.lock:
+            if self._live(key) is None:
+                return 0
+            self.expires[key] = time.monotonic() + seconds
+            return 1
+
+    def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        with self.lock:
+            keys = [key for key in list(self.data) if self._live(key) is not None]
+        return iter([key.encode() for key in keys if match is None or fnmatch.fnmatchcase(key, match)])
+
+    def _hash(self, key: str) -> Dict[bytes, bytes]:
+        return self._live(key) or self.data.setdefault(key, {})  # type: ignore
+
+    def _drop_if_empty(self, key: str):
+        if not self.data.get(key):
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        with self.lock:
+            return dict(self._live(key) or {})  # type: ignore
+
+    def hset(self, key: str, field=None, value=None, mapping: Optional[dict] = None) -> int:
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        with self.lock:
+            hash_ = self._hash(key)
+            added = 0
+            for name, item in items.items():
+                name = self._encode(name)
+                added += name not in hash_
+                hash_[name] = self._encode(item)
+            return added
+
+    def hsetnx(self, key: str, field, value) -> int:
+        with self.lock:
+            hash_ = self._hash(key)
+            field = self._encode(field)
+            if field in hash_:
+                return 0
+            hash_[field] = self._encode(value)
+            return 1
+
+    def hincrby(self, key: str, field, amount: int = 1) -> int:
+        with self.lock:
+            hash_ = self._hash(key)
+            field = self._encode(field)
+            value = int(hash_.get(field, 0)) + amount
+            hash_[field] = self._encode(value)
+            return value
+
+    def hdel(self, key: str, *fields) -> int:
+        with self.lock:
+            hash_ = self._live(key) or {}
+            removed = sum(hash_.pop(self._encode(field), None) is not None for field in fields)  # type: ignore
+            self._drop_if_empty(key)
+            return removed
+
+    def sadd(self, key: str, *members) -> int:
+        with self.lock:
+            members_ = self._live(key) or self.data.setdefault(key, set())
+            before = len(members_)  # type: ignore
+            members_.update(self._encode(member) for member in members)  # type: ignore
+            return len(members_) - before  # type: ignore
+
+    def spop(self, key: str, count: Optional[int] = None):
+        with self.lock:
+            members = self._live(key) or set()
+            popped = [members.pop() for _ in range(min(count or 1, len(members)))]  # type: ignore
+            self._drop_if_empty(key)
+            return popped if count is not None else (popped[0] if popped else None)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_redis():
+    """Shared client for REDIS_URL; memory:// gives a process-local FakeRedis."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if REDIS_URL.startswith("memory://"):
+                    _client = FakeRedis()
+                else:
+                    import redis
+                    _client = redis.Redis.from_url(REDIS_URL)
+    return _client
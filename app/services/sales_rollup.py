@@ -0,0 +1,134 @@
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.rollup import ProductDailySales, CategoryDailySales
+from app.services.order_reports import order_day
+
+def _upsert(db: Session, table, keys: List[str], params: List[dict], counters: List[str]):
+    """INSERT ... ON CONFLICT DO UPDATE adding `counters` onto today's row."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    # CURRENT_DATE is the database's clock, the same one that stamps orders.created_at
+    statement = dialect_insert(table).values(day=func.current_date())
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", *keys],
+        set_={counter: getattr(table, counter) + statement.excluded[counter] for counter in counters},
+    )
+    db.execute(statement, params)
+
+def record_sales(db: Session, lines: List[Tuple[int, Optional[int], int, float]]):
+    """Add one order's (product_id, category_id, quantity, price) lines to
+    today's rollup rows, inside the caller's transaction.
+
+    Rows are written in key order so concurrent checkouts lock them in the
+    same order.
+    """
+    by_category: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    for _, category_id, quantity, price in lines:
+        if category_id is not None:
+            by_category[category_id][0] += quantity
+            by_category[category_id][1] += quantity * price
+
+    _upsert(db, ProductDailySales, ["product_id"], [
+        {"product_id": product_id, "orders": 1, "units": quantity, "revenue": quantity * price}
+        for product_id, _, quantity, price in sorted(lines)
+    ], ["orders", "units", "revenue"])
+    if by_category:
+        _upsert(db, CategoryDailySales, ["category_id"], [
+            {"category_id": category_id, "units": units, "revenue": revenue}
+            for category_id, (units, revenue) in sorted(by_category.items())
+        ], ["units", "revenue"])
+
+def rebuild_rollups(db: Session, since: Optional[date] = None) -> Tuple[int, int]:
+    """Recompute the rollups from orders, for every day or from `since` on.
+
+    Runs in the caller's transaction, so readers see the old rows until commit.
+    Returns the number of product and category rows written.
+    """
+    day = order_day(Order.created_at, db.get_bind().dialect.name)
+    sales = (
+        select(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.status != "cancelled")
+    )
+    if since is not None:
+        sales = sales.filter(day >= since)
+        db.execute(delete(ProductDailySales).where(ProductDailySales.day >= since))
+        db.execute(delete(CategoryDailySales).where(CategoryDailySales.day >= since))
+    else:
+        db.execute(delete(ProductDailySales))
+        db.execute(delete(CategoryDailySales))
+
+    revenue = func.sum(OrderItem.quantity * OrderItem.price)
+    products = db.execute(insert(ProductDailySales).from_select(
+        ["day", "product_id", "orders", "units", "revenue"],
+        sales.with_only_columns(
+            day, OrderItem.product_id, func.count(func.distinct(OrderItem.order_id)),
+            func.sum(OrderItem.quantity), revenue,
+        ).group_by(day, OrderItem.product_id)
+    )).rowcount
+    categories = db.execute(insert(CategoryDailySales).from_select(
+        ["day", "category_id", "units", "revenue"],
+        sales.join(Product, Product.id == OrderItem.product_id)
+        .filter(Product.category_id.isnot(None))
+        .with_only_columns(day, Product.category_id, func.sum(OrderItem.quantity), revenue)
+        .group_by(day, Product.category_id)
+    )).rowcount
+    return products, categories
+
+def _since(days: int) -> date:
+    # The rollup days are UTC dates, as stamped by the database
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+def product_units(db: Session, product_ids: List[int], days: int) -> Dict[int, int]:
+    """Units sold per product over the last `days` days, read from the rollup."""
+    if not product_ids:
+        return {}
+    return dict(
+        db.query(ProductDailySales.product_id, func.sum(ProductDailySales.units))
+        .filter(ProductDailySales.product_id.in_(product_ids), ProductDailySales.day >= _since(days))
+        .group_by(ProductDailySales.product_id)
+        .all()
+    )
+
+def best_sellers(db: Session, days: int = 30, limit: int = 20, category_id: Optional[int] = None,
+                 exclude: Optional[List[int]] = None) -> List[Product]:
+    """Products with the most units sold over the last `days` days."""
+    units = func.sum(ProductDailySales.units).label("units")
+    query = (
+        select(ProductDailySales.product_id, units)
+        .filter(ProductDailySales.day >= _since(days))
+        .group_by(ProductDailySales.product_id)
+    )
+    if category_id is not None:
+        query = query.join(Product, Product.id == ProductDailySales.product_id).filter(Product.category_id == category_id)
+    if exclude:
+        query = query.filter(ProductDailySales.product_id.notin_(exclude))
+
+    ranked = [product_id for product_id, _ in db.execute(query.order_by(units.desc(), ProductDailySales.product_id).limit(limit))]
+    products = {product.id: product for product in db.query(Product).filter(Product.id.in_(ranked))} if ranked else {}
+    return [products[product_id] for product_id in ranked if product_id in products]
+
+def main():
+    from app.models import user, category, cart  # noqa: F401 - mappers referenced by name
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup tables from orders")
+    parser.add_argument("--since", type=date.fromisoformat, help="only rebuild days from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        products, categories = rebuild_rollups(db, args.since)
+        db.commit()
+    print(f"Wrote {products} product and {categories} category rollup rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import math
+import os
+import re
+import heapq
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.services.catalog_version import catalog_generation
+
+SYNC_BATCH_SIZE = 1000
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(value) -> List[str]:
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+class Fts5Index:
+    """Product search backed by an SQLite FTS5 table keyed by product id.
+
+    Index rows are written through the caller's session, so they commit or roll
+    back together with the product change itself.
+    """
+
+    def setup(self, bind):
+        if not _has_fts_table(bind):
+            raise RuntimeError("products_fts is missing; run python -m app.services.migrations upgrade")
+
+    def index_product(self, db: Session, product: Product):
+        self.remove_product(db, product.id)  # type: ignore
+        db.execute(
+            text("INSERT INTO products_fts(rowid, title, description, sku) VALUES (:id, :title, :description, :sku)"),
+            {
+                "id": product.id,
+                "title": product.title,
+                "description": product.description or "",
+                "sku": product.sku or "",
+            }
+        )
+
+    def index_rows(self, db: Session, rows):
+        """Reindex many (id, title, description, sku) rows with two statements."""
+        db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), [{"id": row[0]} for row in rows])
+        db.execute(
+            text("INSERT INTO products_fts(rowid, title, description, sku) VALUES (:id, :title, :description, :sku)"),
+            [{"id": row[0], "title": row[1], "description": row[2] or "", "sku": row[3] or ""} for row in rows]
+        )
+
+    def remove_product(self, db: Session, product_id: int):
+        db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {"id": product_id})
+
+    def search(self, db: Session, query: str, limit: int) -> List[Tuple[int, float]]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        match = " ".join(f'"{token}"' for token in tokens)
+        rows = db.execute(
+            text(
+                "SELECT rowid, bm25(products_fts) AS rank FROM products_fts "
+                "WHERE products_fts MATCH :match ORDER BY rank LIMIT :limit"
+            ),
+            {"match": match, "limit": limit}
+        ).all()
+        # bm25() is lower-is-better in FTS5; flip it so callers see higher-is-better
+        return [(row[0], -row[1]) for row in rows]
+
+class InvertedIndex:
+    """In-process inverted index with Okapi BM25 ranking.
+
+    Used when FTS5 is not available (e.g. PostgreSQL). Each worker keeps its
+    own copy and only ever reads committed rows into it: before a search it
+    compares the catalog generation with the one it last synced at, and when
+    another write (from any worker) has bumped it, re-reads the products whose
+    row version changed and drops the ones that are gone. Product writes that
+    don't bump the generation show up at the next write that does.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Dict[str, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self.versions: Dict[int, int] = {}
+        self.generation: Optional[int] = None
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def setup(self, bind):
+        with Session(bind=bind) as db:
+            self.sync(db)
+
+    def sync(self, db: Session):
+        """Bring the index up to the committed products table; one query when nothing changed."""
+        generation, _ = catalog_generation(db)
+        if generation == self.generation:
+            return
+        with self.sync_lock:
+            if generation == self.generation:
+                return
+            versions = dict(db.query(Product.id, Product.version).all())
+            with self.lock:
+                for product_id in self.versions.keys() - versions.keys():
+                    self._discard(product_id)
+            changed = [product_id for product_id, version in versions.items() if self.versions.get(product_id) != version]
+            for start in range(0, len(changed), SYNC_BATCH_SIZE):
+                rows = db.query(Product.id, Product.title, Product.description, Product.sku).filter(
+                    Product.id.in_(changed[start:start + SYNC_BATCH_SIZE])
+                )
+                for row in rows:
+                    self.add(row.id, row.title, row.description, row.sku)
+            self.versions = versions
+            self.generation = generation
+
+    def add(self, product_id: int, *fields):
+        terms: Dict[str, int] = defaultdict(int)
+        for field in fields:
+            for token in tokenize(field):
+                terms[token] += 1
+
+        with self.lock:
+            self._discard(product_id)
+            self.doc_terms[product_id] = terms
+            self.doc_lengths[product_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[product_id]
+            for term, freq in terms.items():
+                self.postings[term][product_id] = freq
+
+    def _discard(self, product_id: int):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(product_id)
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(product_id, None)
+            if not docs:
+                del self.postings[term]
+
+    # Writes reach the index through sync() once they commit, never from the request itself
+    def index_product(self, db: Session, product: Product):
+        pass
+
+    def index_rows(self, db: Session, rows):
+        pass
+
+    def remove_product(self, db: Session, product_id: int):
+        pass
+
+    def search(self, db: Session, query: str, limit: int) -> List[Tuple[int, float]]:
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+
+        self.sync(db)
+        with self.lock:
+            total_docs = len(self.doc_terms)
+            if not total_docs:
+                return []
+            average_length = self.total_length / total_docs
+            postings = [self.postings.get(token) for token in tokens]
+            if not all(postings):
+                return []
+
+            # Every query term must match, so walk the rarest term's postings first
+            postings.sort(key=len)
+            scores: Dict[int, float] = {}
+            for docs in postings:
+                idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                candidates = scores.keys() if scores else docs.keys()
+                next_scores = {}
+                for product_id in candidates:
+                    freq = docs.get(product_id)
+                    if freq is None:
+                        continue
+                    length = self.doc_lengths[product_id]
+                    norm = freq + self.k1 * (1 - self.b + self.b * length / average_length)
+                    next_scores[product_id] = scores.get(product_id, 0.0) + idf * freq * (self.k1 + 1) / norm
+                scores = next_scores
+                if not scores:
+                    return []
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+_index = None
+_index_lock = threading.Lock()
+
+def _has_fts_table(bind) -> bool:
+    """Whether migration 0006 made the FTS5 table, which it does on SQLite builds with FTS5."""
+    return bind.dialect.name == "sqlite" and inspect(bind).has_table("products_fts")
+
+def get_search_index(db: Session):
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                bind = db.get_bind()
+                backend = os.getenv("SEARCH_BACKEND", "auto")
+                if backend == "fts5" or (backend == "auto" and _has_fts_table(bind)):
+                    index = Fts5Index()
+                else:
+                    index = InvertedIndex()
+                index.setup(bind)
+                _index = index
+    return _index
+
+def index_product(db: Session, product: Product):
+    get_search_index(db).index_product(db, product)
+
+def index_products(db: Session, rows):
+    """Index (id, title, description, sku) rows, e.g. from a bulk import."""
+    if rows:
+        get_search_index(db).index_rows(db, rows)
+
+def remove_product(db: Session, product_id: int):
+    get_search_index(db).remove_product(db, product_id)
+
+def search_products(db: Session, query: str, limit: int = 20) -> List[Product]:
+    ranked = get_search_index(db).search(db, query, limit)
+    if not ranked:
+        return []
+
+    products = db.query(Product).filter(Product.id.in_([product_id for product_id, _ in ranked])).all()
+    by_id = {product.id: product for product in products}
+    return [by_id[product_id] for product_id, _ in ranked if product_id in by_id]
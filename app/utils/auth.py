@@ -1,13 +1,21 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from app.database import get_db
 from app.models.user import User
 import os
+import threading
+import time
 
 # Security - Use a different scheme that doesn't have the 72-byte limit
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
@@ -18,12 +26,206 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Authenticated user cache
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+# memory: invalidations reach this process only; redis: every worker checks a shared user version
+USER_CACHE_BACKEND = os.getenv("AUTH_USER_CACHE_BACKEND", "memory")
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of the User columns routes need, safe to share between requests."""
+    id: int
+    email: str
+    name: str
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(id=user.id, email=user.email, name=user.name, role=user.role, is_active=user.is_active)
+
+class UserCache:
+    """Size-bounded LRU of UserSnapshots keyed by user id, with a TTL per entry.
+
+    User writes made through a Session invalidate entries in this process (see
+    the events below). With a Redis `client` they also bump a shared per-user
+    version, and every lookup compares it, so a role or is_active change made
+    by any worker applies on the next request everywhere. Without one, other
+    processes, and writes that bypass the Session entirely, are only seen
+    once the entry's TTL runs out. Admins are never cached (see
+    get_current_user), so that bound only applies to regular users.
+    """
+
+    def __init__(self, ttl: float, max_size: int, client=None, prefix: str = "user-version:"):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.client = client
+        self.prefix = prefix
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def version(self, user_id: int) -> Optional[tuple]:
+        """The shared version to pass to get() and put(); read it before loading the user."""
+        if self.client is None:
+            return None
+        # Blocking redis-py client; keep the round trip off the event loop
+        return tuple(await asyncio.to_thread(self.client.mget, self.prefix + "all", f"{self.prefix}{user_id}"))
+
+    def get(self, user_id: int, version: Optional[tuple] = None) -> Optional[UserSnapshot]:
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic() or entry[2] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, snapshot: UserSnapshot, version: Optional[tuple] = None):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl, version)
+            self.entries.move_to_end(snapshot.id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _publish(self, user_ids, everyone: bool):
+        for user_id in user_ids:
+            self.client.incr(f"{self.prefix}{user_id}")  # type: ignore
+        if everyone:
+            self.client.incr(self.prefix + "all")  # type: ignore
+
+    def publish(self, user_ids, everyone: bool = False):
+        """Bump the shared versions of committed user changes, so other workers drop them too."""
+        if self.client is None or not (user_ids or everyone):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # A worker thread or CLI; blocking here is fine
+            self._publish(user_ids, everyone)
+        else:
+            loop.run_in_executor(None, self._publish, list(user_ids), everyone)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+def _user_cache_client():
+    if USER_CACHE_BACKEND == "redis":
+        from app.services.redis_client import get_redis
+        return get_redis()
+    return None
+
+user_cache = UserCache(USER_CACHE_TTL, USER_CACHE_SIZE, _user_cache_client())
+
+# Drop cached snapshots whenever a user row changes. Invalidate on flush and
+# again after commit, so a request that re-caches the old row in between
+# doesn't keep it around until the TTL expires.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+# session.execute(update(User)...) skips the mapper events and names no rows
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_user_writes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is inspect(User):
+        user_cache.clear()
+        orm_execute_state.session.info["users_bulk_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    user_ids = session.info.pop("changed_user_ids", set())
+    everyone = session.info.pop("users_bulk_changed", False)
+    if everyone:
+        user_cache.clear()
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    user_cache.publish(user_ids, everyone)
+
+# Password hashing pool
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    argon2-cffi releases the GIL while hashing, so threads give real
+    parallelism without the shared request threadpool being tied up. At most
+    `queue_limit` hashes may be running or waiting; beyond that callers get an
+    immediate 503 instead of queueing behind a login burst.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.queue_limit = queue_limit
+        # Only touched from the event loop, so no lock is needed
+        self.pending = 0
+        self.rejected = 0
+
+    def check_capacity(self):
+        """Reject early, before the caller does any other work for the request."""
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _run(self, func, *args):
+        self.check_capacity()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """Return (valid, new_hash); new_hash is set when the stored hash is deprecated."""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+password_hasher = PasswordHasher(HASH_WORKERS, HASH_QUEUE_LIMIT)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -37,7 +239,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,13 +250,40 @@ async def get_current_user(
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub") # type: ignore
+        user_id: Optional[int] = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    # Tokens carry the user id, so most requests resolve from the cache. Admin
+    # tokens always re-read the row: a demotion or deactivation applies at once
+    # on every worker, whatever the cache backend.
+    version = None
+    if user_id is not None:
+        if payload.get("role") != "admin":
+            version = await user_cache.version(user_id)
+            snapshot = user_cache.get(user_id, version)
+            if snapshot is not None:
+                return _active(snapshot)
+        user = await db.get(User, user_id)
+    else:
+        # Tokens issued before the user id claim existed
+        user = await db.scalar(select(User).where(User.email == email))
+
     if user is None:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    snapshot = UserSnapshot.from_user(user)
+    # Only regular users are cached, so an admin is never served from a stale entry
+    if user_id is not None and snapshot.role != "admin":
+        user_cache.put(snapshot, version)
+    return _active(snapshot)
+
+def _active(snapshot: UserSnapshot) -> UserSnapshot:
+    if not snapshot.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return snapshot
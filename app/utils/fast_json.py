@@ -0,0 +1,82 @@
+import os
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Sequence
+from sqlalchemy.orm import Session
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used without it
+    orjson = None
+
+# Opt-in: list routes select plain column tuples and encode them directly,
+# skipping ORM instances and per-object response_model validation. The JSON
+# matches the declared schemas, which stay as the routes' response_model.
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# Column order follows the schema field order, so bodies match the slow path byte for byte
+PRODUCT_COLUMNS = (
+    Product.title, Product.description, Product.price, Product.stock, Product.sku,
+    Product.images, Product.category_id, Product.daftra_item_id, Product.id,
+)
+PRODUCT_FIELDS = tuple(column.key for column in PRODUCT_COLUMNS)
+
+ORDER_COLUMNS = (
+    Order.total_amount, Order.status, Order.daftra_invoice_id, Order.id, Order.user_id, Order.created_at,
+)
+ORDER_FIELDS = tuple(column.key for column in ORDER_COLUMNS)
+
+ORDER_ITEM_COLUMNS = (
+    OrderItem.product_id, OrderItem.quantity, OrderItem.price, OrderItem.id,
+    OrderItem.title, OrderItem.sku, OrderItem.image, OrderItem.line_total,
+)
+ORDER_ITEM_FIELDS = tuple(column.key for column in ORDER_ITEM_COLUMNS)
+
+def _default(value):
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _isoformat(value: datetime) -> str:
+    # Same rendering as pydantic: UTC offsets are written as "Z"
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def product_dicts(rows: Iterable[Sequence]) -> list:
+    return [dict(zip(PRODUCT_FIELDS, row)) for row in rows]
+
+def products_json(rows: Iterable[Sequence]) -> bytes:
+    """List[ProductResponse] JSON from rows selected with PRODUCT_COLUMNS."""
+    return dumps(product_dicts(rows))
+
+def orders_json(db: Session, rows: Sequence[Sequence]) -> bytes:
+    """List[OrderResponse] JSON from rows selected with ORDER_COLUMNS.
+
+    Items come from one SELECT ... IN over the page's order ids on order_items
+    alone, read as tuples outside the identity map.
+    """
+    items = defaultdict(list)
+    order_ids = [row[3] for row in rows]
+    if order_ids:
+        item_rows = (
+            db.query(OrderItem.order_id, *ORDER_ITEM_COLUMNS)
+            .filter(OrderItem.order_id.in_(order_ids))
+            .order_by(OrderItem.order_id, OrderItem.id)
+        )
+        for order_id, *item in item_rows:
+            items[order_id].append(dict(zip(ORDER_ITEM_FIELDS, item)))
+
+    orders = []
+    for row in rows:
+        order = dict(zip(ORDER_FIELDS, row))
+        order["items"] = items[order["id"]]
+        orders.append(order)
+    return dumps(orders)
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+from app.database import async_engine
+from app.models.order import Order
+
+# Query plans per response shape. Each one loads the whole nested response in a
+# fixed number of statements: the parent rows, then one SELECT ... IN for the
+# children. Order items carry their own product snapshot. Carts are served from
+# the cart store (see app.services.cart_store) and load their products in one IN.
+ORDER_PLAN = (selectinload(Order.items),)
+
+def query_orders(db: Session):
+    return db.query(Order).options(*ORDER_PLAN)
+
+def load_order(db: Session, order_id: int):
+    return query_orders(db).filter(Order.id == order_id).first()
+
+class StatementBudgetExceeded(AssertionError):
+    pass
+
+@contextmanager
+def assert_max_statements(limit: int, bind=async_engine.sync_engine):
+    """Fail if the block issues more than `limit` SQL statements on `bind`.
+
+    Meant for tests: wrap a TestClient call to pin a route's query count so an
+    N+1 regression shows up as a failure instead of a slow page.
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", count)
+
+    if len(statements) > limit:
+        raise StatementBudgetExceeded(
+            f"Expected at most {limit} statements, got {len(statements)}:\n" + "\n".join(statements)
+        )
@@ -0,0 +1,257 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+class _Sharded:
+    """Series kept per thread, merged only when scraped.
+
+    Each thread writes to its own dict, so recording needs no lock: requests
+    all run on the event loop thread, and worker threads (cart flush, outbox,
+    exports) get shards of their own. The lock is taken once per new thread.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.shards: List[dict] = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def _series(self) -> List[Tuple[tuple, object]]:
+        with self.lock:
+            shards = list(self.shards)
+        # dict.copy() is atomic under the GIL, so a shard can be read while its thread writes
+        return [item for shard in shards for item in shard.copy().items()]
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        totals: Dict[tuple, float] = {}
+        for labels, value in self._series():
+            totals[labels] = totals.get(labels, 0) + value  # type: ignore
+        return [f"{self.name}{self._label_text(labels)} {_number(value)}" for labels, value in sorted(totals.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: tuple, value: float):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # One slot per bucket, one for +Inf, then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        merged: Dict[tuple, list] = {}
+        for labels, series in self._series():
+            total = merged.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, value in enumerate(series):  # type: ignore
+                total[i] += value
+
+        lines = []
+        for labels, series in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Sharded] = []
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Collector returning ready exposition lines, run on every scrape."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")  # type: ignore
+            lines.extend(metric.render())  # type: ignore
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served", ("method",)))
+request_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements run per HTTP request", ("method", "route"), STATEMENT_BUCKETS))
+request_statement_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ("method", "route")))
+db_statements = registry.register(Counter(
+    "db_statements_total", "SQL statements executed by engine", ("engine",)))
+db_statement_time = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement latency by engine", ("engine",)))
+daftra_latency = registry.register(Histogram(
+    "daftra_request_duration_seconds", "Daftra API call latency", ("operation", "outcome")))
+
+# [statements, seconds] for the request being served; SQL run outside requests leaves it unset
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+
+def instrument_engine(engine: Engine, name: str):
+    """Count and time every statement on `engine`, and charge it to the current request."""
+    labels = (name,)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        db_statements.inc(labels)
+        db_statement_time.observe(labels, elapsed)
+        stats = _request_sql.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+def pool_collector(engines: Dict[str, Engine]) -> Callable[[], List[str]]:
+    """Expose each engine's PoolMetrics (see app.database) as gauges and counters."""
+    fields = (
+        ("db_pool_checkouts_total", "counter", "checkouts"),
+        ("db_pool_timeouts_total", "counter", "timeouts"),
+        ("db_pool_in_use", "gauge", "in_use"),
+        ("db_pool_peak_in_use", "gauge", "peak_in_use"),
+        ("db_pool_wait_max_seconds", "gauge", "wait_max_ms"),
+    )
+
+    def collect() -> List[str]:
+        snapshots = {name: engine.pool_metrics.snapshot() for name, engine in engines.items()}  # type: ignore
+        lines = []
+        for metric, kind, key in fields:
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, snapshot in snapshots.items():
+                value = snapshot[key] / 1000 if key.endswith("_ms") else snapshot[key]
+                lines.append(f'{metric}{{engine="{name}"}} {_number(value)}')
+        return lines
+
+    return collect
+
+def route_template(scope) -> str:
+    """The matched route's full path template, e.g. /api/products/{product_id}.
+
+    Included routers only know their own part of the path, so the prefix is
+    taken from the request path, segment for segment (path parameters here
+    never span segments).
+    """
+    route = scope.get("route")
+    if route is None or not hasattr(route, "path"):
+        return "unmatched"
+    template = route.path.split("/")[1:]
+    path = scope["path"].split("/")
+    return "/".join(path[:len(path) - len(template)] + template)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and SQL use per route.
+
+    Routes are labelled by their path template (e.g. /api/products/{product_id}),
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+        stats = [0, 0.0]
+        token = _request_sql.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec((method,))
+            _request_sql.reset(token)
+            route = route_template(scope)
+            http_requests.inc((method, route, status[0]))
+            http_latency.observe((method, route), elapsed)
+            request_statements.observe((method, route), stats[0])
+            request_statement_time.observe((method, route), stats[1])
+
+@contextmanager
+def timed(histogram: Histogram, *labels):
+    """Observe the block's duration into `histogram`, with an ok/error outcome label appended."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(labels + (outcome,), time.perf_counter() - started)
@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, or_, type_coerce
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+def datetime_bound(column, value: datetime, dialect_name: str):
+    """Return a (column, value) pair that compares correctly against `column`.
+
+    SQLite stores server-side timestamps as 'YYYY-MM-DD HH:MM:SS' text, which is
+    not equal to the microsecond format SQLAlchemy binds datetimes with, so on
+    SQLite the bound is rendered in the stored text format instead.
+    """
+    if dialect_name == "sqlite":
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+        return type_coerce(column, String), value.strftime(fmt)
+    return column, value
+
+def keyset_after(column, value, id_column, id_value, descending: bool = False):
+    """Rows strictly after (value, id_value) in (column, id_column) order."""
+    if descending:
+        return or_(column < value, and_(column == value, id_column < id_value))
+    return or_(column > value, and_(column == value, id_column > id_value))
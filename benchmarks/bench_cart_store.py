@@ -0,0 +1,109 @@
+"""Cart mutations/sec for each cart store backend.
+
+For every backend this measures raw store mutations (add/set/remove mixed),
+POST /api/cart/items through the app with concurrent clients, and the time
+to write all dirty carts back to the database in batches.
+
+    python benchmarks/bench_cart_store.py --users 200 --ops 50000 --requests 2000
+    python benchmarks/bench_cart_store.py --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.cart_store import MemoryCartBackend, RedisCartBackend, cart_store  # noqa: E402
+from app.services.redis_client import FakeRedis  # noqa: E402
+from app.utils.auth import create_access_token  # noqa: E402
+from app.services.migrations import upgrade  # noqa: E402
+
+upgrade()
+
+def setup(users: int, products: int):
+    with SessionLocal() as db:
+        db.add_all(Product(title=f"Cart product {i}", price=10.0, stock=1_000_000, sku=f"CART-{time.time_ns()}-{i}") for i in range(products))
+        accounts = [User(email=f"cart{i}-{time.time_ns()}@example.com", name="Cart", hashed_password="x") for i in range(users)]
+        db.add_all(accounts)
+        db.commit()
+        product_ids = [product_id for (product_id,) in db.query(Product.id)]
+        return [account.id for account in accounts], product_ids
+
+def raw_mutations(backend, user_ids, product_ids, ops):
+    for user_id in user_ids:
+        backend.load(user_id, user_id, {})
+    started = time.perf_counter()
+    for _ in range(ops):
+        user_id, product_id = random.choice(user_ids), random.choice(product_ids)
+        roll = random.random()
+        if roll < 0.6:
+            backend.add(user_id, product_id, 1)
+        elif roll < 0.85:
+            backend.set(user_id, product_id, 2)
+        else:
+            backend.remove(user_id, product_id)
+    return ops / (time.perf_counter() - started)
+
+async def http_mutations(user_ids, product_ids, requests, clients):
+    tokens = [{"Authorization": f"Bearer {create_access_token({'sub': 'bench', 'uid': user_id, 'role': 'user'})}"} for user_id in user_ids]
+    slots = asyncio.Semaphore(clients)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def add(i):
+            async with slots:
+                response = await client.post("/api/cart/items", headers=tokens[i % len(tokens)],
+                                             json={"product_id": random.choice(product_ids), "quantity": 1})
+                response.raise_for_status()
+
+        # Load every cart once so the timed run measures steady-state mutations
+        await asyncio.gather(*(client.get("/api/cart/", headers=headers) for headers in tokens))
+        started = time.perf_counter()
+        await asyncio.gather(*(add(i) for i in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+def flush_all():
+    started = time.perf_counter()
+    carts = 0
+    while True:
+        flushed = cart_store.flush()
+        if not flushed:
+            break
+        carts += flushed
+    return carts, time.perf_counter() - started
+
+async def main(args):
+    backends = {"memory": MemoryCartBackend, "fake": lambda: RedisCartBackend(FakeRedis())}
+    if args.redis_url:
+        import redis
+        backends["redis"] = lambda: RedisCartBackend(redis.Redis.from_url(args.redis_url), prefix=f"bench-cart-{time.time_ns()}:")
+
+    print(f"{'backend':>8} {'store ops/s':>12} {'HTTP adds/s':>12} {'flushed carts':>14} {'flush ms':>9}")
+    for name, make_backend in backends.items():
+        user_ids, product_ids = setup(args.users, args.products)
+        raw = raw_mutations(make_backend(), user_ids, product_ids, args.ops)
+
+        cart_store.backend = make_backend()
+        http = await http_mutations(user_ids, product_ids, args.requests, args.clients)
+        carts, flush_time = flush_all()
+        print(f"{name:>8} {raw:>12.0f} {http:>12.1f} {carts:>14} {flush_time * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=50000, help="raw store mutations per backend")
+    parser.add_argument("--requests", type=int, default=2000, help="POST /api/cart/items calls per backend")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent HTTP clients")
+    parser.add_argument("--redis-url", help="also benchmark a real Redis server")
+    # One event loop for every backend; the app's async engine is tied to it
+    asyncio.run(main(parser.parse_args()))
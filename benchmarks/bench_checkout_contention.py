@@ -0,0 +1,87 @@
+"""Concurrent checkouts against one hot SKU.
+
+Gives every simulated customer a cart holding the same product, fires the
+checkouts from parallel clients and then checks that units sold plus units
+left equals the starting stock (no overselling), reporting checkouts/sec.
+
+    python benchmarks/bench_checkout_contention.py --customers 200 --clients 16 --stock 150
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.cart import Cart, CartItem  # noqa: E402
+from app.models.order import OrderItem  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.auth import create_access_token, get_password_hash  # noqa: E402
+from app.services.migrations import upgrade  # noqa: E402
+
+upgrade()
+
+def setup(customers: int, stock: int):
+    password = get_password_hash("secret")
+    with SessionLocal() as db:
+        product = Product(title="Hot item", price=10.0, stock=stock, sku=f"HOT-{time.time_ns()}")
+        db.add(product)
+        users = [User(email=f"buyer{i}@example.com", name="Buyer", hashed_password=password) for i in range(customers)]
+        db.add_all(users)
+        db.flush()
+        for user in users:
+            cart = Cart(user_id=user.id)
+            db.add(cart)
+            db.flush()
+            db.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=1))
+        db.commit()
+        tokens = [create_access_token({"sub": user.email, "uid": user.id, "role": user.role}) for user in users]
+        return product.id, tokens
+
+async def run_checkouts(tokens, clients):
+    # One event loop, like a single server worker; at most `clients` checkouts in flight
+    statuses = {}
+    slots = asyncio.Semaphore(clients)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def checkout(token):
+            async with slots:
+                response = await client.post("/api/checkout/", headers={"Authorization": f"Bearer {token}"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        await asyncio.gather(*(checkout(token) for token in tokens))
+    return statuses
+
+def main(args):
+    product_id, tokens = setup(args.customers, args.stock)
+
+    started = time.perf_counter()
+    statuses = asyncio.run(run_checkouts(tokens, args.clients))
+    elapsed = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        left = db.query(Product.stock).filter(Product.id == product_id).scalar()
+        sold = db.query(func.coalesce(func.sum(OrderItem.quantity), 0)).filter(OrderItem.product_id == product_id).scalar()
+
+    print(f"responses:      {dict(sorted(statuses.items()))}")
+    print(f"checkouts/sec:  {statuses.get(200, 0) / elapsed:.1f}")
+    print(f"stock: start {args.stock}, sold {sold}, left {left}")
+    if sold + left != args.stock or left < 0 or sold > args.stock:
+        sys.exit("OVERSOLD: stock accounting does not add up")
+    print("no overselling")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent checkout clients")
+    parser.add_argument("--stock", type=int, default=150, help="starting stock of the hot SKU")
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""Login throughput while catalog reads run concurrently.
+
+Runs the app in-process against a throwaway SQLite database and reports
+logins/sec, 503 rejections and catalog read latency percentiles.
+
+    python benchmarks/bench_login.py --logins 32 --readers 16 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.migrations import upgrade  # noqa: E402
+
+upgrade()
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(args.logins):
+            await client.post("/api/auth/register", json={"email": f"user{i}@example.com", "name": "Bench", "password": "secret"})
+
+        deadline = time.perf_counter() + args.seconds
+        logins = {"ok": 0, "rejected": 0}
+        read_latencies = []
+
+        async def login_loop(i):
+            while time.perf_counter() < deadline:
+                response = await client.post("/api/auth/login", json={"email": f"user{i}@example.com", "password": "secret"})
+                logins["ok" if response.status_code == 200 else "rejected"] += 1
+
+        async def read_loop():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/api/products/")
+                read_latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(
+            *(login_loop(i) for i in range(args.logins)),
+            *(read_loop() for _ in range(args.readers)),
+        )
+
+    print(f"logins/sec:        {logins['ok'] / args.seconds:.1f}")
+    print(f"logins rejected:   {logins['rejected']}")
+    print(f"catalog reads/sec: {len(read_latencies) / args.seconds:.1f}")
+    print(f"catalog p50/p99:   {percentile(read_latencies, 50):.1f} / {percentile(read_latencies, 99):.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=16, help="concurrent catalog readers")
+    parser.add_argument("--seconds", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
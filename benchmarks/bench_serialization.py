@@ -0,0 +1,101 @@
+"""List serialization: response_model path against the FAST_JSON column-tuple path.
+
+Loads N products and N orders (two items each), then times query plus encode
+for both paths at each size and checks that they produce the same JSON.
+
+    python benchmarks/bench_serialization.py --sizes 100 1000 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from pydantic import TypeAdapter  # noqa: E402
+from app.main import app  # noqa: E402,F401
+from app.database import SessionLocal  # noqa: E402
+from app.models.order import Order, OrderItem  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.order import OrderResponse  # noqa: E402
+from app.schemas.product import ProductResponse  # noqa: E402
+from app.utils.fast_json import PRODUCT_COLUMNS, ORDER_COLUMNS, products_json, orders_json  # noqa: E402
+from app.utils.loaders import query_orders  # noqa: E402
+from app.services.migrations import upgrade  # noqa: E402
+
+upgrade()
+
+products_adapter = TypeAdapter(List[ProductResponse])
+orders_adapter = TypeAdapter(List[OrderResponse])
+
+def setup(rows: int):
+    with SessionLocal() as db:
+        user = User(email="bench@example.com", name="Bench", hashed_password="x", role="admin")
+        db.add(user)
+        db.bulk_insert_mappings(Product, [  # type: ignore
+            {"title": f"Product {i}", "description": "Benchmark product " * 4, "price": 10.0 + i % 90,
+             "stock": 100, "sku": f"BENCH-{i}", "images": [f"https://cdn.example.com/{i}.jpg"]}
+            for i in range(rows)
+        ])
+        db.flush()
+        db.bulk_insert_mappings(Order, [  # type: ignore
+            {"user_id": user.id, "total_amount": 30.0, "status": "completed"} for _ in range(rows)
+        ])
+        db.flush()
+        order_ids = [order_id for (order_id,) in db.query(Order.id)]
+        product_ids = [product_id for (product_id,) in db.query(Product.id)]
+        db.bulk_insert_mappings(OrderItem, [  # type: ignore
+            {"order_id": order_id, "product_id": product_ids[(i + k) % len(product_ids)], "quantity": 1, "price": 15.0,
+             "line_total": 15.0, "title": "Benchmark product", "sku": f"BENCH-{(i + k) % len(product_ids)}",
+             "image": "https://cdn.example.com/0.jpg"}
+            for i, order_id in enumerate(order_ids) for k in range(2)
+        ])
+        db.commit()
+
+# What FastAPI does for response_model: validate from attributes, dump to JSON-able python, json.dumps
+def slow_products(db, n):
+    products = db.query(Product).order_by(Product.id).limit(n).all()
+    data = products_adapter.dump_python(products_adapter.validate_python(products, from_attributes=True), mode="json")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+def fast_products(db, n):
+    return products_json(db.query(*PRODUCT_COLUMNS).order_by(Product.id).limit(n).all())
+
+def slow_orders(db, n):
+    orders = query_orders(db).order_by(Order.id).limit(n).all()
+    data = orders_adapter.dump_python(orders_adapter.validate_python(orders, from_attributes=True), mode="json")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+def fast_orders(db, n):
+    return orders_json(db, db.query(*ORDER_COLUMNS).order_by(Order.id).limit(n).all())
+
+def best_of(fn, n, repeat):
+    timings = []
+    for _ in range(repeat):
+        # Fresh session each run so the identity map does not carry over
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            body = fn(db, n)
+            timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+def main(args):
+    setup(max(args.sizes))
+    print(f"{'rows':>7} {'shape':>9} {'response_model ms':>18} {'fast ms':>9} {'speedup':>8}")
+    for n in args.sizes:
+        for shape, slow, fast in (("products", slow_products, fast_products), ("orders", slow_orders, fast_orders)):
+            slow_time, slow_body = best_of(slow, n, args.repeat)
+            fast_time, fast_body = best_of(fast, n, args.repeat)
+            assert json.loads(slow_body) == json.loads(fast_body), f"{shape} bodies differ at {n} rows"
+            print(f"{n:>7} {shape:>9} {slow_time * 1000:>18.1f} {fast_time * 1000:>9.1f} {slow_time / fast_time:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
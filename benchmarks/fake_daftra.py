@@ -0,0 +1,58 @@
+"""A local stand-in for the Daftra invoices API.
+
+Accepts POST /invoices and answers with a new invoice id after an optional
+delay, failing a configurable share of requests. A repeated Idempotency-Key
+gets the first invoice's id back instead of a new invoice. Run it as a server:
+
+    python benchmarks/fake_daftra.py --port 8081 --latency-ms 50 --failure-rate 0.1
+    DAFTRA_BASE_URL=http://127.0.0.1:8081 DAFTRA_TOKEN=test uvicorn app.main:app
+
+or mount it in-process with httpx.ASGITransport(app=create_app(...)).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from fastapi import FastAPI, HTTPException, Request
+
+def create_app(latency_ms: float = 0.0, failure_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Daftra")
+    ids = itertools.count(1)
+    app.state.invoices = {}
+    app.state.idempotency_keys = {}
+
+    @app.post("/invoices")
+    async def create_invoice(request: Request):
+        if request.headers.get("authorization", "") in ("", "Bearer None"):
+            raise HTTPException(status_code=401, detail="Missing token")
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if random.random() < failure_rate:
+            raise HTTPException(status_code=503, detail="Injected failure")
+
+        key = request.headers.get("idempotency-key")
+        if key in app.state.idempotency_keys:
+            return {"id": app.state.idempotency_keys[key]}
+
+        invoice_id = next(ids)
+        app.state.invoices[invoice_id] = await request.json()
+        if key:
+            app.state.idempotency_keys[key] = invoice_id
+        return {"id": invoice_id}
+
+    @app.get("/invoices")
+    async def list_invoices():
+        return {"count": len(app.state.invoices)}
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.failure_rate), host=args.host, port=args.port)
@@ -0,0 +1,200 @@
+"""Fill the database with a reproducible synthetic shop.
+
+Creates categories, products, users, open carts, and orders with their items.
+Rows go in with bulk Core inserts and explicit ids. The same --seed and
+--scale always give the same rows, so runs on different commits compare like
+with like. --scale is the approximate total row count; each table can also be
+sized on its own.
+
+    python benchmarks/generate_data.py --scale 100000 --seed 42
+    DATABASE_URL=postgresql://... python benchmarks/generate_data.py --scale 10000000
+
+Meant for a fresh database; ids continue after any existing rows.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+from sqlalchemy import func, insert  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.cart import Cart, CartItem  # noqa: E402
+from app.models.category import Category  # noqa: E402
+from app.models.order import Order, OrderItem  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.catalog_version import bump_catalog_generation  # noqa: E402
+from app.services.migrations import upgrade  # noqa: E402
+from app.services.sales_rollup import rebuild_rollups  # noqa: E402
+from app.services.search import Fts5Index, get_search_index, index_products  # noqa: E402
+from app.utils.auth import get_password_hash  # noqa: E402
+
+CHUNK = 10_000
+WORDS = (
+    "blue red green black white steel wooden cotton leather classic compact deluxe portable "
+    "smart wireless organic vintage modern lamp chair desk mug bottle jacket shoe bag speaker "
+    "watch kettle blanket backpack notebook headphones charger"
+).split()
+
+def sizes(args) -> dict:
+    scale = args.scale
+    products = args.products or max(100, scale // 10)
+    users = args.users or max(50, scale // 20)
+    return {
+        "categories": args.categories or max(5, products // 500),
+        "products": products,
+        "users": users,
+        "carts": args.carts if args.carts is not None else users // 3,
+        "orders": args.orders if args.orders is not None else scale // 4,
+    }
+
+def next_id(db, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+def bulk_insert(db, model, rows) -> int:
+    """Insert an iterable of row dicts CHUNK at a time; returns the row count."""
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            db.execute(insert(model), chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+        written += len(chunk)
+    return written
+
+def generate(db, counts: dict, seed: int, days: int) -> dict:
+    rng = random.Random(seed)
+    written = {}
+
+    first_category = next_id(db, Category)
+    category_ids = list(range(first_category, first_category + counts["categories"]))
+    written["categories"] = bulk_insert(db, Category, (
+        {"id": category_id, "name": f"Category {category_id}", "description": f"Generated category {category_id}"}
+        for category_id in category_ids
+    ))
+
+    # Product popularity follows a long tail, like a real catalog
+    first_product = next_id(db, Product)
+    product_ids = list(range(first_product, first_product + counts["products"]))
+    prices = {}
+    titles = {}
+
+    def products():
+        for product_id in product_ids:
+            prices[product_id] = round(rng.uniform(2, 500), 2)
+            titles[product_id] = f"{' '.join(rng.choices(WORDS, k=3)).title()} {product_id}"
+            yield {
+                "id": product_id,
+                "title": titles[product_id],
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "price": prices[product_id],
+                "stock": rng.randint(0, 1000),
+                "sku": f"GEN-{product_id}",
+                "images": [f"https://img.example.com/{product_id}.jpg"],
+                "category_id": rng.choice(category_ids),
+            }
+    written["products"] = bulk_insert(db, Product, products())
+    ranked = product_ids[:]
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(ranked))))
+
+    def pick_products(k: int):
+        return rng.choices(ranked, cum_weights=cum_weights, k=k)
+
+    # Hashing is deliberately slow, so every generated user shares one password
+    password = get_password_hash("secret")
+    first_user = next_id(db, User)
+    user_ids = list(range(first_user, first_user + counts["users"]))
+    written["users"] = bulk_insert(db, User, (
+        {"id": user_id, "email": f"gen-user-{user_id}@example.com", "name": f"User {user_id}",
+         "hashed_password": password, "role": "user", "is_active": True}
+        for user_id in user_ids
+    ))
+
+    cart_users = rng.sample(user_ids, min(counts["carts"], len(user_ids)))
+    first_cart = next_id(db, Cart)
+    written["carts"] = bulk_insert(db, Cart, (
+        {"id": first_cart + i, "user_id": user_id} for i, user_id in enumerate(cart_users)
+    ))
+    written["cart_items"] = bulk_insert(db, CartItem, (
+        {"cart_id": first_cart + i, "product_id": product_id, "quantity": rng.randint(1, 3)}
+        for i in range(len(cart_users))
+        for product_id in set(pick_products(rng.randint(1, 4)))
+    ))
+
+    # Orders spread over the last `days` days; microseconds keep timestamps in
+    # the same text format as rows stamped by the database on SQLite
+    now = datetime.utcnow()
+    first_order = next_id(db, Order)
+    written["orders"] = written["order_items"] = 0
+    for start in range(first_order, first_order + counts["orders"], CHUNK):
+        orders, items = [], []
+        for order_id in range(start, min(start + CHUNK, first_order + counts["orders"])):
+            lines = {product_id: rng.randint(1, 3) for product_id in pick_products(rng.randint(1, 3))}
+            items.extend(
+                {"order_id": order_id, "product_id": product_id, "quantity": quantity, "price": prices[product_id],
+                 "line_total": prices[product_id] * quantity, "title": titles[product_id], "sku": f"GEN-{product_id}",
+                 "image": f"https://img.example.com/{product_id}.jpg"}
+                for product_id, quantity in lines.items()
+            )
+            orders.append({
+                "id": order_id,
+                "user_id": rng.choice(user_ids),
+                "total_amount": round(sum(prices[product_id] * quantity for product_id, quantity in lines.items()), 2),
+                "status": "cancelled" if rng.random() < 0.03 else "completed",
+                "created_at": now - timedelta(seconds=rng.randint(0, days * 86400), microseconds=rng.randint(1, 999_999)),
+            })
+        written["orders"] += bulk_insert(db, Order, orders)
+        written["order_items"] += bulk_insert(db, OrderItem, items)
+    return written
+
+def main(args):
+    upgrade()
+    counts = sizes(args)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        # Set up search before the inserts so it doesn't need its own write transaction later
+        index = get_search_index(db)
+        written = generate(db, counts, args.seed, args.days)
+
+        if isinstance(index, Fts5Index):
+            rows = db.query(Product.id, Product.title, Product.description, Product.sku).filter(Product.sku.like("GEN-%"))
+            batch = []
+            for row in rows.yield_per(CHUNK):
+                batch.append(tuple(row))
+                if len(batch) == CHUNK:
+                    index_products(db, batch)
+                    batch = []
+            index_products(db, batch)
+
+        rebuild_rollups(db)
+        bump_catalog_generation(db)
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    total = sum(written.values())
+    for table, count in written.items():
+        print(f"{table:<12} {count:>10}")
+    print(f"{'total':<12} {total:>10}  in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10_000, help="approximate total rows (10k to 10M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365, help="order history length")
+    parser.add_argument("--categories", type=int)
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--carts", type=int)
+    parser.add_argument("--orders", type=int)
+    main(parser.parse_args())
@@ -0,0 +1,125 @@
+"""Many concurrent clients against the catalog, cart and order routes.
+
+Each client loops over a read-heavy mix (product list, product detail, cart,
+order history, occasional add-to-cart) for the given duration. Prints
+requests/sec and p50/p95/p99 latency overall and per route.
+
+Runs the app in-process by default; pass --url to load a server started
+separately (e.g. uvicorn app.main:app --workers 1). To compare before and
+after a change, run the same command on both checkouts.
+
+    python benchmarks/load_test.py --clients 500 --duration 20
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+async def setup(client: httpx.AsyncClient, products: int, users: int):
+    run = uuid.uuid4().hex[:8]
+
+    async def register(email, role="user"):
+        response = await client.post("/api/auth/register", json={"email": email, "name": "Load", "password": "secret", "role": role})
+        response.raise_for_status()
+        response = await client.post("/api/auth/login", json={"email": email, "password": "secret"})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    admin = await register(f"load-admin-{run}@example.com", "admin")
+    category = (await client.post("/api/categories/", json={"name": f"Load {run}"}, headers=admin)).json()
+    product_ids = []
+    for i in range(products):
+        response = await client.post("/api/products/", headers=admin, json={
+            "title": f"Load product {i}", "price": 5 + i % 50, "stock": 1_000_000,
+            "sku": f"LOAD-{run}-{i}", "category_id": category["id"],
+        })
+        response.raise_for_status()
+        product_ids.append(response.json()["id"])
+
+    # Users register sequentially; hashing is deliberately throttled
+    tokens = [await register(f"load-{run}-{i}@example.com") for i in range(users)]
+    return product_ids, tokens
+
+async def client_loop(client, product_ids, headers, deadline, latencies, statuses):
+    while time.perf_counter() < deadline:
+        roll = random.random()
+        if roll < 0.4:
+            route, request = "GET /api/products/", client.get("/api/products/", params={"limit": 20})
+        elif roll < 0.7:
+            route, request = "GET /api/products/{id}", client.get(f"/api/products/{random.choice(product_ids)}")
+        elif roll < 0.85:
+            route, request = "GET /api/cart/", client.get("/api/cart/", headers=headers)
+        elif roll < 0.95:
+            route, request = "GET /api/orders/", client.get("/api/orders/", headers=headers)
+        else:
+            route, request = "POST /api/cart/items", client.post(
+                "/api/cart/items", headers=headers, json={"product_id": random.choice(product_ids), "quantity": 1}
+            )
+
+        started = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        latencies[route].append(time.perf_counter() - started)
+        statuses[status] += 1
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    timeout = httpx.Timeout(60.0)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+        lifespan = contextlib.nullcontext()
+    else:
+        from app.main import app
+        from app.services.migrations import upgrade
+        upgrade()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://load", timeout=timeout)
+        # ASGITransport does not send lifespan events
+        lifespan = app.router.lifespan_context(app)
+
+    async with lifespan, client:
+        product_ids, tokens = await setup(client, args.products, args.users)
+        latencies = defaultdict(list)
+        statuses = defaultdict(int)
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, product_ids, tokens[i % len(tokens)], deadline, latencies, statuses)
+            for i in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    everything = [value for values in latencies.values() for value in values]
+    print(f"clients: {args.clients}  duration: {elapsed:.1f}s  requests: {len(everything)}")
+    print(f"requests/sec: {len(everything) / elapsed:.1f}")
+    print(f"statuses: {dict(statuses)}")
+    print(f"{'route':<24} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, values in sorted(latencies.items()) + [("all", everything)]:
+        print(f"{route:<24} {len(values):>7} {percentile(values, 0.5):>9.1f} "
+              f"{percentile(values, 0.95):>9.1f} {percentile(values, 0.99):>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; default runs the app in-process")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,281 @@
+"""Scenario-driven load suite with a JSON report for comparing commits.
+
+Simulated shoppers loop over weighted scenarios against a database filled by
+generate_data.py. The scenarios are: browse the catalog, view a product and
+its related items, change a cart, and check out. Checkout invoices go to the
+local fake Daftra (benchmarks/fake_daftra.py), mounted in-process. Throughput
+and p50/p95/p99 latency per endpoint are written to a JSON file.
+
+    python benchmarks/generate_data.py --scale 100000
+    python benchmarks/scenarios.py --clients 100 --duration 30 --output before.json
+    git checkout my-branch
+    python benchmarks/scenarios.py --clients 100 --duration 30 --output after.json --compare before.json
+
+Pass --url to load a server started separately; that server then needs its
+own DAFTRA_BASE_URL pointing at a running fake_daftra.py.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("DAFTRA_BASE_URL", "http://fake-daftra")
+os.environ.setdefault("DAFTRA_TOKEN", "bench")
+
+import httpx  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.category import Category  # noqa: E402
+from app.models.order import Order  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.auth import create_access_token  # noqa: E402
+
+SEARCH_TERMS = ["lamp", "blue", "wireless", "chair", "leather bag", "smart watch", "mug"]
+SORTS = ["id", "price", "-price", "title"]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def request(self, client: httpx.AsyncClient, method: str, endpoint: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        if self.recording:
+            label = f"{method} {endpoint}"
+            self.latencies[label].append(time.perf_counter() - started)
+            self.statuses[label][status] += 1
+        return response
+
+class Shopper:
+    """One simulated user with their own seeded random stream."""
+
+    def __init__(self, recorder: Recorder, client: httpx.AsyncClient, user, catalog, seed: int):
+        self.recorder = recorder
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {create_access_token({'sub': user[1], 'uid': user[0], 'role': 'user'})}"}
+        self.catalog = catalog
+        self.rng = random.Random(seed)
+
+    def request(self, method, endpoint, url, auth=False, **kwargs):
+        if auth:
+            kwargs["headers"] = self.headers
+        return self.recorder.request(self.client, method, endpoint, url, **kwargs)
+
+    async def browse(self):
+        await self.request("GET", "/api/categories/", "/api/categories/")
+        params = {"limit": 20, "sort": self.rng.choice(SORTS)}
+        if self.rng.random() < 0.7:
+            params["category_id"] = self.rng.choice(self.catalog["categories"])
+        response = await self.request("GET", "/api/products/", "/api/products/", params=params)
+        cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+        if cursor and self.rng.random() < 0.5:
+            await self.request("GET", "/api/products/", "/api/products/", params={**params, "cursor": cursor})
+        if self.rng.random() < 0.3:
+            await self.request("GET", "/api/products/search", "/api/products/search", params={"q": self.rng.choice(SEARCH_TERMS)})
+
+    async def product(self):
+        product_id = self.rng.choice(self.catalog["products"])
+        await self.request("GET", "/api/products/{product_id}", f"/api/products/{product_id}")
+        await self.request("GET", "/api/productdetails/{product_id}/related", f"/api/productdetails/{product_id}/related")
+        if self.rng.random() < 0.3:
+            await self.request("GET", "/api/products/best-sellers", "/api/products/best-sellers", params={"limit": 10})
+
+    async def cart(self):
+        first, second = self.rng.sample(self.catalog["in_stock"], 2)
+        await self.request("GET", "/api/cart/", "/api/cart/", auth=True)
+        await self.request("POST", "/api/cart/items", "/api/cart/items", auth=True, json={"product_id": first, "quantity": 1})
+        await self.request("PATCH", "/api/cart/items", "/api/cart/items", auth=True, json={"operations": [
+            {"op": "add", "product_id": second, "quantity": 1},
+            {"op": "set", "product_id": first, "quantity": 2},
+        ]})
+        await self.request("DELETE", "/api/cart/items/{item_id}", f"/api/cart/items/{second}", auth=True)
+
+    async def checkout(self):
+        for product_id in self.rng.sample(self.catalog["in_stock"], self.rng.randint(1, 2)):
+            await self.request("POST", "/api/cart/items", "/api/cart/items", auth=True, json={"product_id": product_id, "quantity": 1})
+        await self.request("POST", "/api/checkout/", "/api/checkout/", auth=True)
+        await self.request("GET", "/api/orders/", "/api/orders/", auth=True, params={"limit": 10})
+
+async def shopper_loop(shopper: Shopper, mix, deadline: float, runs):
+    names, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        name = shopper.rng.choices(names, weights)[0]
+        try:
+            await getattr(shopper, name)()
+            runs[name]["ok"] += 1
+        except Exception:
+            runs[name]["failed"] += 1
+
+def load_catalog(clients: int, seed: int):
+    rng = random.Random(seed)
+    with SessionLocal() as db:
+        dataset = {
+            "users": db.query(func.count(User.id)).scalar(),
+            "products": db.query(func.count(Product.id)).scalar(),
+            "orders": db.query(func.count(Order.id)).scalar(),
+        }
+        if not dataset["products"]:
+            sys.exit("The database has no products; run benchmarks/generate_data.py first")
+        users = db.query(User.id, User.email).filter(User.role == "user").order_by(User.id).limit(clients * 10).all()
+        # A bounded, seeded sample keeps the working set the same between runs
+        product_ids = [row[0] for row in db.query(Product.id).order_by(Product.id).limit(50_000)]
+        in_stock = [row[0] for row in db.query(Product.id).filter(Product.stock > 100).order_by(Product.id).limit(50_000)]
+        categories = [row[0] for row in db.query(Category.id).order_by(Category.id)]
+    catalog = {
+        "products": rng.sample(product_ids, min(len(product_ids), 5000)),
+        "in_stock": rng.sample(in_stock, min(len(in_stock), 5000)),
+        "categories": categories,
+    }
+    return dataset, rng.sample(users, min(len(users), clients)), catalog
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    def stats(values, statuses):
+        errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500)
+        return {
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 0.5), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "errors": errors,
+            "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        }
+
+    everything = [value for values in recorder.latencies.values() for value in values]
+    all_statuses = defaultdict(int)
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+    return {
+        "total": stats(everything, all_statuses),
+        "endpoints": {label: stats(values, recorder.statuses[label]) for label, values in sorted(recorder.latencies.items())},
+    }
+
+def compare(report: dict, baseline: dict):
+    print(f"\n{'endpoint vs ' + str(baseline['meta'].get('commit')):<48} {'rps':>14} {'p95 ms':>16} {'p99 ms':>16}")
+    rows = [("all", report["total"], baseline["total"])] + [
+        (label, stats, baseline["endpoints"][label])
+        for label, stats in report["endpoints"].items() if label in baseline["endpoints"]
+    ]
+    for label, new, old in rows:
+        cells = []
+        for key in ("rps", "p95_ms", "p99_ms"):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{new[key]:>8.1f} {change:>+6.0f}%")
+        print(f"{label:<48} " + " ".join(cells))
+
+async def run(args, mix):
+    dataset, users, catalog = load_catalog(args.clients, args.seed)
+    recorder = Recorder()
+    runs = defaultdict(lambda: {"ok": 0, "failed": 0})
+    timeout = httpx.Timeout(60.0)
+
+    if args.url:
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+        lifespan = contextlib.nullcontext()
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from fake_daftra import create_app
+        from app.main import app
+        from app.services.daftra_client import start_http_client
+
+        # Installed before the lifespan starts, so invoices go to the fake
+        await start_http_client(httpx.ASGITransport(app=create_app(args.daftra_latency_ms)))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=timeout)
+        lifespan = app.router.lifespan_context(app)
+
+    async with lifespan, client:
+        shoppers = [Shopper(recorder, client, user, catalog, args.seed + i) for i, user in enumerate(users)]
+        if args.warmup:
+            deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*(shopper_loop(shopper, mix, deadline, defaultdict(lambda: {"ok": 0, "failed": 0})) for shopper in shoppers))
+
+        recorder.recording = True
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(shopper_loop(shopper, mix, deadline, runs) for shopper in shoppers))
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "target": args.url or "in-process",
+            "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+            "clients": len(shoppers),
+            "duration_s": round(elapsed, 1),
+            "seed": args.seed,
+            "mix": mix,
+            "dataset": dataset,
+        },
+        "scenarios": dict(runs),
+        **summarize(recorder, elapsed),
+    }
+    return report
+
+def main(args):
+    mix = {name: float(weight) for name, weight in (part.split("=") for part in args.mix.split(","))}
+    unknown = set(mix) - {"browse", "product", "cart", "checkout"}
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args, mix))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    total = report["total"]
+    print(f"clients: {report['meta']['clients']}  duration: {report['meta']['duration_s']}s  "
+          f"requests: {total['count']}  requests/sec: {total['rps']}  errors: {total['errors']}")
+    print(f"{'endpoint':<48} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, stats in list(report["endpoints"].items()) + [("all", total)]:
+        print(f"{label:<48} {stats['count']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    print(f"report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; default runs the app in-process")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent shoppers")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds run before recording")
+    parser.add_argument("--mix", default="browse=50,product=30,cart=15,checkout=5", help="scenario weights")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--daftra-latency-ms", type=float, default=50.0, help="fake Daftra response delay")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier report to show changes against")
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported, so point them at a scratch
+# database, with no replicas and no Daftra worker, before anything imports app
+_data_dir = tempfile.mkdtemp(prefix="ecommerce-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/test.db"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.pop("DAFTRA_TOKEN", None)
+# Tests flush carts themselves
+os.environ["CART_FLUSH_INTERVAL"] = "3600"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+from app.database import Base, engine, recent_writers
+from app.main import app
+from app.services import cart_store as cart_store_module
+from app.services import product_cache as product_cache_module
+from app.services.migrations import upgrade
+from app.utils.auth import user_cache
+
+upgrade()
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Each test starts from empty tables and empty in-process caches."""
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        if inspect(conn).has_table("products_fts"):
+            conn.execute(text("DELETE FROM products_fts"))
+    cart_store_module.cart_store.backend = cart_store_module.MemoryCartBackend()
+    product_cache_module.product_cache.backend = product_cache_module._make_backend()
+    user_cache.clear()
+    recent_writers.until.clear()
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+def auth_headers(client, email: str, role: str = "user") -> dict:
+    response = client.post("/api/auth/register", json={"email": email, "name": email.split("@")[0], "password": "secret", "role": role})
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", json={"email": email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def admin_headers(client):
+    return auth_headers(client, "admin@example.com", role="admin")
+
+@pytest.fixture
+def user_headers(client):
+    return auth_headers(client, "shopper@example.com")
+
+@pytest.fixture
+def category(client, admin_headers):
+    response = client.post("/api/categories/", json={"name": "Widgets"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.fixture
+def make_product(client, admin_headers, category):
+    """make_product(**fields) -> the created product as returned by the API."""
+    counter = iter(range(1, 10_000))
+
+    def make(**fields):
+        number = next(counter)
+        body = {
+            "title": f"Widget {number}",
+            "description": "A sturdy widget",
+            "price": 10.0,
+            "stock": 10,
+            "sku": f"W-{number}",
+            "category_id": category["id"],
+            **fields,
+        }
+        response = client.post("/api/products/", json=body, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
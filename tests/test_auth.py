@@ -0,0 +1,46 @@
+from sqlalchemy import update
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.services.redis_client import FakeRedis
+from app.utils.auth import UserCache, USER_CACHE_SIZE, USER_CACHE_TTL, user_cache
+
+def me(client, headers):
+    return client.get("/api/auth/me", headers=headers)
+
+def write_elsewhere(user_id, **values):
+    """A write this process's Session never sees, as from another worker or a script."""
+    with engine.begin() as conn:
+        conn.execute(update(User.__table__).where(User.id == user_id).values(**values))
+
+def test_bulk_update_through_a_session_drops_cached_users(client, user_headers):
+    user_id = me(client, user_headers).json()["id"]
+    assert me(client, user_headers).status_code == 200
+
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(is_active=False))
+        db.commit()
+
+    response = me(client, user_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+def test_shared_version_spreads_invalidations_between_workers(client, user_headers, monkeypatch):
+    shared = FakeRedis()
+    monkeypatch.setattr(user_cache, "client", shared)
+    user_id = me(client, user_headers).json()["id"]
+    assert user_cache.get(user_id, (None, None)) is not None
+
+    write_elsewhere(user_id, is_active=False)
+    # Only the shared version tells this worker about it
+    assert me(client, user_headers).status_code == 200
+    UserCache(USER_CACHE_TTL, USER_CACHE_SIZE, shared).publish([user_id])
+
+    assert me(client, user_headers).status_code == 400
+
+def test_admins_are_read_fresh_on_every_request(client, admin_headers):
+    admin_id = me(client, admin_headers).json()["id"]
+    assert client.get("/api/auth/cache-stats", headers=admin_headers).status_code == 200
+    assert user_cache.get(admin_id) is None
+
+    write_elsewhere(admin_id, role="user")
+    assert client.get("/api/auth/cache-stats", headers=admin_headers).status_code == 403
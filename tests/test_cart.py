@@ -0,0 +1,190 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models.cart import Cart, CartItem
+from app.routes import cart as cart_routes
+from app.services import cart_store as cart_store_module
+from app.services.cart_store import CART_FLUSH_MAX_FAILURES, MemoryCartBackend, RedisCartBackend, cart_store
+from app.services.redis_client import FakeRedis
+from tests.conftest import auth_headers
+
+@pytest.fixture(params=["memory", "fake"])
+def backend(request):
+    """Runs a test against the in-process store and against the Redis code path."""
+    cart_store.backend = MemoryCartBackend() if request.param == "memory" else RedisCartBackend(FakeRedis())
+    return cart_store.backend
+
+def cart_lines(client, headers):
+    response = client.get("/api/cart/", headers=headers)
+    assert response.status_code == 200, response.text
+    return {item["product_id"]: item["quantity"] for item in response.json()["items"]}
+
+def test_cart_mutations(client, user_headers, make_product, backend):
+    first, second = make_product(), make_product()
+
+    assert client.post("/api/cart/items", json={"product_id": first["id"], "quantity": 2}, headers=user_headers).json()["quantity"] == 2
+    assert client.post("/api/cart/items", json={"product_id": first["id"], "quantity": 1}, headers=user_headers).json()["quantity"] == 3
+    assert client.put(f"/api/cart/items/{first['id']}", json={"quantity": 1}, headers=user_headers).status_code == 200
+    response = client.patch("/api/cart/items", json={"operations": [{"op": "add", "product_id": second["id"], "quantity": 4}]}, headers=user_headers)
+    assert response.status_code == 200, response.text
+    assert cart_lines(client, user_headers) == {first["id"]: 1, second["id"]: 4}
+
+    assert client.delete(f"/api/cart/items/{second['id']}", headers=user_headers).status_code == 200
+    assert client.delete(f"/api/cart/items/{second['id']}", headers=user_headers).status_code == 404
+    assert cart_lines(client, user_headers) == {first["id"]: 1}
+
+    assert client.delete("/api/cart/", headers=user_headers).status_code == 200
+    assert cart_lines(client, user_headers) == {}
+
+def test_bulk_update_is_all_or_nothing(client, user_headers, make_product, backend):
+    plenty, scarce = make_product(stock=10), make_product(stock=1)
+
+    response = client.patch("/api/cart/items", json={"operations": [
+        {"op": "add", "product_id": plenty["id"], "quantity": 2},
+        {"op": "add", "product_id": scarce["id"], "quantity": 2},
+    ]}, headers=user_headers)
+
+    assert response.status_code == 400
+    assert [item["product_id"] for item in response.json()["detail"]["items"]] == [scarce["id"]]
+    assert cart_lines(client, user_headers) == {}
+
+def stored_items(user_id):
+    with SessionLocal() as db:
+        return dict(
+            db.query(CartItem.product_id, CartItem.quantity)
+            .join(Cart, Cart.id == CartItem.cart_id)
+            .filter(Cart.user_id == user_id)
+            .all()
+        )
+
+def user_id_of(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["id"]
+
+def test_flush_writes_carts_back(client, user_headers, make_product, backend):
+    product = make_product()
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 2}, headers=user_headers)
+    user_id = user_id_of(client, user_headers)
+    assert stored_items(user_id) == {}
+
+    assert cart_store.flush() == 1
+    assert stored_items(user_id) == {product["id"]: 2}
+    assert cart_store.flush() == 0
+
+    # A fresh store loads the written-back cart
+    cart_store.backend = MemoryCartBackend()
+    assert cart_lines(client, user_headers) == {product["id"]: 2}
+
+def test_rejected_cart_does_not_hold_back_the_batch(client, user_headers, make_product, backend, monkeypatch, caplog):
+    product = make_product()
+    other_headers = auth_headers(client, "other@example.com")
+    for headers in (user_headers, other_headers):
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=headers)
+    bad_user, good_user = user_id_of(client, user_headers), user_id_of(client, other_headers)
+
+    real_write_carts = cart_store_module.write_carts
+
+    def write_carts(db, carts):
+        if bad_user in carts:
+            raise IntegrityError("INSERT INTO cart_items", {}, Exception("rejected"))
+        real_write_carts(db, carts)
+
+    monkeypatch.setattr(cart_store_module, "write_carts", write_carts)
+
+    cart_store.flush()
+    assert stored_items(good_user) == {product["id"]: 1}
+    assert stored_items(bad_user) == {}
+
+    # Retried on later flushes, then dropped from write-back with a log line
+    for _ in range(CART_FLUSH_MAX_FAILURES - 1):
+        assert cart_store.flush() == 1
+    assert "dropped from write-back" in caplog.text
+    assert cart_store.flush() == 0
+    assert cart_lines(client, user_headers) == {product["id"]: 1}
+
+def test_deleted_product_leaves_stored_carts(client, admin_headers, user_headers, make_product, backend):
+    kept, deleted = make_product(), make_product()
+    for product in (kept, deleted):
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    user_id = user_id_of(client, user_headers)
+    cart_store.flush()
+
+    assert client.delete(f"/api/products/{deleted['id']}", headers=admin_headers).status_code == 200
+
+    assert stored_items(user_id) == {kept["id"]: 1}
+    assert cart_lines(client, user_headers) == {kept["id"]: 1}
+    assert cart_store.flush() == 1
+    assert stored_items(user_id) == {kept["id"]: 1}
+
+def test_bulk_update_response_includes_lines_added_meanwhile(client, user_headers, make_product, backend, monkeypatch):
+    existing, concurrent, requested = make_product(), make_product(), make_product()
+    client.post("/api/cart/items", json={"product_id": existing["id"], "quantity": 1}, headers=user_headers)
+    user_id = user_id_of(client, user_headers)
+    real_load_products = cart_routes.load_products
+
+    async def load_products(db, product_ids):
+        products = await real_load_products(db, product_ids)
+        if concurrent["id"] not in product_ids:
+            # Another request adds a line while this one loads its products
+            await cart_store.add(user_id, concurrent["id"], 2)
+        return products
+
+    monkeypatch.setattr(cart_routes, "load_products", load_products)
+    response = client.patch("/api/cart/items", json={"operations": [{"op": "add", "product_id": requested["id"], "quantity": 1}]}, headers=user_headers)
+
+    assert response.status_code == 200, response.text
+    assert {item["product_id"]: item["quantity"] for item in response.json()["items"]} == {
+        existing["id"]: 1, concurrent["id"]: 2, requested["id"]: 1,
+    }
+
+def test_written_back_idle_carts_are_evicted_and_reload(client, user_headers, make_product):
+    product = make_product()
+    backend = cart_store.backend = MemoryCartBackend(ttl=0)
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 2}, headers=user_headers)
+    user_id = user_id_of(client, user_headers)
+
+    # Still waiting to be written back
+    assert backend.evict() == 0
+    assert cart_store.flush() == 1
+    assert not backend.is_loaded(user_id)
+    assert cart_lines(client, user_headers) == {product["id"]: 2}
+
+def test_store_keeps_the_most_recently_changed_carts(client, user_headers, make_product):
+    product = make_product()
+    backend = cart_store.backend = MemoryCartBackend(max_carts=1)
+    other_headers = auth_headers(client, "other@example.com")
+    for headers in (other_headers, user_headers):
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=headers)
+
+    cart_store.flush()
+    assert list(backend.carts) == [user_id_of(client, user_headers)]
+
+def test_redis_carts_expire_after_their_last_write(client, user_headers, make_product):
+    product = make_product()
+    backend = cart_store.backend = RedisCartBackend(FakeRedis(), ttl=60)
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 2}, headers=user_headers)
+    key = backend._key(user_id_of(client, user_headers))
+    assert key in backend.client.expires
+
+    cart_store.flush()
+    backend.client.expires[key] = 0
+    assert cart_lines(client, user_headers) == {product["id"]: 2}
+
+def test_change_to_an_evicted_cart_does_not_wipe_it(client, user_headers, make_product, backend):
+    kept, added = make_product(), make_product()
+    client.post("/api/cart/items", json={"product_id": kept["id"], "quantity": 1}, headers=user_headers)
+    user_id = user_id_of(client, user_headers)
+    cart_store.flush()
+
+    # The cart leaves the store, then a change lands before anything reloads it
+    if isinstance(backend, RedisCartBackend):
+        backend.client.delete(backend._key(user_id))
+    else:
+        backend.carts.clear()
+        backend.cart_ids.clear()
+    backend.add(user_id, added["id"], 1)
+    cart_store.flush()
+    assert stored_items(user_id) == {kept["id"]: 1}
+
+    assert cart_lines(client, user_headers) == {kept["id"]: 1, added["id"]: 1}
+    cart_store.flush()
+    assert stored_items(user_id) == {kept["id"]: 1, added["id"]: 1}
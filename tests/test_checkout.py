@@ -0,0 +1,76 @@
+from sqlalchemy import false, update
+from sqlalchemy.orm import Session
+from app.services import inventory
+
+def add_to_cart(client, headers, product_id, quantity):
+    response = client.post("/api/cart/items", json={"product_id": product_id, "quantity": quantity}, headers=headers)
+    assert response.status_code == 200, response.text
+
+def test_checkout_creates_order_and_takes_stock(client, user_headers, make_product):
+    product = make_product(price=12.5, stock=5)
+    add_to_cart(client, user_headers, product["id"], 2)
+
+    response = client.post("/api/checkout/", headers=user_headers)
+
+    assert response.status_code == 200, response.text
+    order = response.json()
+    assert order["total_amount"] == 25.0
+    assert [(item["product_id"], item["quantity"], item["title"]) for item in order["items"]] == [
+        (product["id"], 2, product["title"])
+    ]
+    assert client.get(f"/api/products/{product['id']}").json()["stock"] == 3
+    assert client.get("/api/cart/", headers=user_headers).json()["items"] == []
+
+def test_checkout_survives_reservation_retry(client, user_headers, make_product, monkeypatch):
+    """The first reservation attempt matches nothing, as if another checkout
+    held the stock and then gave it back; the retry's rollback expires every
+    product the route loaded."""
+    first, second = make_product(stock=5), make_product(stock=5)
+    add_to_cart(client, user_headers, first["id"], 1)
+    add_to_cart(client, user_headers, second["id"], 2)
+
+    real_reserve, real_rollback = inventory._reserve, Session.rollback
+    rollbacks = []
+
+    def rollback(self):
+        rollbacks.append(self)
+        monkeypatch.setattr(inventory, "_reserve", real_reserve)
+        real_rollback(self)
+
+    monkeypatch.setattr(inventory, "_reserve", update(inventory.products).where(false()).values(stock=0))
+    monkeypatch.setattr(Session, "rollback", rollback)
+
+    response = client.post("/api/checkout/", headers=user_headers)
+
+    assert response.status_code == 200, response.text
+    assert len(rollbacks) == 1
+    order = response.json()
+    assert sorted((item["product_id"], item["quantity"]) for item in order["items"]) == sorted(
+        [(first["id"], 1), (second["id"], 2)]
+    )
+    assert client.get(f"/api/products/{second['id']}").json()["stock"] == 3
+
+def test_checkout_reports_shortage(client, admin_headers, user_headers, make_product):
+    product = make_product(stock=3)
+    add_to_cart(client, user_headers, product["id"], 3)
+    # Sold elsewhere after it went into the cart
+    assert client.put(f"/api/products/{product['id']}", json={"stock": 1}, headers=admin_headers).status_code == 200
+
+    response = client.post("/api/checkout/", headers=user_headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["items"] == [
+        {"product_id": product["id"], "title": product["title"], "requested": 3, "available": 1}
+    ]
+    assert client.get(f"/api/products/{product['id']}").json()["stock"] == 1
+
+def test_checkout_asks_to_retry_when_stock_keeps_changing(client, user_headers, make_product, monkeypatch):
+    product = make_product(stock=5)
+    add_to_cart(client, user_headers, product["id"], 1)
+    monkeypatch.setattr(inventory, "_reserve", update(inventory.products).where(false()).values(stock=0))
+
+    response = client.post("/api/checkout/", headers=user_headers)
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/api/orders/", headers=user_headers).json() == []
@@ -0,0 +1,58 @@
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+def test_product_list_answers_304_until_the_catalog_changes(client, admin_headers, make_product):
+    product = make_product()
+    first = client.get("/api/products/")
+    etag = first.headers["etag"]
+    assert "last-modified" in first.headers
+
+    assert revalidate(client, "/api/products/", etag).status_code == 304
+    assert revalidate(client, "/api/products/?sort=price", etag).status_code == 200
+
+    client.put(f"/api/products/{product['id']}", json={"price": 99.0}, headers=admin_headers)
+    response = revalidate(client, "/api/products/", etag)
+    assert response.status_code == 200
+    assert response.json()[0]["price"] == 99.0
+
+def test_product_detail_etag_follows_the_row_version(client, user_headers, make_product):
+    product = make_product(stock=5)
+    url = f"/api/products/{product['id']}"
+    etag = client.get(url).headers["etag"]
+    assert revalidate(client, url, etag).status_code == 304
+
+    # Stock taken at checkout is a change to this product
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    client.post("/api/checkout/", headers=user_headers)
+    response = revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert response.json()["stock"] == 4
+
+def test_checkout_leaves_catalog_validators_alone_but_moves_best_sellers(client, user_headers, make_product):
+    product = make_product()
+    catalog_etag = client.get("/api/categories/").headers["etag"]
+    best_sellers = client.get("/api/products/best-sellers")
+    assert best_sellers.json() == []
+
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    client.post("/api/checkout/", headers=user_headers)
+
+    assert revalidate(client, "/api/categories/", catalog_etag).status_code == 304
+    response = revalidate(client, "/api/products/best-sellers", best_sellers.headers["etag"])
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [product["id"]]
+
+def test_checkout_moves_the_list_and_search_validators(client, user_headers, make_product):
+    product = make_product(stock=1, title="Last widget")
+    urls = ["/api/products/?in_stock=true", "/api/products/search?q=widget"]
+    etags = {url: client.get(url).headers["etag"] for url in urls}
+
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    assert client.post("/api/checkout/", headers=user_headers).status_code == 200
+
+    in_stock = revalidate(client, urls[0], etags[urls[0]])
+    assert in_stock.status_code == 200
+    assert in_stock.json() == []
+    search = revalidate(client, urls[1], etags[urls[1]])
+    assert search.status_code == 200
+    assert [item["stock"] for item in search.json()] == [0]
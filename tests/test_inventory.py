@@ -0,0 +1,62 @@
+import threading
+import pytest
+from sqlalchemy import false, update
+from app.database import SessionLocal
+from app.models.product import Product
+from app.services import inventory
+from app.services.inventory import StockContention, StockShortage, reserve_stock
+
+def stock_of(product_id):
+    with SessionLocal() as db:
+        return db.get(Product, product_id).stock
+
+def test_reserves_every_line(make_product):
+    first, second = make_product(stock=5), make_product(stock=2)
+
+    with SessionLocal() as db:
+        assert reserve_stock(db, {first["id"]: 3, second["id"]: 2}) == []
+        db.commit()
+
+    assert (stock_of(first["id"]), stock_of(second["id"])) == (2, 0)
+
+def test_reports_only_short_lines_and_reserves_none(make_product):
+    plenty, scarce = make_product(stock=5), make_product(stock=1)
+
+    with SessionLocal() as db:
+        shortages = reserve_stock(db, {plenty["id"]: 2, scarce["id"]: 3})
+        db.commit()
+
+    assert shortages == [StockShortage(product_id=scarce["id"], requested=3, available=1)]
+    assert (stock_of(plenty["id"]), stock_of(scarce["id"])) == (5, 1)
+
+def test_contention_is_retryable_not_a_shortage(make_product, monkeypatch):
+    """Every UPDATE misses but the stock reads back as sufficient each time."""
+    product = make_product(stock=5)
+    monkeypatch.setattr(inventory, "_reserve", update(inventory.products).where(false()).values(stock=0))
+
+    with SessionLocal() as db:
+        with pytest.raises(StockContention):
+            reserve_stock(db, {product["id"]: 1}, attempts=2)
+
+    assert stock_of(product["id"]) == 5
+
+def test_concurrent_reservations_never_oversell(make_product):
+    product = make_product(stock=5)
+    results = []
+    start = threading.Barrier(10)
+
+    def buy():
+        with SessionLocal() as db:
+            start.wait()
+            shortages = reserve_stock(db, {product["id"]: 1})
+            db.commit()
+            results.append(not shortages)
+
+    threads = [threading.Thread(target=buy) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 5
+    assert stock_of(product["id"]) == 0
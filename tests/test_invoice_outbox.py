@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.database import SessionLocal
+from app.models.invoice import InvoiceOutbox
+from app.models.order import Order
+from app.services import daftra_client, invoice_outbox
+from app.services.invoice_outbox import CircuitBreaker, InvoiceOutboxWorker, idempotency_key
+
+class FakeDaftra:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+
+    async def create_invoice(self, payload, idempotency_key=None):
+        self.calls.append(idempotency_key)
+        if self.fail:
+            raise Exception("Daftra API error: 503")
+        return {"id": 500 + len(self.calls)}
+
+@pytest.fixture
+def order_id(client, user_headers, make_product):
+    """An order whose invoice is waiting in the outbox."""
+    product = make_product()
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    return client.post("/api/checkout/", headers=user_headers).json()["id"]
+
+def outbox_row(order_id):
+    with SessionLocal() as db:
+        row = db.query(InvoiceOutbox).filter(InvoiceOutbox.order_id == order_id).one()
+        db.expunge(row)
+        return row
+
+def make_due(order_id):
+    with SessionLocal() as db:
+        db.query(InvoiceOutbox).filter(InvoiceOutbox.order_id == order_id).update(
+            {InvoiceOutbox.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+
+def test_sends_invoice_with_order_idempotency_key(order_id):
+    daftra = FakeDaftra()
+
+    assert asyncio.run(InvoiceOutboxWorker(client=daftra).drain_once()) == 1
+
+    assert daftra.calls == [idempotency_key(order_id)]
+    row = outbox_row(order_id)
+    assert (row.status, row.attempts, row.last_error) == ("sent", 1, None)
+    with SessionLocal() as db:
+        assert db.get(Order, order_id).daftra_invoice_id == "501"
+    assert asyncio.run(InvoiceOutboxWorker(client=daftra).drain_once()) == 0
+
+def test_failures_back_off_then_give_up(order_id, monkeypatch):
+    monkeypatch.setattr(invoice_outbox, "MAX_ATTEMPTS", 3)
+    worker = InvoiceOutboxWorker(client=FakeDaftra(fail=True), breaker=CircuitBreaker(failure_threshold=100))
+
+    delays = []
+    for attempt in range(1, 3):
+        started = datetime.utcnow()
+        assert asyncio.run(worker.drain_once()) == 1
+        row = outbox_row(order_id)
+        assert (row.status, row.attempts) == ("pending", attempt)
+        assert "503" in row.last_error
+        delays.append((row.next_attempt_at - started).total_seconds())
+        # Not due again until the backoff has passed
+        assert asyncio.run(worker.drain_once()) == 0
+        make_due(order_id)
+
+    base = invoice_outbox.BACKOFF_BASE
+    assert base * 0.5 <= delays[0] <= base + 1
+    assert base <= delays[1] <= 2 * base + 1
+
+    assert asyncio.run(worker.drain_once()) == 1
+    row = outbox_row(order_id)
+    assert (row.status, row.attempts) == ("failed", 3)
+
+def test_open_breaker_stops_sending(order_id):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    daftra = FakeDaftra()
+
+    assert asyncio.run(InvoiceOutboxWorker(client=daftra, breaker=breaker).drain_once()) == 0
+    assert daftra.calls == []
+    assert outbox_row(order_id).status == "pending"
+
+def test_result_of_an_expired_claim_is_not_recorded(order_id):
+    slow, fast = InvoiceOutboxWorker(client=FakeDaftra()), InvoiceOutboxWorker(client=FakeDaftra())
+
+    job_id, _, _, stale_lease = slow._claim_next()
+    # The lease runs out before the slow worker hears back, and another worker claims the row
+    make_due(order_id)
+    _, _, _, lease = fast._claim_next()
+
+    slow._mark_sent(job_id, stale_lease, {"id": 1})
+    slow._mark_failed(job_id, stale_lease, "timed out")
+    row = outbox_row(order_id)
+    assert (row.status, row.attempts, row.next_attempt_at) == ("pending", 0, lease)
+
+    fast._mark_sent(job_id, lease, {"id": 2})
+    assert outbox_row(order_id).status == "sent"
+    with SessionLocal() as db:
+        assert db.get(Order, order_id).daftra_invoice_id == "2"
+
+def test_client_sends_idempotency_key(monkeypatch):
+    monkeypatch.setenv("DAFTRA_TOKEN", "token")
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("idempotency-key"))
+        return httpx.Response(200, json={"id": 7})
+
+    async def scenario():
+        await daftra_client.close_http_client()
+        await daftra_client.start_http_client(httpx.MockTransport(handler))
+        try:
+            return await daftra_client.DaftraClient().create_invoice({"Invoice": {}}, "order-3-invoice")
+        finally:
+            await daftra_client.close_http_client()
+
+    assert asyncio.run(scenario()) == {"id": 7}
+    assert seen == ["order-3-invoice"]
@@ -0,0 +1,72 @@
+import os
+import shutil
+import sqlite3
+import pytest
+from sqlalchemy import inspect
+from app.database import Base, make_engine
+from app.services.migrations import check_schema, discover, upgrade
+
+LEGACY_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ecommerce.db")
+VERSIONS = [migration.version for migration in discover()]
+
+@pytest.fixture
+def make_db(tmp_path):
+    """make_db(copy_of=None) -> engine on a new SQLite file, optionally a copy of another database."""
+    engines = []
+
+    def make(copy_of=None):
+        path = tmp_path / f"db{len(engines)}.db"
+        if copy_of:
+            shutil.copy(copy_of, path)
+        engines.append(make_engine(f"sqlite:///{path}"))
+        return engines[-1], path
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+def assert_matches_models(engine):
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        assert inspector.has_table(table.name), table.name
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert {column.name for column in table.columns} <= columns, table.name
+
+def test_upgrades_a_database_made_by_create_all(make_db):
+    engine, path = make_db(copy_of=LEGACY_DB)
+    with sqlite3.connect(path) as conn:
+        users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        conn.execute("INSERT INTO products (id, title, price, stock, sku, images) VALUES (1, 'Lamp', 12.5, 3, 'L-1', '[\"lamp.jpg\"]')")
+        conn.execute("INSERT INTO orders (id, user_id, total_amount, status) VALUES (1, 1, 25.0, 'completed')")
+        conn.execute("INSERT INTO order_items (id, order_id, product_id, quantity, price) VALUES (1, 1, 1, 2, 12.5)")
+
+    assert [migration.version for migration in upgrade(engine)] == VERSIONS
+
+    assert_matches_models(engine)
+    assert check_schema(engine)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == users
+        assert conn.execute("SELECT version FROM products WHERE id = 1").fetchone() == (1,)
+        # Existing order items get their product snapshot backfilled
+        assert conn.execute("SELECT title, sku, image, line_total FROM order_items WHERE id = 1").fetchone() == (
+            "Lamp", "L-1", "lamp.jpg", 25.0
+        )
+    assert upgrade(engine) == []
+
+def test_builds_an_empty_database(make_db):
+    engine, _ = make_db()
+
+    assert [migration.version for migration in upgrade(engine)] == VERSIONS
+    assert_matches_models(engine)
+    # Search's FTS5 table comes from a migration too, not from app startup
+    assert inspect(engine).has_table("products_fts")
+
+def test_stops_at_target_and_resumes(make_db, caplog):
+    engine, _ = make_db()
+
+    assert [migration.version for migration in upgrade(engine, target=VERSIONS[1])] == VERSIONS[:2]
+    assert not check_schema(engine)
+    assert "run python -m app.services.migrations upgrade" in caplog.text
+
+    assert [migration.version for migration in upgrade(engine)] == VERSIONS[2:]
+    assert check_schema(engine)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import pytest
+from app.database import SessionLocal
+from app.models.order import Order
+from tests.conftest import auth_headers
+
+@pytest.fixture
+def order_ids(client, user_headers, make_product):
+    """Five orders, oldest first; several share a created_at second."""
+    product = make_product(stock=100)
+    ids = []
+    for _ in range(5):
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+        ids.append(client.post("/api/checkout/", headers=user_headers).json()["id"])
+    return ids
+
+def order_pages(client, headers, limit=2, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/orders/", headers=headers, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        ids += [order["id"] for order in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return ids
+
+def test_cursor_pages_list_orders_newest_first_once(client, user_headers, order_ids):
+    assert order_pages(client, user_headers) == order_ids[::-1]
+
+def test_filters_apply_across_pages(client, user_headers, order_ids):
+    with SessionLocal() as db:
+        db.query(Order).filter(Order.id.in_(order_ids[:2])).update({Order.status: "cancelled"})
+        db.query(Order).filter(Order.id == order_ids[0]).update({Order.created_at: datetime.utcnow() - timedelta(days=10)})
+        db.commit()
+
+    assert order_pages(client, user_headers, limit=1, status="completed") == order_ids[:1:-1]
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    assert order_pages(client, user_headers, limit=1, created_from=since) == order_ids[:0:-1]
+
+def test_users_only_page_through_their_own_orders(client, order_ids):
+    assert order_pages(client, auth_headers(client, "someone@example.com")) == []
+
+def test_invalid_cursor_is_rejected(client, user_headers, order_ids):
+    assert client.get("/api/orders/", headers=user_headers, params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.services.product_cache import MemoryBackend, ProductCache, RedisBackend, product_cache
+from app.services.redis_client import FakeRedis
+
+@pytest.fixture(params=["memory", "fake"])
+def cache(request):
+    backend = MemoryBackend(100, 60) if request.param == "memory" else RedisBackend(FakeRedis(), 60)
+    return ProductCache(backend)
+
+def test_fill_is_dropped_after_an_invalidation(cache):
+    async def scenario():
+        generation = await cache.generation()
+        await cache.invalidate_products([1])
+        await cache.set_product(1, b"old", generation)
+        assert await cache.get_product(1) is None
+
+        generation = await cache.generation()
+        await cache.set_product(1, b"new", generation)
+        assert await cache.get_product(1) == b"new"
+
+    asyncio.run(scenario())
+
+def test_replica_fill_waits_out_staleness(cache):
+    async def scenario():
+        await cache.invalidate_products([1])
+        generation = await cache.generation()
+        await cache.set_list({"page": 1}, generation, b"[]", None, staleness=60)
+        assert await cache.get_list({"page": 1}, generation) is None
+
+        await cache.set_list({"page": 1}, generation, b"[]", "next", staleness=0)
+        assert await cache.get_list({"page": 1}, generation) == (b"[]", "next")
+
+    asyncio.run(scenario())
+
+def test_product_route_serves_and_invalidates_cache(client, admin_headers, make_product):
+    product = make_product(price=10.0)
+
+    assert client.get(f"/api/products/{product['id']}").json()["price"] == 10.0
+    hits = product_cache.hits
+    assert client.get(f"/api/products/{product['id']}").json()["price"] == 10.0
+    assert product_cache.hits == hits + 1
+
+    assert client.put(f"/api/products/{product['id']}", json={"price": 12.0}, headers=admin_headers).status_code == 200
+    assert client.get(f"/api/products/{product['id']}").json()["price"] == 12.0
@@ -0,0 +1,47 @@
+import pytest
+
+def all_pages(client, url, params, limit=2):
+    """Every item of a listing, following X-Next-Cursor page by page."""
+    items, pages = [], 0
+    cursor = None
+    while True:
+        response = client.get(url, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        items += response.json()
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return items, pages
+
+@pytest.fixture
+def catalog(make_product):
+    # Equal prices and titles make the id tie-breaker matter
+    return [
+        make_product(title="Anvil", price=30.0),
+        make_product(title="Bolt", price=10.0, stock=0),
+        make_product(title="Anvil", price=20.0),
+        make_product(title="Clamp", price=10.0),
+        make_product(title="Drill", price=20.0),
+    ]
+
+@pytest.mark.parametrize("sort, key", [
+    ("id", lambda product: product["id"]),
+    ("price", lambda product: (product["price"], product["id"])),
+    ("-price", lambda product: (-product["price"], -product["id"])),
+    ("title", lambda product: (product["title"], product["id"])),
+])
+def test_cursor_pages_cover_the_catalog_once_in_order(client, catalog, sort, key):
+    items, pages = all_pages(client, "/api/products/", {"sort": sort})
+
+    assert [item["id"] for item in items] == [product["id"] for product in sorted(catalog, key=key)]
+    assert pages == 3
+
+def test_filters_apply_across_pages(client, catalog):
+    items, _ = all_pages(client, "/api/products/", {"sort": "price", "min_price": 15, "in_stock": "true"}, limit=1)
+    assert [item["id"] for item in items] == [catalog[2]["id"], catalog[4]["id"], catalog[0]["id"]]
+
+def test_cursor_from_another_sort_is_rejected(client, catalog):
+    cursor = client.get("/api/products/", params={"sort": "price", "limit": 2}).headers["x-next-cursor"]
+
+    assert client.get("/api/products/", params={"sort": "title", "cursor": cursor}).status_code == 400
+    assert client.get("/api/products/", params={"cursor": "not-a-cursor"}).status_code == 400
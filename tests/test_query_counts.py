@@ -0,0 +1,49 @@
+import pytest
+from app.services.product_cache import product_cache
+from app.utils.loaders import assert_max_statements
+
+# Statement budgets for pages of 5 items; per-item loading would blow them by 5
+ITEMS = 5
+
+@pytest.fixture
+def products(make_product):
+    return [make_product() for _ in range(ITEMS)]
+
+@pytest.fixture
+def cart(client, user_headers, products):
+    for product in products:
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+
+@pytest.fixture
+def orders(client, user_headers, products):
+    for product in products:
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+        client.post("/api/checkout/", headers=user_headers)
+
+def test_product_list(client, products):
+    product_cache.backend.entries.clear()
+    with assert_max_statements(2):
+        assert len(client.get("/api/products/").json()) == ITEMS
+
+def test_product_detail(client, products):
+    product_cache.backend.entries.clear()
+    with assert_max_statements(2):
+        assert client.get(f"/api/products/{products[0]['id']}").status_code == 200
+
+def test_cart(client, user_headers, cart):
+    with assert_max_statements(1):
+        assert len(client.get("/api/cart/", headers=user_headers).json()["items"]) == ITEMS
+
+def test_order_history(client, user_headers, orders):
+    with assert_max_statements(2):
+        history = client.get("/api/orders/", headers=user_headers).json()
+    assert len(history) == ITEMS
+    assert all(len(order["items"]) == 1 for order in history)
+
+def test_order_detail(client, user_headers, products):
+    for product in products:
+        client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    order = client.post("/api/checkout/", headers=user_headers).json()
+
+    with assert_max_statements(2):
+        assert len(client.get(f"/api/orders/{order['id']}", headers=user_headers).json()["items"]) == ITEMS
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from app import database
+from app.database import RecentWriters, ReplicaSet, make_async_engine, make_engine, recent_writers
+from app.services.migrations import upgrade
+from app.services.redis_client import FakeRedis
+
+@pytest.fixture
+def use_replica(client, monkeypatch):
+    """use_replica(url) routes reads to one replica at `url` for the rest of the test."""
+    replica_sets = []
+
+    def use(url: str) -> ReplicaSet:
+        replica_set = ReplicaSet({"replica1": make_async_engine(url)}, max_lag=5, check_interval=5)
+        monkeypatch.setattr(database, "replicas", replica_set)
+        replica_sets.append(replica_set)
+        return replica_set
+
+    yield use
+    for replica_set in replica_sets:
+        client.portal.call(replica_set.dispose)
+
+@pytest.fixture
+def stale_replica_url(tmp_path):
+    """A migrated database that never receives the primary's writes."""
+    url = f"sqlite:///{tmp_path}/replica.db"
+    replica_engine = make_engine(url)
+    upgrade(replica_engine)
+    replica_engine.dispose()
+    return url
+
+def test_orders_read_primary_right_after_checkout(client, user_headers, make_product, use_replica, stale_replica_url):
+    product = make_product()
+    use_replica(stale_replica_url)
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": 1}, headers=user_headers)
+    order = client.post("/api/checkout/", headers=user_headers).json()
+
+    assert client.get(f"/api/orders/{order['id']}", headers=user_headers).status_code == 200
+
+    # Once the window is over the replica serves the read, and it hasn't caught up
+    recent_writers.until.clear()
+    assert client.get(f"/api/orders/{order['id']}", headers=user_headers).status_code == 404
+
+def test_unreachable_replica_fails_over_to_primary(client, make_product, use_replica, tmp_path):
+    product = make_product()
+    replica_set = use_replica(f"sqlite:///{tmp_path}/missing/replica.db")
+
+    response = client.get("/api/products/")
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [product["id"]]
+    assert not replica_set.replicas[0].healthy
+    assert replica_set.primary_fallbacks == 1
+
+    # Health checks put it back once it is reachable again
+    (tmp_path / "missing").mkdir()
+    client.portal.call(replica_set.check)
+    assert replica_set.replicas[0].healthy
+
+def test_recent_writers_shared_through_redis(monkeypatch, stale_replica_url):
+    monkeypatch.setattr(database, "replicas", ReplicaSet({"replica1": make_async_engine(stale_replica_url)}, 5, 5))
+    writers = RecentWriters(10, FakeRedis())
+
+    async def scenario():
+        assert not await writers.active(7)
+        await writers.mark(7)
+        assert await writers.active(7)
+        assert not await writers.active(8)
+
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+import pytest
+
+def buy(client, headers, product, quantity):
+    client.post("/api/cart/items", json={"product_id": product["id"], "quantity": quantity}, headers=headers)
+    response = client.post("/api/checkout/", headers=headers)
+    assert response.status_code == 200, response.text
+
+@pytest.fixture
+def sold(client, admin_headers, user_headers, make_product):
+    """Two products sold, then the bigger seller deleted."""
+    kept = make_product(price=10.0)
+    deleted = make_product(price=25.0, title="Discontinued widget", sku="OLD-1")
+    buy(client, user_headers, kept, 1)
+    buy(client, user_headers, deleted, 2)
+    response = client.delete(f"/api/products/{deleted['id']}", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return kept, deleted
+
+def test_top_products_lists_deleted_products_from_their_snapshot(client, admin_headers, sold):
+    kept, deleted = sold
+    response = client.get("/api/reports/top-products", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {"product_id": deleted["id"], "sku": "OLD-1", "title": "Discontinued widget", "units": 2, "revenue": 50.0},
+        {"product_id": kept["id"], "sku": kept["sku"], "title": kept["title"], "units": 1, "revenue": 10.0},
+    ]
+
+def test_top_products_names_a_renamed_product_as_last_sold(client, admin_headers, user_headers, make_product):
+    product = make_product()
+    buy(client, user_headers, product, 1)
+    client.put(f"/api/products/{product['id']}", json={"title": "Widget Pro"}, headers=admin_headers)
+    buy(client, user_headers, product, 1)
+
+    [row] = client.get("/api/reports/top-products", headers=admin_headers).json()
+    assert (row["title"], row["units"]) == ("Widget Pro", 2)
+
+def test_category_revenue_keeps_sales_of_deleted_products(client, admin_headers, category, sold):
+    response = client.get("/api/reports/revenue/categories", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {"category_id": None, "category": None, "units": 2, "revenue": 50.0},
+        {"category_id": category["id"], "category": category["name"], "units": 1, "revenue": 10.0},
+    ]
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import update
+from app.database import SessionLocal, engine
+from app.models.product import Product
+from app.services.catalog_version import bump_catalog_generation
+from app.services.search import InvertedIndex
+
+def found(index, query):
+    with SessionLocal() as db:
+        return [product_id for product_id, _ in index.search(db, query, 10)]
+
+@pytest.fixture
+def lamp(make_product):
+    return make_product(title="Brass lamp")["id"]
+
+@pytest.fixture
+def index(lamp):
+    index = InvertedIndex()
+    index.setup(engine)
+    return index
+
+def test_search_route_finds_products(client, make_product):
+    lamp = make_product(title="Brass lamp")
+    make_product(title="Oak table")
+
+    assert [product["id"] for product in client.get("/api/products/search?q=lamp").json()] == [lamp["id"]]
+
+def test_rolled_back_writes_never_reach_the_index(index, lamp):
+    with SessionLocal() as db:
+        product = db.get(Product, lamp)
+        product.title = "Copper kettle"
+        index.index_product(db, product)
+        bump_catalog_generation(db)
+        db.rollback()
+
+    assert found(index, "kettle") == []
+    assert found(index, "lamp") == [lamp]
+
+def test_picks_up_writes_committed_elsewhere(index, lamp, make_product):
+    # As another worker would: a Core UPDATE this index was never told about
+    with SessionLocal() as db:
+        db.execute(update(Product).where(Product.id == lamp).values(title="Copper kettle"))
+        bump_catalog_generation(db)
+        db.commit()
+    table = make_product(title="Oak table")["id"]
+
+    assert found(index, "lamp") == []
+    assert found(index, "kettle") == [lamp]
+    assert found(index, "table") == [table]
+
+def test_drops_deleted_products(client, admin_headers, index, lamp):
+    assert client.delete(f"/api/products/{lamp}", headers=admin_headers).status_code == 200
+
+    assert found(index, "lamp") == []